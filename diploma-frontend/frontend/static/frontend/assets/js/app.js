@@ -3,6 +3,18 @@ createApp({
 	delimiters: ['${', '}$'],
 	mixins: [window.mix ? window.mix : {}],
 	methods: {
+		imageSources(image) {
+			// Варианты изображения из API, сгруппированные по формату для <source>
+			const sources = {}
+			for (const variant of image?.srcset || []) {
+				sources[variant.type] = sources[variant.type] || []
+				sources[variant.type].push(`${variant.src} ${variant.width}w`)
+			}
+			return Object.entries(sources).map(([type, srcset]) => ({
+				type,
+				srcset: srcset.join(', '),
+			}))
+		},
 		getCookie(name) {
 			let cookieValue = null
 			if (document.cookie && document.cookie !== '') {
@@ -1,10 +1,11 @@
 var mix = {
 	methods: {
-		getHistoryOrder() {
-			this.getData("/api/orders")
+		getHistoryOrder(page = 1) {
+			this.getData("/api/orders", { currentPage: page })
 				.then(data => {
-					console.log(data)
-					this.orders = data
+					this.orders = data.items
+					this.currentPage = data.currentPage
+					this.lastPage = data.lastPage
 				}).catch(() => {
 				this.orders = []
 				console.warn('Ошибка при получении списка заказов')
@@ -17,6 +18,8 @@ var mix = {
 	data() {
 		return {
 			orders: [],
+			currentPage: null,
+			lastPage: 1,
 		}
 	}
-}
\ No newline at end of file
+}
@@ -0,0 +1,12 @@
+"""
+Нагрузочные замеры REST API.
+
+Запуск из каталога с manage.py:
+
+    python -m benchmarks --products 2000 --requests 300 --concurrency 4 --output run.json
+
+Бенчмарк создаёт временную тестовую базу, заполняет её данными (benchmarks.seed),
+гоняет запросы к эндпоинтам несколькими потоками (benchmarks.runner) и печатает
+JSON с задержками p50/p95/p99, количеством SQL-запросов и RPS по эндпоинтам.
+Флаг --compare old.json выводит изменения относительно предыдущего прогона.
+"""
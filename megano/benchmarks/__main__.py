@@ -0,0 +1,10 @@
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "megano.settings")
+django.setup()
+
+from .runner import main  # noqa: E402
+
+main()
@@ -0,0 +1,365 @@
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from megano.metrics import QueryCounter, acount_queries
+
+from .seed import SeedConfig, seed
+
+
+@dataclass
+class BenchmarkContext:
+    """Данные, доступные генераторам запросов."""
+
+    product_ids: list
+    user_ids: list
+    basket_size: int = 3
+
+
+@dataclass
+class EndpointResult:
+    """Результат замера одного эндпоинта."""
+
+    requests: int = 0
+    errors: int = 0
+    duration: float = 0.0
+    latencies: list = field(default_factory=list)
+    queries: list = field(default_factory=list)
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rps": round(self.requests / self.duration, 2) if self.duration else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 3),
+                "p95": round(percentile(latencies, 95) * 1000, 3),
+                "p99": round(percentile(latencies, 99) * 1000, 3),
+                "mean": (
+                    round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0
+                ),
+                "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+            },
+            "queries": {
+                "mean": (
+                    round(statistics.fmean(self.queries), 2) if self.queries else 0.0
+                ),
+                "max": max(self.queries, default=0),
+            },
+        }
+
+
+def percentile(sorted_values: list, percent: float) -> float:
+    """Процентиль методом ближайшего ранга по отсортированному списку."""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(percent / 100 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+# Эндпоинты бенчмарка: имя -> функция (rnd, context) -> (путь, GET-параметры)
+ENDPOINTS = {
+    "catalog": lambda rnd, ctx: (
+        "/api/catalog",
+        {"currentPage": rnd.randint(1, 10), "sort": rnd.choice(["price", "rating"])},
+    ),
+    "catalog-search": lambda rnd, ctx: (
+        "/api/catalog",
+        {"filter[name]": rnd.choice(["phone", "laptop", "product 1"])},
+    ),
+    "product": lambda rnd, ctx: (f"/api/product/{rnd.choice(ctx.product_ids)}", {}),
+    "basket": lambda rnd, ctx: ("/api/basket", {}),
+    "orders": lambda rnd, ctx: ("/api/orders", {}),
+    "categories": lambda rnd, ctx: ("/api/categories", {}),
+    "popular": lambda rnd, ctx: ("/api/products/popular", {}),
+    "limited": lambda rnd, ctx: ("/api/products/limited", {}),
+    "sales": lambda rnd, ctx: ("/api/sales", {"currentPage": 1}),
+    "banners": lambda rnd, ctx: ("/api/banners", {}),
+}
+
+
+# Эндпоинты, у которых есть асинхронный вариант под /api/async/ (режим --asgi)
+ASGI_ENDPOINTS = ("catalog", "catalog-search", "product", "categories", "banners")
+
+
+def asgi_path(path: str) -> str:
+    """Путь асинхронного варианта эндпоинта."""
+    return path.replace("/api/", "/api/async/", 1)
+
+
+def make_client(rnd: random.Random, context: BenchmarkContext) -> Client:
+    """Клиент авторизованного пользователя с несколькими товарами в корзине."""
+    client = Client()
+    if context.user_ids:
+        client.force_login(User.objects.get(id=rnd.choice(context.user_ids)))
+    for product_id in rnd.sample(
+        context.product_ids, min(context.basket_size, len(context.product_ids))
+    ):
+        client.post(
+            "/api/basket",
+            {"id": product_id, "count": 1},
+            content_type="application/json",
+        )
+    return client
+
+
+def run_endpoint(name, context, requests, concurrency, warmup, seed_value):
+    """
+    Замеряет один эндпоинт: concurrency потоков делят между собой requests запросов.
+    Returns:
+        EndpointResult: Задержки и количество SQL-запросов каждого запроса.
+    """
+    make_request = ENDPOINTS[name]
+    result = EndpointResult()
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(number):
+        rnd = random.Random(seed_value + number)
+        client = make_client(rnd, context)
+        for _ in range(warmup):
+            path, params = make_request(rnd, context)
+            client.get(path, params)
+        barrier.wait()
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    break
+            path, params = make_request(rnd, context)
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = client.get(path, params)
+                latency = time.perf_counter() - start
+            with lock:
+                result.requests += 1
+                result.errors += response.status_code >= 400
+                result.latencies.append(latency)
+                result.queries.append(counter.count)
+        connections.close_all()
+
+    threads = [
+        threading.Thread(target=worker, args=(number,)) for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    result.duration = time.perf_counter() - start
+    return result
+
+
+def run_endpoint_asgi(name, context, requests, concurrency, warmup, seed_value):
+    """
+    Замеряет асинхронный вариант эндпоинта через ASGI-обработчик:
+    concurrency задач в одном цикле событий делят между собой requests запросов.
+    Returns:
+        EndpointResult: Задержки и количество SQL-запросов каждого запроса.
+    """
+    make_request = ENDPOINTS[name]
+    result = EndpointResult()
+    remaining = iter(range(requests))
+
+    async def warm(client, rnd):
+        for _ in range(warmup):
+            path, params = make_request(rnd, context)
+            await client.get(asgi_path(path), params)
+
+    async def worker(client, rnd):
+        while next(remaining, None) is not None:
+            path, params = make_request(rnd, context)
+            counter = QueryCounter()
+            async with acount_queries(counter):
+                start = time.perf_counter()
+                response = await client.get(asgi_path(path), params)
+                latency = time.perf_counter() - start
+            result.requests += 1
+            result.errors += response.status_code >= 400
+            result.latencies.append(latency)
+            result.queries.append(counter.count)
+
+    async def run():
+        workers = [
+            (AsyncClient(), random.Random(seed_value + number))
+            for number in range(concurrency)
+        ]
+        await asyncio.gather(*(warm(client, rnd) for client, rnd in workers))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client, rnd) for client, rnd in workers))
+        result.duration = time.perf_counter() - start
+
+    # Синхронный middleware debug toolbar переводит всю асинхронную цепочку
+    # в поток, в продакшене его нет
+    middleware = [item for item in settings.MIDDLEWARE if "debug_toolbar" not in item]
+    with override_settings(MIDDLEWARE=middleware):
+        asyncio.run(run())
+    return result
+
+
+def compare(previous: dict, current: dict) -> dict:
+    """Изменение p50/p95/p99, запросов и RPS в процентах относительно прошлого прогона."""
+    diff = {}
+    for name, summary in current["endpoints"].items():
+        old = previous.get("endpoints", {}).get(name)
+        if not old:
+            continue
+        pairs = {
+            f"latency_{key}": (old["latency_ms"][key], summary["latency_ms"][key])
+            for key in ("p50", "p95", "p99")
+        }
+        pairs["queries"] = (old["queries"]["mean"], summary["queries"]["mean"])
+        pairs["rps"] = (old["rps"], summary["rps"])
+        diff[name] = {
+            key: round((new - was) / was * 100, 1) if was else None
+            for key, (was, new) in pairs.items()
+        }
+    return diff
+
+
+def create_database(verbosity: int) -> str:
+    """
+    Создаёт временную тестовую базу. Для SQLite — файл во временном каталоге,
+    чтобы потоки работали с отдельными подключениями, а не с общей памятью.
+    """
+    if connection.vendor == "sqlite":
+        path = Path(tempfile.mkdtemp(prefix="megano-bench-")) / "bench.sqlite3"
+        connection.settings_dict.setdefault("TEST", {})["NAME"] = str(path)
+    return connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Бенчмарк REST API Megano."
+    )
+    for config_field in fields(SeedConfig):
+        parser.add_argument(
+            f"--{config_field.name.replace('_', '-')}",
+            type=int,
+            default=config_field.default,
+            help=f"Seed: {config_field.name} (по умолчанию {config_field.default}).",
+        )
+    parser.add_argument(
+        "--endpoints",
+        default=",".join(ENDPOINTS),
+        help="Эндпоинты через запятую: " + ", ".join(ENDPOINTS),
+    )
+    parser.add_argument(
+        "--requests", type=int, default=200, help="Запросов на эндпоинт."
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="Число потоков (с --asgi — одновременных задач).",
+    )
+    parser.add_argument(
+        "--asgi",
+        action="store_true",
+        help="Гонять асинхронные варианты эндпоинтов через ASGI: "
+        + ", ".join(ASGI_ENDPOINTS),
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=5, help="Прогревочных запросов на поток."
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Очищать кэш перед каждым эндпоинтом и не прогревать его.",
+    )
+    parser.add_argument("--output", help="Файл для JSON-результата (иначе stdout).")
+    parser.add_argument("--compare", help="JSON прошлого прогона для сравнения.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> dict:
+    args = parse_args(argv)
+    names = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(names) - set(ENDPOINTS)
+    if unknown:
+        sys.exit(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    if args.asgi:
+        if args.endpoints == ",".join(ENDPOINTS):
+            names = list(ASGI_ENDPOINTS)
+        no_async = set(names) - set(ASGI_ENDPOINTS)
+        if no_async:
+            sys.exit(f"No async variant for: {', '.join(sorted(no_async))}")
+    run = run_endpoint_asgi if args.asgi else run_endpoint
+    config = SeedConfig(**{f.name: getattr(args, f.name) for f in fields(SeedConfig)})
+
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict["NAME"]
+    create_database(verbosity=0)
+    try:
+        seeded = seed(config)
+        context = BenchmarkContext(seeded["product_ids"], seeded["user_ids"])
+        endpoints = {}
+        for name in names:
+            if args.no_cache:
+                cache.clear()
+            result = run(
+                name,
+                context,
+                args.requests,
+                args.concurrency,
+                0 if args.no_cache else args.warmup,
+                config.seed,
+            )
+            endpoints[name] = result.summary()
+            print(
+                f"{name}: p50={endpoints[name]['latency_ms']['p50']}ms "
+                f"rps={endpoints[name]['rps']} queries={endpoints[name]['queries']['mean']}",
+                file=sys.stderr,
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "server": "asgi" if args.asgi else "wsgi",
+            "cache": not args.no_cache,
+            "seed": asdict(config),
+        },
+        "endpoints": endpoints,
+    }
+    if args.compare:
+        with open(args.compare) as file:
+            report["compare"] = compare(json.load(file), report)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    return report
@@ -0,0 +1,194 @@
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from myauth.models import Profile
+from orderapp.models import Order, OrderItem
+from orderapp.utils.totals import recalculate_order_totals
+from shopapp.models import (
+    Banner,
+    Category,
+    Image,
+    ImageCategory,
+    Product,
+    Review,
+    Sale,
+    Specification,
+    SubCategory,
+    Tag,
+)
+from shopapp.utils.ratings import reconcile_review_stats
+from shopapp.utils.search import get_search_backend
+
+BENCHMARK_PASSWORD = "benchmark"
+
+
+@dataclass
+class SeedConfig:
+    """Объём генерируемых данных."""
+
+    categories: int = 10
+    subcategories: int = 3
+    products: int = 1000
+    images: int = 2
+    reviews: int = 3
+    tags: int = 30
+    tags_per_product: int = 3
+    specifications: int = 2
+    users: int = 20
+    orders: int = 500
+    order_items: int = 3
+    sales: int = 50
+    banners: int = 5
+    seed: int = 42
+
+
+@transaction.atomic
+def seed(config: SeedConfig) -> dict:
+    """
+    Заполняет базу данными для бенчмарка.
+
+    Все объекты создаются через bulk_create (сигналы не срабатывают),
+    поэтому в конце счётчики отзывов продуктов и поисковый индекс
+    пересчитываются целиком.
+    Args:
+        config: Объём данных.
+    Returns:
+        dict: Идентификаторы созданных продуктов и пользователей.
+    """
+    rnd = random.Random(config.seed)
+    now = timezone.now()
+    today = timezone.localdate()
+
+    category_image = ImageCategory.objects.create(
+        src="category_image/benchmark.png", alt="benchmark"
+    )
+    categories = Category.objects.bulk_create(
+        Category(title=f"Category {i}", image=category_image)
+        for i in range(config.categories)
+    )
+    subcategories = SubCategory.objects.bulk_create(
+        SubCategory(title=f"Subcategory {i}", image=category_image)
+        for i in range(config.categories * config.subcategories)
+    )
+    Category.subcategories.through.objects.bulk_create(
+        Category.subcategories.through(
+            category_id=categories[i // config.subcategories].id,
+            subcategory_id=subcategory.id,
+        )
+        for i, subcategory in enumerate(subcategories)
+    )
+
+    products = Product.objects.bulk_create(
+        Product(
+            category=rnd.choice(categories),
+            price=Decimal(rnd.randint(100, 100_000)) / 100,
+            count=rnd.randint(0, 100),
+            date=now - timedelta(minutes=i),
+            title=f"Product {i} {rnd.choice(['phone', 'laptop', 'tablet', 'camera'])}",
+            description=f"Description of product {i}",
+            fullDescription=f"Full description of product {i}",
+            freeDelivery=rnd.random() < 0.3,
+            available=rnd.random() < 0.9,
+            limited_edition=rnd.random() < 0.1,
+            sort_index=rnd.randint(0, 100),
+            sales_count=rnd.randint(0, 1000),
+        )
+        for i in range(config.products)
+    )
+    product_ids = [product.id for product in products]
+
+    images = Image.objects.bulk_create(
+        Image(product_id=pk, src=f"product_image/{pk}_{n}.png", alt=f"Image {n}")
+        for pk in product_ids
+        for n in range(config.images)
+    )
+    Review.objects.bulk_create(
+        Review(
+            product_id=pk,
+            author=f"Author {pk}-{n}",
+            email=f"review{pk}-{n}@example.com",
+            text="Review text",
+            rate=rnd.randint(1, 5),
+            date=now - timedelta(hours=n),
+        )
+        for pk in product_ids
+        for n in range(config.reviews)
+    )
+
+    tags = Tag.objects.bulk_create(Tag(name=f"tag{i}") for i in range(config.tags))
+    if tags:
+        Tag.product.through.objects.bulk_create(
+            Tag.product.through(tag_id=tag.tag_id, product_id=pk)
+            for pk in product_ids
+            for tag in rnd.sample(tags, min(config.tags_per_product, len(tags)))
+        )
+    specifications = Specification.objects.bulk_create(
+        Specification(name=f"spec{i}", value=f"value{i}")
+        for i in range(config.specifications)
+    )
+    Specification.product.through.objects.bulk_create(
+        Specification.product.through(specification_id=spec.id, product_id=pk)
+        for pk in product_ids
+        for spec in specifications
+    )
+
+    first_images = {image.product_id: image for image in reversed(images)}
+    sale_products = rnd.sample(products, min(config.sales, len(products)))
+    Sale.objects.bulk_create(
+        Sale(
+            product=product,
+            product_image=first_images[product.id],
+            price=product.price,
+            salePrice=product.price * Decimal("0.8"),
+            dateFrom=today - timedelta(days=1),
+            dateTo=today + timedelta(days=7),
+        )
+        for product in sale_products
+        if product.id in first_images
+    )
+    Banner.objects.bulk_create(
+        Banner(product=product)
+        for product in rnd.sample(products, min(config.banners, len(products)))
+    )
+
+    password = make_password(BENCHMARK_PASSWORD)
+    users = User.objects.bulk_create(
+        User(username=f"benchmark{i}", password=password) for i in range(config.users)
+    )
+    profiles = Profile.objects.bulk_create(
+        Profile(user=user, fullName=f"User {i}") for i, user in enumerate(users)
+    )
+    if profiles:
+        orders = Order.objects.bulk_create(
+            Order(
+                profile=rnd.choice(profiles),
+                deliveryType=rnd.choice(["ordinary", "express"]),
+                paymentType="online",
+                status=rnd.choice(["accepted", "confirmed"]),
+                city="City",
+                address="Address",
+            )
+            for _ in range(config.orders)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(
+                order=order,
+                product=product,
+                price=product.price,
+                count=rnd.randint(1, 3),
+            )
+            for order in orders
+            for product in rnd.sample(products, min(config.order_items, len(products)))
+        )
+        recalculate_order_totals()
+
+    reconcile_review_stats()
+    get_search_backend().rebuild()
+    return {"product_ids": product_ids, "user_ids": [user.id for user in users]}
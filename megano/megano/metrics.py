@@ -0,0 +1,259 @@
+"""
+Метрики запросов к API.
+
+QueryMetricsMiddleware считает для каждого запроса количество SQL-запросов,
+время в базе, время вне базы (сериализация и код представления), общее время
+и размер ответа, и агрегирует их в гистограммы по имени URL
+(например, "shopapp:catalog"). Гистограммы отдаются в формате Prometheus
+представлением metrics_view по адресу /api/_metrics.
+
+Для отлова N+1 в настройке QUERY_BUDGETS можно задать максимальное число
+запросов для эндпоинта. При QUERY_BUDGET_STRICT = True превышение бюджета
+вызывает QueryBudgetExceeded (в тестах это роняет тест), иначе пишется
+предупреждение в лог.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, asynccontextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+METRICS = {
+    "megano_request_duration_seconds": ("Total request time", DURATION_BUCKETS),
+    "megano_db_queries": ("SQL queries per request", QUERY_BUCKETS),
+    "megano_db_duration_seconds": ("Time spent in the database", DURATION_BUCKETS),
+    "megano_app_duration_seconds": (
+        "Time spent outside the database (view code and serialization)",
+        DURATION_BUCKETS,
+    ),
+    "megano_response_size_bytes": ("Response body size", SIZE_BUCKETS),
+}
+
+
+class QueryBudgetExceeded(Exception):
+    """Эндпоинт выполнил больше SQL-запросов, чем разрешено в QUERY_BUDGETS."""
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин, как в Prometheus."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Потокобезопасное хранилище гистограмм текущего процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+
+    def observe(self, endpoint: str, values: dict) -> None:
+        """
+        Добавляет наблюдения одного запроса.
+        Args:
+            endpoint: Имя URL.
+            values: Словарь "имя метрики -> значение".
+        """
+        with self.lock:
+            for name, value in values.items():
+                key = (name, endpoint)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram(METRICS[name][1])
+                self.histograms[key].observe(value)
+
+    def render(self) -> str:
+        """Возвращает метрики в текстовом формате Prometheus."""
+        lines = []
+        with self.lock:
+            for name, (description, buckets) in METRICS.items():
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, endpoint), histogram in sorted(self.histograms.items()):
+                    if metric != name:
+                        continue
+                    label = f'endpoint="{endpoint}"'
+                    cumulative = 0
+                    for bound, count in zip(buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(
+                            f'{name}_bucket{{{label},le="{bound}"}} {cumulative}'
+                        )
+                    lines.append(
+                        f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}'
+                    )
+                    lines.append(f"{name}_sum{{{label}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms.clear()
+
+
+registry = MetricsRegistry()
+
+
+class QueryCounter:
+    """execute_wrapper, который считает SQL-запросы и время их выполнения."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+# Счётчики запросов текущего асинхронного запроса. Соединения с базой у Django
+# привязаны к потоку, а асинхронный ORM выполняет запросы в отдельном потоке,
+# поэтому счётчики передаются туда через контекст (sync_to_async его копирует).
+_active_counters = ContextVar("active_query_counters", default=())
+
+
+def _count_in_context(execute, sql, params, many, context):
+    counters = _active_counters.get()
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for counter in counters:
+            counter.duration += duration
+            counter.count += 1
+
+
+@receiver(connection_created)
+def _install_context_counter(sender, connection, **kwargs) -> None:
+    """
+    Ставит _count_in_context на каждое новое соединение: так счётчик работает
+    в потоке асинхронного ORM без лишнего перехода в этот поток на каждый запрос.
+    """
+    if _count_in_context not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_in_context)
+
+
+@asynccontextmanager
+async def acount_queries(counter: QueryCounter):
+    """
+    Считает в counter SQL-запросы, выполненные асинхронным кодом внутри блока.
+    """
+    token = _active_counters.set((*_active_counters.get(), counter))
+    try:
+        yield counter
+    finally:
+        _active_counters.reset(token)
+
+
+class QueryMetricsMiddleware:
+    """
+    Middleware, собирающий метрики каждого запроса по имени URL.
+
+    Работает и в синхронной, и в асинхронной цепочке (ASGI), чтобы не
+    переводить асинхронные представления в поток.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так же помечает себя MiddlewareMixin в Django 4.1
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            response = self.get_response(request)
+        self.record(request, response, counter, start)
+        return response
+
+    async def __acall__(self, request):
+        counter = QueryCounter()
+        start = time.perf_counter()
+        async with acount_queries(counter):
+            response = await self.get_response(request)
+        self.record(request, response, counter, start)
+        return response
+
+    def record(self, request, response, counter, start: float) -> None:
+        """Записывает метрики завершённого запроса и проверяет бюджет."""
+        duration = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        endpoint = match.view_name if match else "unresolved"
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(
+            endpoint,
+            {
+                "megano_request_duration_seconds": duration,
+                "megano_db_queries": counter.count,
+                "megano_db_duration_seconds": counter.duration,
+                "megano_app_duration_seconds": max(duration - counter.duration, 0.0),
+                "megano_response_size_bytes": size,
+            },
+        )
+        self.check_budget(endpoint, counter.count)
+
+    @staticmethod
+    def check_budget(endpoint: str, queries: int) -> None:
+        """
+        Проверяет число запросов по бюджету из QUERY_BUDGETS.
+        Raises:
+            QueryBudgetExceeded: Если бюджет превышен и включён QUERY_BUDGET_STRICT.
+        """
+        budget = getattr(settings, "QUERY_BUDGETS", {}).get(endpoint)
+        if budget is None or queries <= budget:
+            return
+        message = f"{endpoint} ran {queries} SQL queries, budget is {budget}"
+        if getattr(settings, "QUERY_BUDGET_STRICT", False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def metrics_view(request):
+    """
+    Отдаёт метрики в формате Prometheus.
+
+    Доступно только с внутренних адресов (INTERNAL_IPS) или администраторам.
+    """
+    internal = request.META.get("REMOTE_ADDR") in settings.INTERNAL_IPS
+    if not internal and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
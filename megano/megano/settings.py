@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 import os
 from pathlib import Path
 import socket
+import sys
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -63,6 +64,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "megano.metrics.QueryMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -167,3 +169,106 @@ SPECTACULAR_SETTINGS = {
 }
 
 CART_SESSION_ID = "cart"
+
+# Хранилище корзины: строки CartItem в базе (корзина покупателя доступна
+# с любого устройства) или "shopapp.utils.cart.SessionCartStorage" — в сессии.
+CART_STORAGE = "shopapp.utils.cart.DatabaseCartStorage"
+
+# Сколько секунд товар неоплаченного заказа остаётся в резерве.
+# Истёкшие резервы снимает команда release_expired_reservations.
+STOCK_RESERVATION_TTL = 30 * 60
+
+# Очередь платежей: запрос оплаты только ставит задачу, проводит платежи
+# команда process_payments. Временные ошибки платёжной системы повторяются
+# через PAYMENT_RETRY_DELAY * 2 ** (попытка - 1) секунд.
+PAYMENT_GATEWAY = "orderapp.utils.payments.emulated_gateway"
+PAYMENT_MAX_ATTEMPTS = 5
+PAYMENT_RETRY_DELAY = 5
+# Задача, которая дольше этого остаётся в обработке, забирается снова
+PAYMENT_JOB_TIMEOUT = 5 * 60
+
+# Long-poll прогресса оплаты (progress-payment/<id>/wait): максимальное время
+# ожидания и период перечитывания статуса из базы, если платёж проведён
+# в другом процессе. Под ASGI ожидание не занимает поток, только если все
+# middleware асинхронные (debug_toolbar синхронный, в продакшене его нет).
+PAYMENT_PROGRESS_TIMEOUT = 25
+PAYMENT_PROGRESS_RECHECK = 2
+
+# Кэш используется каталогом и счётчиками страниц. В продакшене с несколькими
+# процессами стоит подключить общий кэш (Redis/Memcached), чтобы инвалидация
+# по сигналам была видна всем воркерам.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Сколько секунд хранится количество товаров для набора фильтров каталога
+CATALOG_COUNT_CACHE_TIMEOUT = 300
+# Если задано, каталог без фильтров с большим числом товаров показывает
+# приблизительное количество страниц вместо точного COUNT(*)
+CATALOG_ESTIMATED_COUNT_THRESHOLD = None
+
+# Поисковый бэкенд каталога (dotted path). Если не задан, выбирается по базе:
+# SQLite FTS5, PostgreSQL tsvector/GIN, иначе поиск через LIKE.
+PRODUCT_SEARCH_BACKEND = None
+
+# Время жизни закэшированных ответов виджетов главной страницы (секунды).
+# Кэш сбрасывается сигналами при изменении данных, таймаут — страховка.
+RESPONSE_CACHE_TIMEOUT = 600
+
+# Документы продуктов (/api/product/<id>) кэшируются по версии продукта,
+# которую увеличивают сигналы, поэтому таймаут большой
+PRODUCT_CACHE_TIMEOUT = 60 * 60 * 24
+# Блокировка сборки документа при промахе (секунды) и сколько другие
+# запросы ждут готовый документ, прежде чем собрать его сами
+PRODUCT_CACHE_LOCK_TIMEOUT = 10
+PRODUCT_CACHE_LOCK_WAIT = 2
+# Сколько последних отзывов входит в данные продукта
+PRODUCT_REVIEWS_PREVIEW = 5
+
+# Уменьшенные копии загруженных изображений (ширины в пикселях, форматы
+# webp/jpeg, качество сжатия) и число процессов, которые их строят.
+# При IMAGE_VARIANT_WORKERS = 0 копии строятся сразу в процессе запроса
+IMAGE_VARIANT_WIDTHS = (160, 320, 640, 1280)
+IMAGE_VARIANT_FORMATS = ("webp", "jpeg")
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+
+# Уменьшение изображений по запросу (/media/resize/<w>x<h>/<путь>):
+# каталог и предельный размер дискового кэша (байты), потоки для сжатия,
+# наибольшая сторона, качество и время кэширования ответа браузером
+IMAGE_RESIZE_CACHE_DIR = BASE_DIR / "resize_cache"
+IMAGE_RESIZE_CACHE_SIZE = 512 * 1024 * 1024
+IMAGE_RESIZE_WORKERS = 2
+IMAGE_RESIZE_MAX_SIZE = 2000
+IMAGE_RESIZE_QUALITY = 80
+IMAGE_RESIZE_MAX_AGE = 60 * 60 * 24 * 30
+
+# Максимальное число SQL-запросов на эндпоинт (имя URL).
+# Превышение пишется в лог, а при QUERY_BUDGET_STRICT = True вызывает
+# megano.metrics.QueryBudgetExceeded.
+QUERY_BUDGETS = {
+    "shopapp:catalog": 10,
+    "shopapp:product-details": 10,
+    "shopapp:product-review": 8,
+    "shopapp:products-popular": 8,
+    "shopapp:products-limited": 8,
+    "shopapp:sale": 8,
+    "shopapp:banners": 8,
+    "shopapp:categories": 6,
+    "shopapp:catalog-suggest": 4,
+    "shopapp:async-catalog": 10,
+    "shopapp:async-product-details": 10,
+    "shopapp:async-banners": 8,
+    "shopapp:async-categories": 6,
+    # Худший случай — первое обращение с корзиной в сессии (import_session_cart)
+    "shopapp:basket": 11,
+    "shopapp:basket-batch": 12,
+    "orderapp:orders": 16,
+    "orderapp:history-order": 8,
+    "orderapp:payment": 12,
+}
+# Под manage.py test бюджеты строгие: тест, превысивший бюджет, падает.
+# Под TestCase в счёт входят и SAVEPOINT/RELEASE вокруг atomic-блоков.
+QUERY_BUDGET_STRICT = sys.argv[1:2] == ["test"]
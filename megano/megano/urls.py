@@ -20,11 +20,22 @@ from django.conf import settings
 from django.conf.urls.static import static
 import debug_toolbar
 
+from shopapp.media_views import ImageResizeView
+
+from .metrics import metrics_view
+
 
 # urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("api/_metrics", metrics_view, name="metrics"),
+    # Раньше static(): иначе путь перехватит раздача MEDIA_URL в режиме DEBUG
+    path(
+        "media/resize/<int:width>x<int:height>/<path:path>",
+        ImageResizeView.as_view(),
+        name="media-resize",
+    ),
     path("", include("frontend.urls")),
     path("api/", include("myauth.urls")),
     path("api/", include("shopapp.urls")),
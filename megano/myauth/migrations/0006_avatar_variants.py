@@ -0,0 +1,20 @@
+# Generated by Django 4.1.6 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myauth", "0005_alter_avatar_src"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="avatar",
+            name="variants",
+            field=models.JSONField(
+                blank=True, default=list, editable=False, verbose_name="Variants"
+            ),
+        ),
+    ]
@@ -15,6 +15,10 @@ class Avatar(models.Model):
     alt = models.CharField(
         max_length=128, blank=True, null=True, verbose_name="Description"
     )
+    # Уменьшенные копии src, строятся в фоне (см. shopapp/utils/images.py)
+    variants = models.JSONField(
+        default=list, blank=True, editable=False, verbose_name="Variants"
+    )
 
     class Meta:
         verbose_name = "Avatar"
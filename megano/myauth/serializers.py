@@ -1,6 +1,8 @@
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
+from shopapp.utils.images import variant_srcset
+
 from .models import Avatar, Profile
 
 
@@ -46,14 +48,18 @@ class AvatarSerializer(serializers.ModelSerializer):
     """Сериализатор для аватара пользователя"""
 
     src = serializers.SerializerMethodField()  # тут возвращаем ссылку на изображение
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Avatar
-        fields = ["src", "alt"]
+        fields = ["src", "srcset", "alt"]
 
     def get_src(self, obj):
         return obj.src.url
 
+    def get_srcset(self, obj):
+        return variant_srcset(obj)
+
 
 class ProfileSerializer(serializers.ModelSerializer):
     """Сериалайзер для получения и/или обнавления профиля.
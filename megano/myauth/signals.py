@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from shopapp.utils.images import schedule_variants
+
+from .models import Avatar
+
+
+@receiver(post_save, sender=Avatar)
+def avatar_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "src" not in update_fields):
+        return
+    schedule_variants(instance)
@@ -9,6 +9,7 @@ from rest_framework.response import Response
 from rest_framework.utils import json
 from rest_framework.views import APIView
 
+from shopapp.utils.cart import merge_anonymous_cart
 from .models import Profile, Avatar
 from .serializers import ProfileSerializer, ProfileAvatarSerializer
 
@@ -26,7 +27,10 @@ class SignInView(APIView):
         password = user_data.get("password")
         user = authenticate(request, username=username, password=password)
         if user is not None:
+            # login() меняет ключ сессии, а анонимная корзина привязана к старому
+            session_key = request.session.session_key
             login(request, user)
+            merge_anonymous_cart(request, session_key)
             return Response(status=status.HTTP_201_CREATED)
         return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -47,7 +51,9 @@ class SignUpView(APIView):
             profile = Profile.objects.create(user=user, fullName=name)
             user = authenticate(request, username=username, password=password)
             if user is not None:
+                session_key = request.session.session_key
                 login(request, user)
+                merge_anonymous_cart(request, session_key)
             return Response(status=status.HTTP_201_CREATED)
         except Exception:
             return Response(status=status.HTTP_500_INTERNAL_SERVER_ERROR)
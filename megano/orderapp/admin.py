@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, OrderItem
+from .models import Order, OrderItem, PaymentJob, StockReservation
 
 
 class OrderItemInline(admin.TabularInline):
@@ -7,6 +7,13 @@ class OrderItemInline(admin.TabularInline):
     raw_id_fields = ["product"]
 
 
+class StockReservationInline(admin.TabularInline):
+    model = StockReservation
+    raw_id_fields = ["product"]
+    readonly_fields = ["created_at"]
+    extra = 0
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = [
@@ -19,4 +26,19 @@ class OrderAdmin(admin.ModelAdmin):
         "createdAt",
     ]
     list_filter = ["status"]
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, StockReservationInline]
+
+
+@admin.register(PaymentJob)
+class PaymentJobAdmin(admin.ModelAdmin):
+    list_display = [
+        "order",
+        "status",
+        "gateway_result",
+        "attempts",
+        "available_at",
+        "updated_at",
+    ]
+    list_filter = ["status", "gateway_result"]
+    raw_id_fields = ["order"]
+    readonly_fields = ["gateway_result", "gateway_message", "created_at", "updated_at"]
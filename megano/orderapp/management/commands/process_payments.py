@@ -0,0 +1,87 @@
+import logging
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from orderapp.utils.payments import claim_jobs, process_job
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Обработчик очереди платежей: забирает задачи PaymentJob пачками
+    и проводит платежи параллельно в пуле потоков.
+
+    Временные ошибки повторяются с экспоненциальной задержкой
+    (PAYMENT_RETRY_DELAY, PAYMENT_MAX_ATTEMPTS). Можно запускать несколько
+    обработчиков одновременно: задача достаётся только одному из них.
+    """
+
+    help = "Process queued payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Number of payments processed concurrently",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20,
+            help="Number of jobs claimed from the queue at once",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process the jobs that are ready now and exit",
+        )
+
+    def handle(self, *args, **options):
+        totals = Counter()
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            try:
+                while True:
+                    jobs = claim_jobs(options["batch_size"])
+                    if jobs:
+                        results = Counter(pool.map(self.run_job, jobs))
+                        totals.update(results)
+                        self.stdout.write(
+                            ", ".join(f"{key}: {n}" for key, n in results.items())
+                        )
+                    elif options["once"]:
+                        break
+                    else:
+                        time.sleep(options["poll_interval"])
+            except KeyboardInterrupt:
+                pass
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Processed {} jobs ({})".format(
+                    sum(totals.values()),
+                    ", ".join(f"{key}: {n}" for key, n in totals.items()) or "none",
+                )
+            )
+        )
+
+    @staticmethod
+    def run_job(job) -> str:
+        """Обрабатывает задачу в потоке пула и закрывает его соединение с базой."""
+        try:
+            return process_job(job)
+        except Exception:
+            logger.exception("Payment job %s failed", job.pk)
+            return "crashed"
+        finally:
+            connection.close()
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orderapp.utils.totals import recalculate_order_totals
+
+
+class Command(BaseCommand):
+    """
+    Пересчитывает сохранённые итоги заказов (subtotal, deliveryCost, totalCost)
+    по позициям заказов.
+
+    С --verify только проверяет и завершается ошибкой, если есть расхождения.
+    """
+
+    help = "Backfill or verify stored order totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report orders with wrong totals, do not change them",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of orders processed per batch",
+        )
+
+    def handle(self, *args, **options):
+        mismatches = recalculate_order_totals(
+            batch_size=options["batch_size"], dry_run=options["verify"]
+        )
+        for order_id, stored, expected in mismatches:
+            self.stdout.write(f"Order {order_id}: stored {stored}, expected {expected}")
+        if options["verify"]:
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} orders have wrong totals")
+            self.stdout.write(self.style.SUCCESS("All order totals are correct"))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Updated totals of {len(mismatches)} orders")
+            )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from orderapp.utils.stock import release_expired_reservations
+
+
+class Command(BaseCommand):
+    """
+    Возвращает на склад товар из резервов неоплаченных заказов,
+    срок которых (STOCK_RESERVATION_TTL) истёк.
+
+    Команду стоит запускать периодически, например раз в минуту из cron.
+    """
+
+    help = "Release expired stock reservations"
+
+    def handle(self, *args, **options):
+        released = release_expired_reservations()
+        self.stdout.write(self.style.SUCCESS(f"Released {released} reservations"))
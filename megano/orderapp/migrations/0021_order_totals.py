@@ -0,0 +1,59 @@
+# Generated by Django 4.1.6 on 2026-10-18 12:20
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    """Заполняет итоги существующих заказов по их позициям."""
+    Order = apps.get_model("orderapp", "Order")
+    orders = Order.objects.annotate(
+        items_subtotal=Coalesce(
+            Sum(F("products_in_order__price") * F("products_in_order__count")),
+            Value(Decimal(0)),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+    changed = []
+    for order in orders.iterator():
+        if order.deliveryType == "ordinary":
+            delivery = Decimal(200) if order.items_subtotal < 2000 else Decimal(0)
+        elif order.deliveryType == "express":
+            delivery = Decimal(500)
+        else:
+            delivery = Decimal(0)
+        order.subtotal = order.items_subtotal
+        order.deliveryCost = delivery
+        order.totalCost = order.items_subtotal + delivery
+        changed.append(order)
+    Order.objects.bulk_update(
+        changed, ["subtotal", "deliveryCost", "totalCost"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orderapp", "0020_stockreservation"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="deliveryCost",
+            field=models.DecimalField(
+                decimal_places=2, default=0, max_digits=10, verbose_name="Delivery Cost"
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="subtotal",
+            field=models.DecimalField(
+                decimal_places=2, default=0, max_digits=10, verbose_name="Subtotal"
+            ),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
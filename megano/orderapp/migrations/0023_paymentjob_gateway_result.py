@@ -0,0 +1,35 @@
+# Generated by Django 4.1.6 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orderapp", "0022_paymentjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="paymentjob",
+            name="gateway_message",
+            field=models.TextField(
+                blank=True, default="", verbose_name="Gateway message"
+            ),
+        ),
+        migrations.AddField(
+            model_name="paymentjob",
+            name="gateway_result",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("", "Not sent"),
+                    ("charged", "Charged"),
+                    ("declined", "Declined"),
+                ],
+                default="",
+                max_length=10,
+                verbose_name="Gateway result",
+            ),
+        ),
+    ]
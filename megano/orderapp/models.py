@@ -1,7 +1,14 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import F, Sum
+from django.utils import timezone
 from shopapp.models import Product
 from myauth.models import Profile
 
+# Стоимость позиций заказа: сумма price * count
+ITEMS_SUBTOTAL = Sum(F("price") * F("count"))
+
 
 class Order(models.Model):
     """Модель для хранения заказов"""
@@ -46,6 +53,12 @@ class Order(models.Model):
     profile = models.ForeignKey(
         Profile, on_delete=models.PROTECT, verbose_name="Profile"
     )
+    subtotal = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, verbose_name="Subtotal"
+    )
+    deliveryCost = models.DecimalField(
+        max_digits=10, decimal_places=2, default=0, verbose_name="Delivery Cost"
+    )
     totalCost = models.DecimalField(
         max_digits=10, decimal_places=2, null=True, blank=True
     )
@@ -55,32 +68,70 @@ class Order(models.Model):
         verbose_name = "Order"
         verbose_name_plural = "Orders"
 
-    def calculate_delivery_cost(self):
-        """Вычисление стоимости доставки в зависимости от типа доставки"""
+    def calculate_delivery_cost(self, subtotal=None):
+        """
+        Вычисление стоимости доставки в зависимости от типа доставки.
+
+        Args:
+            subtotal: Стоимость товаров, если уже известна
+                (иначе считается по позициям заказа).
+        """
 
         if self.deliveryType == "ordinary":
-            return 200 if self.calculate_total_cost_without_delivery() < 2000 else 0
+            if subtotal is None:
+                subtotal = self.calculate_total_cost_without_delivery()
+            return 200 if subtotal < 2000 else 0
         elif self.deliveryType == "express":
             return 500
         return 0
 
     def calculate_total_cost_without_delivery(self):
         """Вычисление общей стоимости продуктов в заказе без учета стоимости доставки"""
-        total_cost = sum(
-            item.price * item.count for item in self.products_in_order.all()
-        )
-        print("total_cost", total_cost)
-        return total_cost
+        total_cost = self.products_in_order.aggregate(total=ITEMS_SUBTOTAL)["total"]
+        return total_cost or Decimal(0)
 
     def calculate_total_cost(self):
         """Вычисление общей стоимости заказа с учетом стоимости доставки"""
         total_cost_without_delivery = self.calculate_total_cost_without_delivery()
-        delivery_cost = self.calculate_delivery_cost()
-        print("total_cost_without_delivery", total_cost_without_delivery)
-        print("delivery_cost", delivery_cost)
-        print("totalCost", total_cost_without_delivery + delivery_cost)
+        delivery_cost = self.calculate_delivery_cost(total_cost_without_delivery)
         return total_cost_without_delivery + delivery_cost
 
+    def apply_totals(self, subtotal=None):
+        """
+        Заполняет subtotal, deliveryCost и totalCost (без сохранения).
+
+        Args:
+            subtotal: Стоимость товаров; если не указана, берётся сохранённая.
+        """
+        if subtotal is not None:
+            self.subtotal = subtotal
+        self.deliveryCost = self.calculate_delivery_cost(self.subtotal)
+        self.totalCost = self.subtotal + self.deliveryCost
+
+    def update_totals(self):
+        """
+        Пересчитывает стоимость товаров по позициям заказа одним запросом
+        и сохраняет итоги. Сохраняет через QuerySet.update(), чтобы вызов
+        из сигнала удаления позиций не пересоздал уже удаляемый заказ.
+        """
+        self.apply_totals(self.calculate_total_cost_without_delivery())
+        Order.objects.filter(pk=self.pk).update(
+            subtotal=self.subtotal,
+            deliveryCost=self.deliveryCost,
+            totalCost=self.totalCost,
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет заказ, пересчитывая доставку и итог по сохранённому subtotal,
+        чтобы смена типа доставки сразу отражалась в totalCost.
+        """
+        self.apply_totals()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "deliveryCost", "totalCost"}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return "Order {}".format(self.id)
 
@@ -115,6 +166,47 @@ class OrderItem(models.Model):
         return "{}".format(self.id)
 
 
+class StockReservation(models.Model):
+    """Модель для резерва товара на складе под заказ"""
+
+    STATUS_CHOICES = [
+        ("reserved", "Reserved"),
+        ("sold", "Sold"),
+        ("released", "Released"),
+    ]
+
+    order = models.ForeignKey(
+        Order,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+        verbose_name="Order",
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="reservations",
+        verbose_name="Product",
+    )
+    count = models.PositiveIntegerField(verbose_name="Reserved quantity")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="reserved", verbose_name="Status"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(verbose_name="Expires at")
+
+    class Meta:
+        verbose_name = "Stock Reservation"
+        verbose_name_plural = "Stock Reservations"
+        indexes = [
+            models.Index(
+                fields=["status", "expires_at"], name="reservation_status_expiry_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.count} x {self.product_id} for order {self.order_id}"
+
+
 class Payment(models.Model):
     """Модель для хранения информации о платеже"""
 
@@ -144,6 +236,64 @@ class Payment(models.Model):
         return f"Payment for Order ID: {self.order.id}"
 
 
+class PaymentJob(models.Model):
+    """Модель для очереди обработки платежей (одна задача на заказ)"""
+
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+    GATEWAY_RESULT_CHOICES = [
+        ("", "Not sent"),
+        ("charged", "Charged"),
+        ("declined", "Declined"),
+    ]
+
+    order = models.OneToOneField(
+        Order,
+        on_delete=models.CASCADE,
+        related_name="payment_job",
+        verbose_name="Order",
+    )
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="queued", verbose_name="Status"
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Attempts")
+    available_at = models.DateTimeField(
+        default=timezone.now, verbose_name="Available at"
+    )
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Locked at")
+    last_error = models.TextField(blank=True, default="", verbose_name="Last error")
+    # Ответ платёжной системы сохраняется до записи результата в заказ:
+    # если запись упадёт, повторная попытка не спишет деньги ещё раз
+    gateway_result = models.CharField(
+        max_length=10,
+        choices=GATEWAY_RESULT_CHOICES,
+        blank=True,
+        default="",
+        verbose_name="Gateway result",
+    )
+    gateway_message = models.TextField(
+        blank=True, default="", verbose_name="Gateway message"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Payment Job"
+        verbose_name_plural = "Payment Jobs"
+        indexes = [
+            models.Index(
+                fields=["status", "available_at"], name="payment_job_status_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"Payment job for order {self.order_id} ({self.status})"
+
+
 class PaymentSomeone(models.Model):
     """Модель для хранения информации о платеже для кого-то другого"""
 
@@ -21,6 +21,26 @@ class OrderItemSerializer(serializers.ModelSerializer):
         return ImageSerializer(images, many=True).data if images else []
 
 
+class OrderItemShortSerializer(serializers.ModelSerializer):
+    """Облегчённый сериализатор позиции заказа для списков заказов"""
+
+    product = serializers.IntegerField(source="product_id", read_only=True)
+    title = serializers.CharField(source="product.title", read_only=True)
+    images = serializers.SerializerMethodField()  # Только первое изображение
+
+    class Meta:
+        model = OrderItem
+        fields = ["id", "product", "title", "price", "count", "images"]
+
+    def get_images(self, obj):
+        """Метод для получения первого изображения продукта"""
+        images = obj.product.images.all()
+        if not images:
+            return []
+        image = images[0]
+        return [{"src": image.src.url if image.src else "", "alt": image.alt}]
+
+
 class OrderSerializer(serializers.ModelSerializer):
     """Сериализатор для заказов"""
 
@@ -72,13 +92,13 @@ class OrderSerializer(serializers.ModelSerializer):
             "products",
         ]
 
-    def to_representation(self, instance):
-        """Преобразование представления объекта"""
-        ret = super().to_representation(instance)
-        ret["totalCost"] = (
-            instance.calculate_total_cost()
-        )  # Убедитесь, что правильно вызывается функция расчета
-        return ret
+
+class OrderListSerializer(OrderSerializer):
+    """Сериализатор для истории заказов с облегчёнными позициями"""
+
+    products = OrderItemShortSerializer(
+        many=True, source="products_in_order", read_only=True
+    )  # Продукты в заказе
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -114,7 +134,7 @@ class PaymentSomeoneSerializer(serializers.ModelSerializer):
 class PaymentStatusSerializer(serializers.ModelSerializer):
     """Сериализатор для статуса платежа"""
 
-    order_id = serializers.IntegerField(source="order.id")  # ID заказа
+    order_id = serializers.IntegerField()  # ID заказа
 
     class Meta:
         model = Payment
@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Order, OrderItem, Payment
+from .utils.progress import payment_hub
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    """Пересчитывает сохранённые итоги заказа при изменении его позиций."""
+    order = (
+        Order.objects.only("id", "deliveryType").filter(pk=instance.order_id).first()
+    )
+    if order is not None:
+        order.update_totals()
+
+
+@receiver(post_save, sender=Payment)
+def payment_saved(sender, instance, **kwargs):
+    """Будит запросы, ждущие изменения платежа, после фиксации транзакции."""
+    order_id = instance.order_id
+    transaction.on_commit(lambda: payment_hub.publish(order_id))
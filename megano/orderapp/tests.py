@@ -1,3 +1,226 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from myauth.models import Profile
+from shopapp.models import CartItem, Category, Image, ImageCategory, Product
+from .models import Order, Payment, PaymentJob
+from .utils.checkout import create_order_from_cart
+from .utils.payments import claim_jobs, enqueue_payment, process_job
+from .utils.stock import release_expired_reservations
+
+CARD = {"number": "2222", "name": "Buyer", "month": "12", "year": "2030", "code": "123"}
+
+
+class ReservationPaymentTestCase(TestCase):
+    """Истечение резерва и оплата, которая приходит до или после него."""
+
+    def setUp(self):
+        user = User.objects.create_user(username="buyer", password="secret")
+        self.profile = Profile.objects.create(user=user, fullName="Buyer")
+        image = ImageCategory.objects.create(src="category_image/test.png", alt="test")
+        category = Category.objects.create(title="Category", image=image)
+        self.product = Product.objects.create(
+            category=category, price=100, count=3, date=timezone.now(), title="Phone"
+        )
+        self.charges = []
+
+    def gateway(self, payment):
+        self.charges.append(payment.order_id)
+
+    def stock(self) -> tuple:
+        self.product.refresh_from_db()
+        return self.product.count, self.product.sales_count or 0
+
+    def order(self, count=2):
+        return create_order_from_cart(self.profile, {self.product.id: count})
+
+    def expire(self):
+        return release_expired_reservations(now=timezone.now() + timedelta(days=1))
+
+    def pay(self, order) -> str:
+        enqueue_payment(order, CARD)
+        (job,) = claim_jobs(limit=1)
+        return process_job(job, gateway=self.gateway)
+
+    def test_payment_before_expiry_sells_reserved_stock(self):
+        order = self.order()
+        self.assertEqual(self.pay(order), "done")
+        self.assertEqual(self.expire(), 0)
+        self.assertEqual(self.stock(), (1, 2))
+        self.assertEqual(Payment.objects.get(order=order).status, "confirmed")
+
+    def test_expiry_cancels_queued_payment(self):
+        order = self.order()
+        enqueue_payment(order, CARD)
+
+        self.assertEqual(self.expire(), 1)
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, "error")
+        self.assertEqual(Payment.objects.get(order=order).status, "error")
+        self.assertEqual(PaymentJob.objects.get(order=order).status, "failed")
+        self.assertEqual(claim_jobs(limit=1), [])
+        self.assertEqual(self.stock(), (3, 0))
+        self.assertEqual(self.charges, [])
+
+    def test_expiry_skips_payment_in_progress(self):
+        order = self.order()
+        enqueue_payment(order, CARD)
+        (job,) = claim_jobs(limit=1)
+
+        self.assertEqual(self.expire(), 0)
+        self.assertEqual(process_job(job, gateway=self.gateway), "done")
+        self.assertEqual(self.stock(), (1, 2))
+
+    def test_late_payment_reserves_stock_again(self):
+        order = self.order()
+        self.expire()
+        self.assertEqual(self.stock(), (3, 0))
+
+        self.assertEqual(self.pay(order), "done")
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, "confirmed")
+        self.assertEqual(self.stock(), (1, 2))
+
+    def test_late_payment_fails_when_stock_was_sold(self):
+        order = self.order()
+        self.expire()
+        other = self.order(count=3)
+        self.assertEqual(self.pay(other), "done")
+
+        with self.assertLogs("orderapp.utils.payments", "ERROR"):
+            self.assertEqual(self.pay(order), "done")
+
+        payment = Payment.objects.get(order=order)
+        self.assertEqual(payment.status, "error")
+        order.refresh_from_db()
+        self.assertEqual(order.status, "error")
+        self.assertEqual(self.stock(), (0, 3))
+
+    def test_database_error_after_charge_does_not_charge_again(self):
+        order = self.order()
+        enqueue_payment(order, CARD)
+        (job,) = claim_jobs(limit=1)
+        with mock.patch(
+            "orderapp.utils.payments.confirm_reservations",
+            side_effect=DatabaseError("database is locked"),
+        ), self.assertLogs("orderapp.utils.payments", "WARNING"):
+            self.assertEqual(process_job(job, gateway=self.gateway), "queued")
+        self.assertEqual(PaymentJob.objects.get(pk=job.pk).gateway_result, "charged")
+
+        (job,) = claim_jobs(limit=1, now=timezone.now() + timedelta(hours=1))
+        self.assertEqual(process_job(job, gateway=self.gateway), "done")
+
+        self.assertEqual(self.charges, [order.id])
+        self.assertEqual(Payment.objects.get(order=order).status, "confirmed")
+        self.assertEqual(self.stock(), (1, 2))
+
+
+class OrderHistoryTestCase(TestCase):
+    """История заказов: страницы по умолчанию и постоянное число запросов."""
+
+    def setUp(self):
+        user = User.objects.create_user(username="buyer", password="secret")
+        self.profile = Profile.objects.create(user=user, fullName="Buyer")
+        image = ImageCategory.objects.create(src="category_image/test.png", alt="test")
+        category = Category.objects.create(title="Category", image=image)
+        self.products = [
+            Product.objects.create(
+                category=category,
+                price=100,
+                count=1000,
+                date=timezone.now(),
+                title=f"Product {index}",
+            )
+            for index in range(3)
+        ]
+        for product in self.products:
+            Image.objects.create(product=product, src="product_image/a.png", alt="a")
+        self.client.force_login(user)
+
+    def add_orders(self, count: int) -> None:
+        for _ in range(count):
+            create_order_from_cart(
+                self.profile, {product.id: 1 for product in self.products}
+            )
+
+    def get(self, name: str, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(f"orderapp:{name}"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_history_is_paginated_with_fixed_query_count(self):
+        for name in ("orders", "history-order"):
+            with self.subTest(name=name):
+                Order.objects.all().delete()
+                self.add_orders(1)
+                small, small_queries = self.get(name)
+                self.add_orders(24)
+                data, queries = self.get(name)
+
+                self.assertEqual(queries, small_queries)
+                self.assertEqual(len(small["items"]), 1)
+                self.assertEqual(len(data["items"]), 10)
+                self.assertEqual((data["currentPage"], data["lastPage"]), (1, 3))
+                self.assertEqual(len(data["items"][0]["products"]), 3)
+
+                last, last_queries = self.get(name, currentPage=3, limit=10)
+                self.assertEqual(len(last["items"]), 5)
+                self.assertEqual(last_queries, small_queries)
+
+
+class CheckoutQueriesTestCase(TestCase):
+    """Оформление заказа из корзины за постоянное число запросов."""
+
+    # Сессия, пользователь, профиль, строки корзины, точка сохранения,
+    # блокировка записи, цены продуктов, заказ, позиции, блокировка остатков,
+    # UPDATE остатков, строки резерва, снятие точки сохранения, очистка корзины
+    expected_queries = 14
+
+    def setUp(self):
+        user = User.objects.create_user(username="buyer", password="secret")
+        self.profile = Profile.objects.create(user=user, fullName="Buyer")
+        image = ImageCategory.objects.create(src="category_image/test.png", alt="test")
+        self.category = Category.objects.create(title="Category", image=image)
+        self.client.force_login(user)
+
+    def checkout(self, lines: int):
+        products = Product.objects.bulk_create(
+            Product(
+                category=self.category,
+                price=10 + index,
+                count=5,
+                date=timezone.now(),
+                title=f"Product {index}",
+            )
+            for index in range(lines)
+        )
+        CartItem.objects.bulk_create(
+            CartItem(profile=self.profile, product=product, count=2)
+            for product in products
+        )
+        with self.assertNumQueries(self.expected_queries):
+            response = self.client.post(reverse("orderapp:orders"))
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.json()["orderId"])
+        self.assertEqual(order.products_in_order.count(), lines)
+        self.assertEqual(
+            order.subtotal, sum(2 * (10 + index) for index in range(lines))
+        )
+        self.assertFalse(CartItem.objects.filter(profile=self.profile).exists())
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_query_count_does_not_depend_on_cart_size(self):
+        for lines in (5, 50):
+            with self.subTest(lines=lines):
+                self.checkout(lines)
@@ -6,6 +6,7 @@ from .views import (
     PaymentSomeoneAPIView,
     ProgressPaymentView,
     OrderHistoryAPIView,
+    PaymentProgressWaitView,
 )
 
 
@@ -28,4 +29,9 @@ urlpatterns = [
         ProgressPaymentView.as_view(),
         name="progress-payment",
     ),
+    path(
+        "progress-payment/<int:id>/wait",
+        PaymentProgressWaitView.as_view(),
+        name="progress-payment-wait",
+    ),
 ]
@@ -0,0 +1,50 @@
+from decimal import Decimal
+
+from django.db import transaction
+
+from shopapp.models import Product
+from shopapp.utils.db import acquire_write_lock
+from ..models import Order, OrderItem
+from .stock import reserve_stock
+
+
+class EmptyCartError(Exception):
+    """В корзине нет ни одного существующего товара."""
+
+
+@transaction.atomic
+def create_order_from_cart(profile, cart_counts: dict) -> Order:
+    """
+    Оформляет заказ из содержимого корзины в одной транзакции.
+
+    Продукты загружаются одним запросом, позиции заказа вставляются одним
+    bulk_create, общая стоимость считается по тем же данным и сохраняется сразу,
+    поэтому число запросов не зависит от количества позиций в корзине.
+    Товар резервируется на складе (reserve_stock) в той же транзакции.
+    Args:
+        profile: Профиль покупателя.
+        cart_counts: Словарь "id продукта -> количество".
+    Returns:
+        Order: Созданный заказ.
+    Raises:
+        EmptyCartError: Если ни одного товара из корзины нет в базе.
+        OutOfStockError: Если какого-то товара не хватает на складе.
+    """
+    acquire_write_lock()
+    counts = {int(product_id): count for product_id, count in cart_counts.items()}
+    products = Product.objects.only("id", "price").in_bulk(list(counts))
+    if not products:
+        raise EmptyCartError("Cart is empty")
+
+    order = Order(profile=profile)
+    items = [
+        OrderItem(product=product, price=product.price, count=counts[product_id])
+        for product_id, product in products.items()
+    ]
+    order.subtotal = sum((item.price * item.count for item in items), Decimal(0))
+    order.save()
+    for item in items:
+        item.order = order
+    OrderItem.objects.bulk_create(items)
+    reserve_stock(order, {product_id: counts[product_id] for product_id in products})
+    return order
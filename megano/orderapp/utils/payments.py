@@ -0,0 +1,242 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from shopapp.utils.db import acquire_write_lock
+from ..models import Order, Payment, PaymentJob
+from .stock import OutOfStockError, confirm_reservations, release_reservations
+
+logger = logging.getLogger(__name__)
+
+OUT_OF_STOCK_MESSAGE = "Reserved goods are no longer available"
+
+
+class PaymentDeclined(Exception):
+    """Платёжная система отклонила платёж, повторять его бессмысленно."""
+
+
+class PaymentGatewayUnavailable(Exception):
+    """Временная ошибка платёжной системы, платёж стоит повторить позже."""
+
+
+def emulated_gateway(payment: Payment) -> None:
+    """
+    Учебная платёжная система: отклоняет карты, номер которых оканчивается на 0.
+
+    Настоящая платёжная система должна использовать id заказа как ключ
+    идемпотентности: после временной ошибки платёжной системы платёж
+    отправляется повторно. Ответ, полученный до сбоя базы, сохраняется
+    в задаче, и повторно такой платёж не отправляется.
+    Args:
+        payment: Платёж в статусе pending.
+    Raises:
+        PaymentDeclined: Если платёж отклонён.
+        PaymentGatewayUnavailable: Если платёжная система временно недоступна.
+    """
+    if int(payment.number) % 10 == 0:
+        raise PaymentDeclined("Payment error")
+
+
+def get_payment_gateway():
+    """Функция проведения платежа из настройки PAYMENT_GATEWAY."""
+    return import_string(settings.PAYMENT_GATEWAY)
+
+
+@transaction.atomic
+def enqueue_payment(order: Order, card: dict) -> PaymentJob:
+    """
+    Сохраняет платёж в статусе pending и ставит заказ в очередь обработки.
+
+    Запрос только пишет две строки, саму оплату проводит команда
+    process_payments.
+    Args:
+        order: Заказ.
+        card: Данные карты (проверенные PaymentSerializer).
+    Returns:
+        PaymentJob: Задача обработки платежа.
+    Raises:
+        IntegrityError: Если платёж по заказу уже создан.
+    """
+    acquire_write_lock()
+    Payment.objects.create(order=order, status="pending", **card)
+    job, _ = PaymentJob.objects.update_or_create(
+        order=order,
+        defaults={
+            "status": "queued",
+            "attempts": 0,
+            "available_at": timezone.now(),
+            "locked_at": None,
+            "last_error": "",
+            "gateway_result": "",
+            "gateway_message": "",
+        },
+    )
+    return job
+
+
+@transaction.atomic
+def claim_jobs(limit: int, now=None) -> list:
+    """
+    Забирает из очереди до limit готовых задач и помечает их processing.
+
+    Задачи, которые слишком долго (PAYMENT_JOB_TIMEOUT) остаются в processing,
+    считаются брошенными упавшим обработчиком и забираются снова.
+    Args:
+        limit: Максимальное количество задач.
+        now: Текущее время (для тестов).
+    Returns:
+        list: PaymentJob с загруженными заказом и платежом.
+    """
+    now = now or timezone.now()
+    acquire_write_lock()
+    stale = now - timedelta(seconds=settings.PAYMENT_JOB_TIMEOUT)
+    ids = list(
+        PaymentJob.objects.select_for_update(skip_locked=True)
+        .filter(
+            Q(status="queued", available_at__lte=now)
+            | Q(status="processing", locked_at__lte=stale)
+        )
+        .order_by("available_at", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    PaymentJob.objects.filter(id__in=ids).update(
+        status="processing", locked_at=now, attempts=F("attempts") + 1
+    )
+    return list(
+        PaymentJob.objects.filter(id__in=ids)
+        .select_related("order__payment")
+        .order_by("available_at", "id")
+    )
+
+
+def _settle_payment(
+    job: PaymentJob, status: str, error_message="", job_status="done"
+) -> str:
+    """
+    Записывает результат оплаты в Payment и Order и закрывает задачу.
+
+    Платёж меняется, только если он ещё pending, поэтому повторная обработка
+    того же заказа не трогает ни статусы, ни резервы на складе.
+    Если резерв заказа истёк и товар уже продан другим покупателям,
+    платёж завершается ошибкой вместо подтверждения.
+    """
+    with transaction.atomic():
+        acquire_write_lock()
+        payment = Payment.objects.select_for_update().get(order_id=job.order_id)
+        if payment.status == "pending" and status == "confirmed":
+            try:
+                # Точка сохранения: неудачный повторный резерв откатывается один
+                with transaction.atomic():
+                    confirm_reservations(job.order)
+            except OutOfStockError as error:
+                logger.error(
+                    "Order %s was paid after its reservation expired (%s), "
+                    "the payment has to be refunded",
+                    job.order_id,
+                    error,
+                )
+                status, error_message = "error", OUT_OF_STOCK_MESSAGE
+        if payment.status == "pending":
+            payment.status = status
+            payment.error_message = error_message or None
+            payment.save(update_fields=["status", "error_message"])
+            Order.objects.filter(pk=job.order_id).update(status=status)
+            if status != "confirmed":
+                release_reservations(job.order)
+        PaymentJob.objects.filter(pk=job.pk).update(
+            status=job_status,
+            locked_at=None,
+            last_error=error_message,
+            updated_at=timezone.now(),
+        )
+    return job_status
+
+
+def _record_gateway_result(job: PaymentJob, result: str, message: str = "") -> None:
+    """
+    Сохраняет ответ платёжной системы в задаче отдельной транзакцией,
+    до записи результата в платёж и заказ.
+    """
+    job.gateway_result, job.gateway_message = result, message
+    PaymentJob.objects.filter(pk=job.pk).update(
+        gateway_result=result, gateway_message=message, updated_at=timezone.now()
+    )
+
+
+def _retry(job: PaymentJob, error: Exception) -> str:
+    """
+    Возвращает задачу в очередь с экспоненциальной задержкой, а после
+    PAYMENT_MAX_ATTEMPTS попыток завершает платёж ошибкой.
+
+    Уже списанный платёж ошибкой не завершается: задача повторяется,
+    пока результат не удастся записать.
+    """
+    charged = job.gateway_result == "charged"
+    if job.attempts >= settings.PAYMENT_MAX_ATTEMPTS and not charged:
+        logger.error(
+            "Payment for order %s failed after %s attempts: %s",
+            job.order_id,
+            job.attempts,
+            error,
+        )
+        return _settle_payment(
+            job, "error", "Payment system unavailable", job_status="failed"
+        )
+    delay = settings.PAYMENT_RETRY_DELAY * 2 ** (job.attempts - 1)
+    logger.warning(
+        "Payment for order %s will be retried in %ss: %s", job.order_id, delay, error
+    )
+    now = timezone.now()
+    PaymentJob.objects.filter(pk=job.pk).update(
+        status="queued",
+        locked_at=None,
+        available_at=now + timedelta(seconds=delay),
+        last_error=str(error),
+        updated_at=now,
+    )
+    return "queued"
+
+
+def process_job(job: PaymentJob, gateway=None) -> str:
+    """
+    Проводит платёж задачи и записывает результат.
+
+    Args:
+        job: Задача, полученная из claim_jobs.
+        gateway: Функция проведения платежа (по умолчанию PAYMENT_GATEWAY).
+    Returns:
+        str: Новый статус задачи (done, queued или failed).
+    """
+    gateway = gateway or get_payment_gateway()
+    try:
+        payment = job.order.payment
+    except Payment.DoesNotExist:
+        PaymentJob.objects.filter(pk=job.pk).update(
+            status="failed", locked_at=None, last_error="Payment not found"
+        )
+        return "failed"
+    try:
+        if payment.status != "pending":
+            # Платёж уже проведён предыдущей попыткой, осталось закрыть задачу
+            return _settle_payment(job, payment.status)
+        if not job.gateway_result:
+            try:
+                gateway(payment)
+            except PaymentDeclined as error:
+                _record_gateway_result(job, "declined", str(error))
+            else:
+                _record_gateway_result(job, "charged")
+        # Иначе платёжная система уже ответила при прошлой попытке,
+        # но записать результат не удалось: платёж не отправляется повторно
+        if job.gateway_result == "declined":
+            return _settle_payment(job, "error", job.gateway_message)
+        return _settle_payment(job, "confirmed")
+    except (PaymentGatewayUnavailable, DatabaseError) as error:
+        return _retry(job, error)
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class Subscription:
+    """
+    Подписка одного ожидающего запроса на изменения платежа заказа.
+
+    Событие выставляется из любого потока через call_soon_threadsafe,
+    ждать его можно только в цикле событий, где подписка создана.
+    """
+
+    def __init__(self, hub, order_id: int):
+        self.hub = hub
+        self.order_id = order_id
+        self.loop = asyncio.get_running_loop()
+        self.event = asyncio.Event()
+
+    def notify(self) -> None:
+        try:
+            self.loop.call_soon_threadsafe(self.event.set)
+        except RuntimeError:
+            # Цикл запроса уже закрыт, ждать уведомления некому
+            pass
+
+    async def wait(self, timeout: float) -> bool:
+        """
+        Ждёт изменения платежа не дольше timeout секунд.
+        Returns:
+            bool: True, если пришло уведомление.
+        """
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        self.event.clear()
+        return True
+
+    def __enter__(self):
+        self.hub.add(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.hub.discard(self)
+
+
+class PaymentProgressHub:
+    """
+    Внутрипроцессный узел уведомлений об изменении платежей.
+
+    Сигнал post_save модели Payment вызывает publish(), и все запросы
+    этого процесса, ждущие платёж заказа, просыпаются сразу. Изменения из
+    других процессов (обработчик process_payments) сюда не попадают, поэтому
+    ожидающие запросы дополнительно перечитывают платёж из базы
+    раз в PAYMENT_PROGRESS_RECHECK секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, order_id: int) -> Subscription:
+        """Подписка для использования в with внутри асинхронного кода."""
+        return Subscription(self, order_id)
+
+    def add(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions[subscription.order_id].add(subscription)
+
+    def discard(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.order_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.order_id]
+
+    def publish(self, order_id: int) -> None:
+        """Будит все запросы, ждущие платёж заказа order_id."""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(order_id, ()))
+        for subscription in subscriptions:
+            subscription.notify()
+
+
+payment_hub = PaymentProgressHub()
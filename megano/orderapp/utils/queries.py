@@ -0,0 +1,42 @@
+from django.db.models import Prefetch, QuerySet
+
+from shopapp.models import Image
+from ..models import Order, OrderItem, Payment
+
+
+def with_order_items(queryset: QuerySet) -> QuerySet:
+    """
+    План загрузки заказов для списков: профиль, позиции с нужными колонками
+    продукта и изображения продуктов. На любое количество заказов уходит
+    фиксированное число запросов (заказы, позиции, изображения).
+    """
+    items = OrderItem.objects.select_related("product").only(
+        "id", "order_id", "price", "count", "product__id", "product__title"
+    )
+    images = Image.objects.only("id", "src", "alt", "product_id").order_by("pk")
+    return queryset.select_related("profile").prefetch_related(
+        Prefetch("products_in_order", queryset=items),
+        Prefetch("products_in_order__product__images", queryset=images),
+    )
+
+
+def order_history_queryset(user) -> QuerySet:
+    """Заказы пользователя от новых к старым с планом загрузки для списка."""
+    return with_order_items(
+        Order.objects.filter(profile__user=user).order_by("-createdAt", "-id")
+    )
+
+
+def get_payment_status(user, order_id: int):
+    """
+    Статус платежа заказа пользователя одним запросом.
+
+    Returns:
+        dict | None: {"order_id", "status", "error_message"} или None,
+        если заказа пользователя или платежа по нему нет.
+    """
+    return (
+        Payment.objects.filter(order_id=order_id, order__profile__user=user)
+        .values("order_id", "status", "error_message")
+        .first()
+    )
@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from shopapp.models import Product
+from shopapp.signals import stock_changed
+from shopapp.utils.db import acquire_write_lock
+from ..models import Order, Payment, PaymentJob, StockReservation
+
+
+class OutOfStockError(Exception):
+    """На складе не хватает товара для заказа."""
+
+    def __init__(self, product_ids):
+        self.product_ids = sorted(product_ids)
+        super().__init__(f"Not enough stock for products: {self.product_ids}")
+
+
+def _per_product(counts: dict) -> Case:
+    """Выражение CASE, подставляющее количество для каждого продукта."""
+    return Case(
+        *[
+            When(id=product_id, then=Value(count))
+            for product_id, count in counts.items()
+        ],
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def reserve_stock(order: Order, counts: dict) -> list:
+    """
+    Резервирует товар под заказ, уменьшая Product.count.
+
+    Строки продуктов блокируются select_for_update в порядке id, чтобы
+    параллельные заказы не ловили взаимную блокировку. Списание делается одним
+    условным UPDATE (count >= резерв), поэтому даже там, где блокировки строк
+    нет (SQLite), остаток не уходит в минус: если обновилось меньше строк,
+    чем продуктов в заказе, транзакция откатывается.
+    Должна вызываться внутри transaction.atomic до первого чтения
+    (см. acquire_write_lock).
+    Args:
+        order: Заказ.
+        counts: Словарь "id продукта -> количество".
+    Returns:
+        list: Созданные StockReservation.
+    Raises:
+        OutOfStockError: Если какого-то товара не хватает.
+    """
+    stock = dict(
+        Product.objects.select_for_update()
+        .filter(id__in=counts)
+        .order_by("id")
+        .values_list("id", "count")
+    )
+    missing = [pk for pk, count in counts.items() if stock.get(pk, 0) < count]
+    if missing:
+        raise OutOfStockError(missing)
+
+    updated = Product.objects.filter(
+        id__in=counts, count__gte=_per_product(counts)
+    ).update(count=F("count") - _per_product(counts))
+    if updated != len(counts):
+        remaining = Product.objects.filter(id__in=counts).values_list("id", "count")
+        raise OutOfStockError(pk for pk, count in remaining if count < counts[pk])
+
+    expires_at = timezone.now() + timedelta(seconds=settings.STOCK_RESERVATION_TTL)
+    reservations = StockReservation.objects.bulk_create(
+        StockReservation(
+            order=order, product_id=product_id, count=count, expires_at=expires_at
+        )
+        for product_id, count in counts.items()
+    )
+    stock_changed(counts)
+    return reservations
+
+
+def _settle(reservations, status: str) -> None:
+    """Переводит резервы в status и пакетно обновляет продукты."""
+    totals = defaultdict(int)
+    for reservation in reservations:
+        totals[reservation.product_id] += reservation.count
+    if not totals:
+        return
+    StockReservation.objects.filter(
+        id__in=[reservation.id for reservation in reservations]
+    ).update(status=status)
+    if status == "sold":
+        Product.objects.filter(id__in=totals).update(
+            sales_count=Coalesce(F("sales_count"), 0) + _per_product(totals)
+        )
+    else:
+        Product.objects.filter(id__in=totals).update(
+            count=F("count") + _per_product(totals)
+        )
+    stock_changed(totals)
+
+
+@transaction.atomic
+def confirm_reservations(order: Order) -> int:
+    """
+    Превращает резервы оплаченного заказа в продажи (увеличивает sales_count).
+
+    Если резервы уже сняты по истечении срока (release_expired_reservations)
+    и товар вернулся в продажу, он резервируется заново: подтвердить заказ
+    без резерва значило бы продать те же единицы дважды.
+    Повторный вызов ничего не меняет.
+    Returns:
+        int: Количество подтверждённых резервов.
+    Raises:
+        OutOfStockError: Если резерв истёк, а товара больше не хватает.
+            Изменения откатываются вместе с транзакцией.
+    """
+    acquire_write_lock()
+    reservations = list(order.reservations.select_for_update())
+    held = [
+        reservation for reservation in reservations if reservation.status == "reserved"
+    ]
+    if not held and not any(r.status == "sold" for r in reservations):
+        released = defaultdict(int)
+        for reservation in reservations:
+            released[reservation.product_id] += reservation.count
+        if released:
+            held = reserve_stock(order, released)
+    _settle(held, "sold")
+    return len(held)
+
+
+@transaction.atomic
+def release_reservations(order: Order) -> int:
+    """
+    Возвращает зарезервированный товар заказа на склад (при ошибке оплаты).
+    Returns:
+        int: Количество снятых резервов.
+    """
+    acquire_write_lock()
+    reservations = list(
+        order.reservations.select_for_update().filter(status="reserved")
+    )
+    _settle(reservations, "released")
+    return len(reservations)
+
+
+EXPIRED_MESSAGE = "Reservation expired"
+
+
+@transaction.atomic
+def release_expired_reservations(now=None) -> int:
+    """
+    Снимает все резервы, срок которых истёк, возвращает товар на склад
+    и отменяет эти заказы: ожидающий платёж завершается ошибкой, а его
+    задача в очереди снимается, чтобы карту не списали за проданный товар.
+
+    Заказы, платёж которых прямо сейчас проводит обработчик очереди,
+    не трогаются: их резерв подтвердит или снимет сам обработчик.
+    Returns:
+        int: Количество снятых резервов.
+    """
+    now = now or timezone.now()
+    acquire_write_lock()
+    reservations = list(
+        StockReservation.objects.select_for_update()
+        .filter(status="reserved", expires_at__lte=now)
+        .exclude(order__payment_job__status="processing")
+        .order_by("product_id")
+    )
+    _settle(reservations, "released")
+    order_ids = {reservation.order_id for reservation in reservations}
+    if order_ids:
+        Order.objects.filter(id__in=order_ids).exclude(status="confirmed").update(
+            status="error"
+        )
+        Payment.objects.filter(order_id__in=order_ids, status="pending").update(
+            status="error", error_message=EXPIRED_MESSAGE
+        )
+        PaymentJob.objects.filter(order_id__in=order_ids, status="queued").update(
+            status="failed", locked_at=None, last_error=EXPIRED_MESSAGE, updated_at=now
+        )
+    return len(reservations)
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Order
+
+TOTAL_FIELDS = ["subtotal", "deliveryCost", "totalCost"]
+
+
+def recalculate_order_totals(queryset=None, batch_size=500, dry_run=False) -> list:
+    """
+    Пересчитывает сохранённые итоги заказов по их позициям.
+
+    Стоимость товаров считается агрегатом в том же запросе, что и выборка
+    заказов, поэтому на пачку заказов уходит один SELECT и один bulk_update.
+    Args:
+        queryset: Заказы для проверки (по умолчанию все).
+        batch_size: Размер пачки.
+        dry_run: Только найти расхождения, ничего не сохраняя.
+    Returns:
+        list: Кортежи (id заказа, сохранённый totalCost, правильный totalCost)
+            для заказов, итоги которых расходились.
+    """
+    queryset = (queryset if queryset is not None else Order.objects.all()).annotate(
+        items_subtotal=Coalesce(
+            Sum(F("products_in_order__price") * F("products_in_order__count")),
+            Value(Decimal(0)),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+    )
+    mismatches, changed = [], []
+    for order in queryset.order_by("id").iterator(chunk_size=batch_size):
+        stored = (order.subtotal, order.deliveryCost, order.totalCost)
+        order.apply_totals(order.items_subtotal.quantize(Decimal("0.01")))
+        if stored != (order.subtotal, order.deliveryCost, order.totalCost):
+            mismatches.append((order.id, stored[2], order.totalCost))
+            changed.append(order)
+        if not dry_run and len(changed) >= batch_size:
+            Order.objects.bulk_update(changed, TOTAL_FIELDS)
+            changed = []
+    if not dry_run and changed:
+        Order.objects.bulk_update(changed, TOTAL_FIELDS)
+    return mismatches
@@ -1,21 +1,85 @@
+import asyncio
+import math
 import random
-from django.http import Http404
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import IntegrityError
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404
+from django.views import View
 from rest_framework import status, permissions
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from .models import Order, OrderItem, Payment, PaymentSomeone
+from .models import Order, PaymentSomeone
 from .serializers import (
+    OrderListSerializer,
     OrderSerializer,
     PaymentSerializer,
     PaymentStatusSerializer,
     PaymentSomeoneSerializer,
 )
+from .utils.checkout import EmptyCartError, create_order_from_cart
+from .utils.progress import payment_hub
+from .utils.queries import get_payment_status, order_history_queryset
+from .utils.payments import enqueue_payment
+from .utils.stock import OutOfStockError, confirm_reservations
 from shopapp.utils.cart import Cart
 
 
-class OrdersAPIView(APIView):
+class OrderHistoryPagination(PageNumberPagination):
+    """
+    Пагинация истории заказов в формате каталога (items, currentPage, lastPage).
+    """
+
+    page_size = 10
+    page_query_param = "currentPage"
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+    def get_paginated_response(self, data: list) -> Response:
+        return Response(
+            {
+                "items": data,
+                "currentPage": self.page.number,
+                "lastPage": self.page.paginator.num_pages,
+            }
+        )
+
+
+class OrderHistoryMixin:
+    """
+    Общий список заказов текущего пользователя для OrdersAPIView
+    и OrderHistoryAPIView.
+    """
+
+    pagination_class = OrderHistoryPagination
+
+    def list_orders(self, request: Request) -> Response:
+        """
+        Возвращает страницу заказов пользователя от новых к старым
+        ({"items": [...], "currentPage": ..., "lastPage": ...}).
+
+        Без currentPage отдаётся первая страница, размер страницы задаёт
+        limit (по умолчанию OrderHistoryPagination.page_size).
+
+        Args:
+            request: Запрос.
+
+        Returns:
+            Response: Заказы в формате JSON.
+        """
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(
+            order_history_queryset(request.user), request, view=self
+        )
+        serializer = OrderListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class OrdersAPIView(OrderHistoryMixin, APIView):
     """
     Класс для обработки запросов на получение и создание заказов.
 
@@ -27,19 +91,15 @@ class OrdersAPIView(APIView):
 
     def get(self, request: Request) -> Response:
         """
-        Метод для получения всех заказов текущего пользователя.
+        Метод для получения страницы заказов текущего пользователя.
 
         Args:
             request: Запрос.
 
         Returns:
-            Response: Список всех заказов текущего пользователя в формате JSON.
+            Response: Страница заказов текущего пользователя в формате JSON.
         """
-        orders = Order.objects.filter(profile=request.user.profile).order_by(
-            "-createdAt"
-        )
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.list_orders(request)
 
     def post(self, request: Request) -> Response:
         """
@@ -52,40 +112,18 @@ class OrdersAPIView(APIView):
             Response: Идентификатор созданного заказа в формате JSON.
         """
         cart = Cart(request)
-        # Создание заказа
-        order = Order.objects.create(profile=request.user.profile)
-
-        for item in cart:
-            product = item["product"]
-            count = item["count"]
-            price = product.price
-            OrderItem.objects.create(
-                order=order, product=product, price=price, count=count
+        try:
+            order = create_order_from_cart(request.user.profile, cart.get_counts())
+        except EmptyCartError as error:
+            return Response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        except OutOfStockError as error:
+            return Response(
+                {"error": "Not enough stock", "products": error.product_ids},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
-        order.save()
         cart.clear()
         return Response({"orderId": order.id}, status=status.HTTP_201_CREATED)
 
-    def list(self, request: Request, *args, **kwargs) -> Response:
-        """
-        Метод для получения списка заказов с изображениями продуктов.
-
-        Args:
-            request: Запрос.
-
-        Returns:
-            Response: Список заказов с изображениями продуктов в формате JSON.
-        """
-        response = super().list(request, *args, **kwargs)
-        for order in response.data:
-            for product in order["products"]:
-                if "images" not in product:
-                    product["images"] = (
-                        []
-                    )  # Убедитесь, что есть пустой список, если нет изображений
-        return response
-
 
 class OrderDetailAPIView(APIView):
     """
@@ -145,9 +183,7 @@ class OrderDetailAPIView(APIView):
         serializer = OrderSerializer(order, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
-            # Обновление общей стоимости после сохранения
-            delivery_type = request.data.get("deliveryType", order.deliveryType)
-            order.totalCost = order.calculate_total_cost()
+            # Доставка и итог пересчитываются в Order.save() по сохранённому subtotal
             order.status = "accepted"
             order.save()
             if order.paymentType == "someone":
@@ -158,7 +194,7 @@ class OrderDetailAPIView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class OrderHistoryAPIView(APIView):
+class OrderHistoryAPIView(OrderHistoryMixin, APIView):
     """
     Класс для обработки запросов на получение истории заказов пользователя.
 
@@ -169,19 +205,15 @@ class OrderHistoryAPIView(APIView):
 
     def get(self, request: Request) -> Response:
         """
-        Метод для получения всех заказов текущего пользователя.
+        Метод для получения страницы заказов текущего пользователя.
 
         Args:
             request: Запрос.
 
         Returns:
-            Response: Список всех заказов текущего пользователя в формате JSON.
+            Response: Страница заказов текущего пользователя в формате JSON.
         """
-        orders = Order.objects.filter(profile__user=request.user).order_by(
-            "-created_at"
-        )
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        return self.list_orders(request)
 
 
 class PaymentAPIView(APIView):
@@ -212,12 +244,6 @@ class PaymentAPIView(APIView):
             if payment_method == "online":
                 card_number = serializer.validated_data.get("number")
 
-                if Payment.objects.filter(order=order).exists():
-                    return Response(
-                        {"error": "Payment already exists for this order"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
                 if (
                     len(card_number) > 8
                     or not card_number.isdigit()
@@ -228,29 +254,22 @@ class PaymentAPIView(APIView):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-                if int(card_number) % 10 != 0:
-                    Payment.objects.create(
-                        order=order, **serializer.validated_data, status="confirmed"
-                    )
+                # Платёж проводит обработчик очереди (process_payments),
+                # статус доступен через progress-payment
+                try:
+                    enqueue_payment(order, serializer.validated_data)
+                except IntegrityError:
                     return Response(
-                        {
-                            "message": "Awaiting payment confirmation from the payment system"
-                        },
-                        status=status.HTTP_200_OK,
-                    )
-                else:
-                    Payment.objects.create(
-                        order=order,
-                        **serializer.validated_data,
-                        status="error",
-                        error_message="Payment error"
-                    )
-                    order.status = "error"
-                    return Response(
-                        {"error": "Payment error"}, status=status.HTTP_400_BAD_REQUEST
+                        {"error": "Payment already exists for this order"},
+                        status=status.HTTP_400_BAD_REQUEST,
                     )
+                return Response(
+                    {
+                        "message": "Awaiting payment confirmation from the payment system"
+                    },
+                    status=status.HTTP_202_ACCEPTED,
+                )
 
-        order.status = "confirmed"
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -280,6 +299,14 @@ class PaymentSomeoneAPIView(APIView):
             )
 
         order = get_object_or_404(Order, id=order_id, profile__user=request.user)
+        try:
+            # Истёкший резерв подтверждается, только если товар ещё есть
+            confirm_reservations(order)
+        except OutOfStockError as error:
+            return Response(
+                {"error": "Not enough stock", "products": error.product_ids},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         random_account_number = "".join([str(random.randint(0, 9)) for _ in range(8)])
         payment_someone, created = PaymentSomeone.objects.get_or_create(order=order)
         payment_someone.number = random_account_number
@@ -314,22 +341,70 @@ class ProgressPaymentView(APIView):
             id: Идентификатор заказа.
 
         Returns:
-            Response: Статус последнего платежа в формате JSON.
+            Response: Статус платежа в формате JSON
+            (404, если заказа или платежа нет).
+        """
+        payment = get_payment_status(request.user, id)
+        if payment is None:
+            return Response(
+                {"status": "No payment found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        serializer = PaymentStatusSerializer(payment)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-        Raises:
-            Http404: Если заказ не найден.
+
+class PaymentProgressWaitView(View):
+    """
+    Long-poll статуса платежа для страницы прогресса оплаты.
+
+    Вместо частых запросов к progress-payment клиент держит один запрос:
+    ответ приходит, как только статус отличается от уже известного клиенту
+    (параметр status), или по истечении timeout секунд с текущим статусом.
+    Асинхронное представление: под ASGI ожидание не занимает поток.
+    """
+
+    async def get(self, request, id: int) -> JsonResponse:
         """
-        try:
-            order = get_object_or_404(Order, id=id, profile__user=request.user)
-            payments = Payment.objects.filter(order=order).order_by("-created_at")
+        Args:
+            request: Запрос с необязательными GET-параметрами status и timeout.
+            id: Идентификатор заказа.
 
-            if not payments.exists():
-                return Response(
-                    {"status": "No payment found"}, status=status.HTTP_404_NOT_FOUND
+        Returns:
+            JsonResponse: Статус платежа (order_id, status, error_message).
+        """
+        user = await sync_to_async(get_user)(request)
+        if not user.is_authenticated:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        known = request.GET.get("status")
+        timeout = settings.PAYMENT_PROGRESS_TIMEOUT
+        try:
+            requested = float(request.GET.get("timeout", timeout))
+        except ValueError:
+            requested = math.nan
+        # nan прошёл бы через min/max и сломал бы ожидание
+        if not math.isfinite(requested):
+            return JsonResponse(
+                {"detail": "Invalid timeout."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        timeout = min(max(requested, 0), timeout)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Подписка оформляется до чтения статуса, чтобы не пропустить изменение
+        # между чтением и ожиданием
+        with payment_hub.subscribe(id) as subscription:
+            while True:
+                payment = await sync_to_async(get_payment_status)(user, id)
+                if payment is None:
+                    return JsonResponse(
+                        {"status": "No payment found"},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+                remaining = deadline - loop.time()
+                if payment["status"] != known or remaining <= 0:
+                    return JsonResponse(payment)
+                await subscription.wait(
+                    min(remaining, settings.PAYMENT_PROGRESS_RECHECK)
                 )
-
-            latest_payment = payments.first()
-            serializer = PaymentStatusSerializer(latest_payment)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Order.DoesNotExist:
-            raise Http404
@@ -23,11 +23,13 @@ class ProductAdmin(admin.ModelAdmin):
         "fullDescription",
         "price",
         "rating",
+        "reviews_count",
         "freeDelivery",
         "category",
         "count",
         "date",
     )
+    readonly_fields = ("rating", "reviews_count", "rating_sum")
     list_display_links = "pk", "title"
     list_filter = ["price", "rating", "category", "date", "count"]
 
@@ -107,9 +109,10 @@ class SaleProductAdmin(admin.ModelAdmin):
 
 @admin.register(CartItem)
 class CartAdmin(admin.ModelAdmin):
-    list_display = ["id", "product", "count"]
+    list_display = ["id", "profile", "session_key", "product", "count", "updated_at"]
     list_filter = ["count"]
-    search_fields = ["product"]
+    search_fields = ["product__title"]
+    raw_id_fields = ["profile", "product"]
 
 
 @admin.register(Banner)
@@ -0,0 +1,171 @@
+"""
+Асинхронные варианты самых нагруженных эндпоинтов чтения (/api/async/...).
+
+DRF 3.14 не поддерживает асинхронные APIView, поэтому это обычные асинхронные
+представления Django. Фильтры, планы загрузки, сериализаторы и кэш у них
+общие с синхронными представлениями, JSON рендерится рендерером DRF, так что
+ответы совпадают. Запросы к базе идут через асинхронный ORM, обращения к кэшу
+через aget/aset. Под ASGI (uvicorn megano.asgi:application) ожидание
+ввода-вывода не занимает поток на всё время запроса.
+"""
+
+from math import ceil
+
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.renderers import JSONRenderer
+
+from .models import Product
+from .serializers import BannerSerializer, ProductSerializer
+from .utils.category_tree import aget_category_tree
+from .utils.counts import acached_count, normalize_catalog_filters
+from .utils.pagination import KeysetPaginator
+from .utils.product_cache import aget_product_document
+from .utils.queries import banner_queryset, with_product_plan
+from .utils.response_cache import AsyncCachedResponseMixin
+from .views import CatalogCursorPagination, CatalogFilterMixin, CatalogPagination
+
+
+def json_response(data, status_code: int = status.HTTP_200_OK) -> HttpResponse:
+    """JSON-ответ тем же рендерером, что и у DRF, чтобы тела ответов совпадали."""
+    return HttpResponse(
+        JSONRenderer().render(data),
+        content_type="application/json",
+        status=status_code,
+    )
+
+
+class AsyncProductDetailView(View):
+    """
+    Асинхронный вариант ProductDetailView.
+    """
+
+    async def get(self, request, id: int) -> HttpResponse:
+        """
+        Обработка GET-запроса для получения информации о продукте.
+        Args:
+           request: Запрос.
+           id: Идентификатор продукта.
+        Returns:
+           HttpResponse: Данные продукта или сообщение об ошибке.
+        """
+        document = await aget_product_document(id)
+        if document is None:
+            return json_response(
+                {"message": "Product not found"}, status.HTTP_404_NOT_FOUND
+            )
+        return json_response(document)
+
+
+class AsyncCatalogView(CatalogFilterMixin, View):
+    """
+    Асинхронный вариант CatalogAPIView: те же фильтры, сортировка и пагинация
+    (по номеру страницы или keyset по ?cursor=).
+    """
+
+    async def get(self, request) -> HttpResponse:
+        """
+        Обработка GET-запроса для получения страницы каталога.
+        Returns:
+            HttpResponse: Товары страницы и информация о пагинации.
+        """
+        queryset = self.apply_filters(self.filter_by_category(Product.objects.all()))
+        queryset = with_product_plan(queryset, ProductSerializer)
+        try:
+            if CatalogCursorPagination.cursor_query_param in self.query_params:
+                data = await self.paginate_by_cursor(queryset)
+            else:
+                data = await self.paginate_by_page(queryset)
+        except APIException as error:
+            return json_response({"detail": error.detail}, error.status_code)
+        return json_response(data)
+
+    def get_page_size(self) -> int:
+        """Размер страницы из параметра limit с учётом ограничения."""
+        try:
+            page_size = int(self.query_params[CatalogPagination.page_size_query_param])
+        except (KeyError, ValueError):
+            return CatalogPagination.page_size
+        if page_size <= 0:
+            return CatalogPagination.page_size
+        return min(page_size, CatalogPagination.max_page_size)
+
+    async def paginate_by_page(self, queryset) -> dict:
+        """
+        Страница по номеру; количество товаров берётся из кэша, как в CatalogPagination.
+        Raises:
+            NotFound: Если номер страницы неверный.
+        """
+        page_size = self.get_page_size()
+        count = await acached_count(
+            queryset, normalize_catalog_filters(self.query_params)
+        )
+        last_page = max(ceil(count / page_size), 1)
+        number = self.query_params.get(CatalogPagination.page_query_param, 1)
+        if number in CatalogPagination.last_page_strings:
+            number = last_page
+        try:
+            number = int(number)
+        except ValueError:
+            raise NotFound(CatalogPagination.invalid_page_message)
+        if not 1 <= number <= last_page:
+            raise NotFound(CatalogPagination.invalid_page_message)
+
+        offset = (number - 1) * page_size
+        items = [product async for product in queryset[offset : offset + page_size]]
+        return {
+            "items": ProductSerializer(items, many=True).data,
+            "currentPage": number,
+            "lastPage": last_page,
+        }
+
+    async def paginate_by_cursor(self, queryset) -> dict:
+        """Keyset-страница, как в CatalogCursorPagination."""
+        paginator = KeysetPaginator(
+            self.get_page_size(),
+            field=self.ordering_field,
+            descending=self.ordering_desc,
+        )
+        page = await paginator.apaginate(
+            queryset, self.query_params.get(CatalogCursorPagination.cursor_query_param)
+        )
+        return {
+            "items": ProductSerializer(page.items, many=True).data,
+            "currentPage": page.number,
+            "lastPage": page.last_page,
+            "nextCursor": page.next_cursor,
+            "prevCursor": page.prev_cursor,
+        }
+
+
+class AsyncCategoryView(AsyncCachedResponseMixin, View):
+    """
+    Асинхронный вариант CategoryAPIView.
+    """
+
+    cache_group = "categories"
+
+    async def get(self, request) -> HttpResponse:
+        """
+        Обработка GET-запроса для получения списка категорий и субкатегорий.
+        Returns:
+            HttpResponse: Список категорий и субкатегорий в формате JSON.
+        """
+        return json_response(await aget_category_tree())
+
+
+class AsyncBannerView(AsyncCachedResponseMixin, View):
+    """
+    Асинхронный вариант BannerList.
+    """
+
+    cache_group = "banners"
+
+    async def get(self, request) -> HttpResponse:
+        """
+        Получает список всех баннеров.
+        """
+        banners = [banner async for banner in banner_queryset()]
+        return json_response(BannerSerializer(banners, many=True).data)
@@ -0,0 +1,64 @@
+import logging
+from concurrent.futures import as_completed
+
+from django.core.management.base import BaseCommand
+
+from myauth.models import Avatar
+from shopapp.models import Image, ImageCategory
+from shopapp.signals import category_images_changed, products_changed
+from shopapp.utils.images import get_executor, store_variants, variant_arguments
+from shopapp.utils.thumbnails import build_variants
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Строит уменьшенные копии всех загруженных изображений продуктов,
+    категорий и аватаров.
+
+    Новые изображения обрабатываются сигналами при сохранении, команда нужна
+    для изображений, загруженных до её появления, и после смены настроек
+    IMAGE_VARIANT_*. Актуальные копии не пересобираются.
+    """
+
+    help = "Build resized variants of uploaded product, category and avatar images"
+
+    def handle(self, *args, **options):
+        models = (Image, ImageCategory, Avatar)
+        jobs = {}
+        executor = get_executor()
+        for model in models:
+            rows = model.objects.exclude(src="").exclude(src__isnull=True)
+            for pk, name in rows.values_list("pk", "src"):
+                future = executor.submit(build_variants, *variant_arguments(name))
+                jobs[future] = (model, pk, name)
+
+        changed = {model: [] for model in models}
+        failed = 0
+        for future in as_completed(jobs):
+            model, pk, name = jobs[future]
+            try:
+                variants = future.result()
+            except Exception as error:
+                failed += 1
+                logger.warning("Failed to build variants of %s: %s", name, error)
+                continue
+            if store_variants(model, pk, name, variants):
+                changed[model].append(pk)
+
+        if changed[Image]:
+            products_changed(
+                Image.objects.filter(pk__in=changed[Image]).values_list(
+                    "product_id", flat=True
+                )
+            )
+        if changed[ImageCategory]:
+            category_images_changed()
+        updated = sum(len(pks) for pks in changed.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Image variants built: {len(jobs)} images, {updated} updated, "
+                f"{failed} failed"
+            )
+        )
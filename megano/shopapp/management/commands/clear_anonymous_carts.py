@@ -0,0 +1,30 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shopapp.models import CartItem
+
+
+class Command(BaseCommand):
+    """
+    Удаляет анонимные корзины (строки CartItem с session_key),
+    которые давно не менялись: их сессии уже истекли.
+    """
+
+    help = "Delete stale anonymous cart items"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Delete anonymous items not updated for this many days",
+        )
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(days=options["days"])
+        deleted, _ = CartItem.objects.filter(
+            session_key__isnull=False, updated_at__lt=threshold
+        ).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} cart items"))
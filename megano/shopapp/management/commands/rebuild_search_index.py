@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from shopapp.utils.search import get_search_backend
+
+
+class Command(BaseCommand):
+    """
+    Полностью перестраивает поисковый индекс продуктов.
+
+    Индекс поддерживается сигналами, команда нужна после первичной миграции
+    и для восстановления индекса после ручных правок базы.
+    """
+
+    help = "Rebuild the product full-text search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of products indexed per batch",
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        total = backend.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Search index rebuilt with {type(backend).__name__}: {total} products"
+            )
+        )
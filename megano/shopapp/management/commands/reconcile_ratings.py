@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from shopapp.signals import products_changed
+from shopapp.utils.ratings import reconcile_review_stats
+
+
+class Command(BaseCommand):
+    """
+    Сверяет количество отзывов и рейтинг продуктов с таблицей отзывов.
+
+    Сигналы отзывов поддерживают эти поля при каждом изменении, но
+    QuerySet.update(), bulk_create() и правки базы напрямую их обходят.
+    Исправленные продукты обновляются в каталоге, поиске и кэше.
+    """
+
+    help = "Recalculate stored review counts and ratings of products"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of products updated per query",
+        )
+
+    def handle(self, *args, **options):
+        product_ids = reconcile_review_stats(batch_size=options["batch_size"])
+        products_changed(product_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f"Ratings reconciled: {len(product_ids)} products fixed")
+        )
@@ -0,0 +1,65 @@
+"""
+Раздача уменьшенных копий загруженных изображений (/media/resize/<w>x<h>/<путь>).
+
+Нужна для изображений, у которых нет готовых вариантов (см. utils/images.py),
+например загруженных до их появления. Копия строится при первом запросе
+и дальше отдаётся с диска (см. utils/resize.py).
+"""
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
+
+from .utils.resize import get_resizer
+
+
+class ImageResizeView(View):
+    """
+    Копия изображения из MEDIA_ROOT, вписанная в width x height без увеличения.
+
+    Ответ кэшируется браузером на IMAGE_RESIZE_MAX_AGE секунд, по ETag
+    повторный запрос получает 304.
+    """
+
+    def get(self, request, width: int, height: int, path: str) -> HttpResponse:
+        """
+        Обработка GET-запроса для получения уменьшенной копии изображения.
+        Args:
+            request: Запрос.
+            width: Максимальная ширина.
+            height: Максимальная высота.
+            path: Путь к изображению относительно MEDIA_ROOT.
+        Returns:
+            HttpResponse: Файл изображения, 304 или ошибка.
+        """
+        max_size = settings.IMAGE_RESIZE_MAX_SIZE
+        if not (0 < width <= max_size and 0 < height <= max_size):
+            return HttpResponseBadRequest("Invalid size")
+
+        resizer = get_resizer()
+        # Второй проход на случай, если копию вытеснили из кэша между
+        # проверкой и открытием файла
+        for _ in range(2):
+            try:
+                target, content_type, etag = resizer.resize(path, width, height)
+            except OSError:
+                # Нет файла или это не изображение
+                raise Http404("Image not found")
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+            try:
+                file = open(target, "rb")
+            except FileNotFoundError:
+                continue
+            break
+        else:
+            raise Http404("Image not found")
+
+        response = FileResponse(file, content_type=content_type)
+        response["ETag"] = etag
+        patch_cache_control(
+            response, public=True, max_age=settings.IMAGE_RESIZE_MAX_AGE
+        )
+        return response
@@ -0,0 +1,115 @@
+# Generated by Django 4.1.6 on 2026-10-18 12:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopapp", "0019_remove_specification_product_specification_product"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductCatalogEntry",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="catalog_entry",
+                        serialize=False,
+                        to="shopapp.product",
+                        verbose_name="Product",
+                    ),
+                ),
+                ("title", models.CharField(max_length=255, verbose_name="Title")),
+                (
+                    "price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Price"
+                    ),
+                ),
+                (
+                    "sale_price",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="Effective price"
+                    ),
+                ),
+                (
+                    "reviews_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Reviews"),
+                ),
+                (
+                    "rating",
+                    models.DecimalField(
+                        decimal_places=1, default=0, max_digits=3, verbose_name="Rating"
+                    ),
+                ),
+                (
+                    "tag_ids",
+                    models.TextField(blank=True, default="", verbose_name="Tag IDs"),
+                ),
+                (
+                    "subcategory_ids",
+                    models.TextField(
+                        blank=True, default="", verbose_name="Subcategory IDs"
+                    ),
+                ),
+                (
+                    "image",
+                    models.CharField(
+                        blank=True, default="", max_length=255, verbose_name="Image"
+                    ),
+                ),
+                (
+                    "available",
+                    models.BooleanField(default=True, verbose_name="Available"),
+                ),
+                (
+                    "free_delivery",
+                    models.BooleanField(default=False, verbose_name="FreeDelivery"),
+                ),
+                ("date", models.DateTimeField(verbose_name="Date")),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="shopapp.category",
+                        verbose_name="Category",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Catalog entry",
+                "verbose_name_plural": "Catalog entries",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="productcatalogentry",
+            index=models.Index(fields=["rating", "product"], name="catalog_rating_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="productcatalogentry",
+            index=models.Index(
+                fields=["reviews_count", "product"], name="catalog_reviews_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productcatalogentry",
+            index=models.Index(
+                fields=["category", "price"], name="catalog_category_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productcatalogentry",
+            index=models.Index(
+                fields=["available", "free_delivery", "price"],
+                name="catalog_flags_price_idx",
+            ),
+        ),
+    ]
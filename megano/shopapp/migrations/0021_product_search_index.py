@@ -0,0 +1,92 @@
+from django.db import migrations
+
+# Не больше 999 параметров в запросе (лимит SQLite), по 5 на строку индекса
+INSERT_BATCH_SIZE = 199
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE shopapp_product_fts USING fts5("
+            "title, description, tags, specifications, "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE TABLE shopapp_product_search ("
+            "product_id integer PRIMARY KEY "
+            "REFERENCES shopapp_product (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX shopapp_product_search_gin "
+            "ON shopapp_product_search USING GIN (document)"
+        )
+
+
+def populate_search_index(apps, schema_editor):
+    """
+    Индексирует существующие продукты.
+
+    Тексты собираются так же, как в shopapp.utils.search.build_search_documents,
+    но на исторических моделях.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor not in ("sqlite", "postgresql"):
+        return
+    Product = apps.get_model("shopapp", "Product")
+    products = Product.objects.only(
+        "id", "title", "description", "fullDescription"
+    ).prefetch_related("tags", "specifications")
+    documents = []
+    for product in products.iterator(chunk_size=INSERT_BATCH_SIZE):
+        description = " ".join(
+            filter(None, [product.description, product.fullDescription])
+        )
+        tags = " ".join(tag.name for tag in product.tags.all())
+        specifications = " ".join(
+            f"{spec.name} {spec.value}" for spec in product.specifications.all()
+        )
+        documents.append((product.id, product.title, description, tags, specifications))
+
+    with schema_editor.connection.cursor() as cursor:
+        for start in range(0, len(documents), INSERT_BATCH_SIZE):
+            chunk = documents[start : start + INSERT_BATCH_SIZE]
+            if vendor == "sqlite":
+                cursor.execute(
+                    "INSERT INTO shopapp_product_fts "
+                    "(rowid, title, description, tags, specifications) VALUES "
+                    + ", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk)),
+                    [value for document in chunk for value in document],
+                )
+            else:
+                cursor.executemany(
+                    "INSERT INTO shopapp_product_search (product_id, document) "
+                    "VALUES (%s, "
+                    "setweight(to_tsvector('simple', %s), 'A') || "
+                    "setweight(to_tsvector('simple', %s), 'C') || "
+                    "setweight(to_tsvector('simple', %s), 'B') || "
+                    "setweight(to_tsvector('simple', %s), 'D'))",
+                    chunk,
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS shopapp_product_fts")
+    elif vendor == "postgresql":
+        schema_editor.execute("DROP TABLE IF EXISTS shopapp_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopapp", "0020_productcatalogentry"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.1.6 on 2026-10-18 12:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def delete_ownerless_items(apps, schema_editor):
+    """Строки корзины без владельца раньше не использовались и не нужны."""
+    CartItem = apps.get_model("shopapp", "CartItem")
+    CartItem.objects.filter(profile__isnull=True, session_key__isnull=True).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("myauth", "0005_alter_avatar_src"),
+        ("shopapp", "0021_product_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cartitem",
+            name="profile",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="cart_items",
+                to="myauth.profile",
+                verbose_name="Profile",
+            ),
+        ),
+        migrations.AddField(
+            model_name="cartitem",
+            name="session_key",
+            field=models.CharField(
+                blank=True, max_length=40, null=True, verbose_name="Session key"
+            ),
+        ),
+        migrations.AddField(
+            model_name="cartitem",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(delete_ownerless_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("profile__isnull", False)),
+                fields=("profile", "product"),
+                name="cart_item_profile_product_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("session_key__isnull", False)),
+                fields=("session_key", "product"),
+                name="cart_item_session_product_unique",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.CheckConstraint(
+                check=models.Q(
+                    ("profile__isnull", False),
+                    ("session_key__isnull", False),
+                    _connector="OR",
+                ),
+                name="cart_item_has_owner",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.1.6 on 2026-10-18 12:40
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_review_stats(apps, schema_editor):
+    """Заполняет количество отзывов, сумму оценок и рейтинг по существующим отзывам."""
+    Product = apps.get_model("shopapp", "Product")
+    products = Product.objects.annotate(
+        total=Count("reviews"), rate_sum=Coalesce(Sum("reviews__rate"), 0)
+    )
+    changed = []
+    for product in products.iterator():
+        product.reviews_count = product.total
+        product.rating_sum = product.rate_sum
+        product.rating = (
+            (Decimal(product.rate_sum) / product.total).quantize(
+                Decimal("0.1"), rounding=ROUND_HALF_UP
+            )
+            if product.total
+            else Decimal("0.0")
+        )
+        changed.append(product)
+    Product.objects.bulk_update(
+        changed, ["reviews_count", "rating_sum", "rating"], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopapp", "0022_cartitem_owner"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rating_sum",
+            field=models.PositiveIntegerField(default=0, verbose_name="Rating sum"),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="reviews_count",
+            field=models.PositiveIntegerField(default=0, verbose_name="Reviews count"),
+        ),
+        migrations.RunPython(backfill_review_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.1.6 on 2026-10-18 12:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopapp", "0023_product_review_stats"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["product", "date", "id"], name="review_product_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.6 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopapp", "0024_review_product_date_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="image",
+            name="variants",
+            field=models.JSONField(
+                blank=True, default=list, editable=False, verbose_name="Variants"
+            ),
+        ),
+        migrations.AddField(
+            model_name="imagecategory",
+            name="variants",
+            field=models.JSONField(
+                blank=True, default=list, editable=False, verbose_name="Variants"
+            ),
+        ),
+    ]
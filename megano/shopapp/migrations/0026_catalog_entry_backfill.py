@@ -0,0 +1,67 @@
+# Generated by Django 4.1.6 on 2026-10-18 16:05
+
+from django.db import migrations
+from django.db.models import Min
+from django.utils import timezone
+
+
+def backfill_catalog_entries(apps, schema_editor):
+    """
+    Заполняет таблицу каталога для продуктов, у которых ещё нет строки.
+
+    Повторяет shopapp.utils.catalog.build_catalog_entries на исторических моделях:
+    код приложения может опираться на поля, которых на этом шаге ещё нет.
+    """
+    Product = apps.get_model("shopapp", "Product")
+    Image = apps.get_model("shopapp", "Image")
+    Sale = apps.get_model("shopapp", "Sale")
+    ProductCatalogEntry = apps.get_model("shopapp", "ProductCatalogEntry")
+
+    today = timezone.localdate()
+    sale_prices = dict(
+        Sale.objects.filter(dateFrom__lte=today, dateTo__gte=today)
+        .values("product_id")
+        .annotate(best=Min("salePrice"))
+        .values_list("product_id", "best")
+    )
+    images = {}
+    for image in Image.objects.exclude(src="").order_by("-pk").iterator():
+        # Идём от новых к старым, чтобы осталось первое изображение продукта
+        images[image.product_id] = image.src.url
+
+    entries = [
+        ProductCatalogEntry(
+            product_id=product.id,
+            category_id=product.category_id,
+            title=product.title,
+            price=product.price,
+            sale_price=min(product.price, sale_prices.get(product.id, product.price)),
+            reviews_count=product.reviews_count,
+            rating=product.rating or 0,
+            image=images.get(product.id, ""),
+            available=product.available,
+            free_delivery=product.freeDelivery,
+            date=product.date,
+        )
+        for product in Product.objects.filter(catalog_entry__isnull=True).iterator()
+    ]
+    ProductCatalogEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopapp", "0025_image_variants_imagecategory_variants"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="productcatalogentry",
+            name="subcategory_ids",
+        ),
+        migrations.RemoveField(
+            model_name="productcatalogentry",
+            name="tag_ids",
+        ),
+        migrations.RunPython(backfill_catalog_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.1.6 on 2026-10-18 12:59
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def backfill_review_dates(apps, schema_editor):
+    """
+    Ставит дату отзывам, созданным без неё: время миграции, чтобы они
+    не оказались в конце ленты отзывов.
+    """
+    Review = apps.get_model("shopapp", "Review")
+    Review.objects.filter(date__isnull=True).update(date=django.utils.timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopapp", "0026_catalog_entry_backfill"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_review_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="review",
+            name="date",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="Date"
+            ),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.1.6 on 2026-10-18 13:15
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+
+
+def fill_missing_ratings(apps, schema_editor):
+    """
+    Считает рейтинг продуктов, у которых он не заполнен, по уже сохранённым
+    reviews_count и rating_sum: после миграции rating обязателен.
+    """
+    Product = apps.get_model("shopapp", "Product")
+    products = list(
+        Product.objects.filter(rating__isnull=True).only(
+            "id", "reviews_count", "rating_sum"
+        )
+    )
+    for product in products:
+        product.rating = Decimal("0.0")
+        if product.reviews_count:
+            product.rating = (
+                Decimal(product.rating_sum) / product.reviews_count
+            ).quantize(Decimal("0.1"), rounding=ROUND_HALF_UP)
+    Product.objects.bulk_update(products, ["rating"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("shopapp", "0027_review_date_default"),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name="ProductCatalogEntry",
+        ),
+        migrations.RunPython(fill_missing_ratings, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="product",
+            name="rating",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=1,
+                default=0.0,
+                max_digits=3,
+                verbose_name="Rating",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["rating", "id"], name="product_rating_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["reviews_count", "id"], name="product_reviews_idx"
+            ),
+        ),
+    ]
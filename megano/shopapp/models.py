@@ -1,5 +1,6 @@
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.utils import timezone
 
 
 class ImageCategory(models.Model):
@@ -19,6 +20,10 @@ class ImageCategory(models.Model):
     alt = models.CharField(
         max_length=128, blank=True, null=True, verbose_name="Description"
     )
+    # Уменьшенные копии src, строятся в фоне (см. shopapp/utils/images.py)
+    variants = models.JSONField(
+        default=list, blank=True, editable=False, verbose_name="Variants"
+    )
 
     def __str__(self):
         return self.alt
@@ -62,6 +67,13 @@ class Category(models.Model):
 class Product(models.Model):
     """Модель для хранения прадукта"""
 
+    class Meta:
+        indexes = [
+            # Сортировка каталога по рейтингу и отзывам, keyset по (поле, id)
+            models.Index(fields=["rating", "id"], name="product_rating_idx"),
+            models.Index(fields=["reviews_count", "id"], name="product_reviews_idx"),
+        ]
+
     id = models.AutoField(primary_key=True, verbose_name="ID")
     category = models.ForeignKey(
         Category,
@@ -82,10 +94,12 @@ class Product(models.Model):
         max_digits=3,
         decimal_places=1,
         blank=True,
-        null=True,
         default=0.0,
         verbose_name="Rating",
     )
+    # Поддерживаются сигналами отзывов (см. utils/ratings.py), rating — их среднее
+    reviews_count = models.PositiveIntegerField(default=0, verbose_name="Reviews count")
+    rating_sum = models.PositiveIntegerField(default=0, verbose_name="Rating sum")
     available = models.BooleanField(default=True)
     limited_edition = models.BooleanField(default=False)
     sort_index = models.IntegerField(
@@ -134,6 +148,10 @@ class Image(models.Model):
     alt = models.CharField(
         max_length=128, blank=True, null=True, verbose_name="Description"
     )
+    # Уменьшенные копии src, строятся в фоне (см. shopapp/utils/images.py)
+    variants = models.JSONField(
+        default=list, blank=True, editable=False, verbose_name="Variants"
+    )
     product = models.ForeignKey(
         Product, related_name="images", on_delete=models.CASCADE
     )
@@ -163,6 +181,12 @@ class Review(models.Model):
     class Meta:
         verbose_name = "Review"
         verbose_name_plural = "Reviews"
+        indexes = [
+            # Лента отзывов продукта: новые первыми, keyset по (date, id)
+            models.Index(
+                fields=["product", "date", "id"], name="review_product_date_idx"
+            ),
+        ]
 
     author = models.CharField(
         max_length=255, blank=True, null=True, verbose_name="Author"
@@ -176,7 +200,7 @@ class Review(models.Model):
         default=1,
         verbose_name="Rating",
     )
-    date = models.DateTimeField(blank=True, null=True, verbose_name="Date")
+    date = models.DateTimeField(default=timezone.now, verbose_name="Date")
     product = models.ForeignKey(
         Product, blank=True, null=True, related_name="reviews", on_delete=models.CASCADE
     )
@@ -229,10 +253,44 @@ class Sale(models.Model):
 class CartItem(models.Model):
     """
     Модель для элемента корзины.
+
+    Строка принадлежит либо профилю покупателя, либо анонимной сессии
+    (session_key). Для каждого владельца товар встречается не больше одного раза.
     """
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["profile", "product"],
+                condition=models.Q(profile__isnull=False),
+                name="cart_item_profile_product_unique",
+            ),
+            models.UniqueConstraint(
+                fields=["session_key", "product"],
+                condition=models.Q(session_key__isnull=False),
+                name="cart_item_session_product_unique",
+            ),
+            models.CheckConstraint(
+                check=models.Q(profile__isnull=False)
+                | models.Q(session_key__isnull=False),
+                name="cart_item_has_owner",
+            ),
+        ]
+
+    profile = models.ForeignKey(
+        "myauth.Profile",
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="cart_items",
+        verbose_name="Profile",
+    )
+    session_key = models.CharField(
+        max_length=40, null=True, blank=True, verbose_name="Session key"
+    )
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     count = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.count} x {self.product.title}"
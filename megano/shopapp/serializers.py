@@ -1,3 +1,4 @@
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 from .models import (
     Product,
@@ -12,6 +13,7 @@ from .models import (
     CartItem,
     Banner,
 )
+from .utils.images import variant_srcset
 
 
 class ImageSerializer(serializers.ModelSerializer):
@@ -22,34 +24,29 @@ class ImageSerializer(serializers.ModelSerializer):
     """
 
     src = serializers.SerializerMethodField()  # тут возвращаем ссылку на изображение
+    srcset = (
+        serializers.SerializerMethodField()
+    )  # уменьшенные копии того же изображения
 
     class Meta:
         model = Image
-        fields = ["src", "alt"]
-
-    # def get_src(self, obj):
-    #     """
-    #     Получение ссылки на изображение.
-    #     Args:
-    #         obj: Объект изображения.
-    #     Returns:
-    #         str: Ссылка на изображение.
-    #     """
-    #     return obj.src.url
+        fields = ["src", "srcset", "alt"]
+
     def get_src(self, obj):
         """
-        Get the list of image URLs.
+        Получение ссылки на изображение.
         Args:
-            obj: Image object.
+            obj: Объект изображения.
         Returns:
-            list: List of image URLs.
+            str: Ссылка на изображение.
+        """
+        return obj.src.url if obj.src else None
+
+    def get_srcset(self, obj):
+        """
+        Уменьшенные копии этого же изображения.
         """
-        # Assuming that Image model has a ForeignKey to a Product model.
-        product_images = Image.objects.filter(product=obj.product)
-        if product_images.exists():
-            return product_images.first().src.url
-        print(product_images)
-        return None
+        return variant_srcset(obj)
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -73,7 +70,9 @@ class ReviewSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Review
-        fields = ["author", "email", "text", "rate"]
+        fields = ["author", "email", "text", "rate", "date"]
+        # Дату ставит сервер в момент создания отзыва
+        read_only_fields = ["date"]
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -83,7 +82,10 @@ class ProductSerializer(serializers.ModelSerializer):
     images = serializers.SerializerMethodField()
 
     tags = TagSerializer(many=True)
+    # Последние отзывы (план загрузки в utils/queries.py), полный список
+    # постранично отдаёт /api/product/<id>/reviews
     reviews = ReviewSerializer(many=True)
+    reviewsCount = serializers.IntegerField(source="reviews_count", read_only=True)
     specifications = SpecificationSerializer(many=True)
 
     class Meta:
@@ -101,33 +103,34 @@ class ProductSerializer(serializers.ModelSerializer):
             "images",
             "tags",
             "reviews",
+            "reviewsCount",
             "specifications",
             "rating",
         ]
 
     def get_images(self, obj):
-        if obj.images.exists():
-            return ImageSerializer(obj.images.all(), many=True).data
+        images = obj.images.all()
+        if images:
+            return ImageSerializer(images, many=True).data
         else:
             return []
 
-    def to_representation(self, instance):
-        data = super().to_representation(instance)
-        data["images"] = self.get_images(instance)
-        return data
-
 
 class ImageCategorySerializer(serializers.ModelSerializer):
     """Сериалайзер для изображений категорий и подкатегорий"""
 
     src = serializers.SerializerMethodField()  # тут возвращаем ссылку на изображение
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = ImageCategory
-        fields = ["src", "alt"]
+        fields = ["src", "srcset", "alt"]
 
     def get_src(self, obj):
-        return obj.src.url
+        return obj.src.url if obj.src else None
+
+    def get_srcset(self, obj):
+        return variant_srcset(obj)
 
 
 class SubCategorySerializer(serializers.ModelSerializer):
@@ -158,19 +161,7 @@ class CategorySerializer(serializers.ModelSerializer):
         Returns:
            list: Список данных о подкатегориях.
         """
-        subcategories = obj.subcategories.all()
-        subcategories_data = []
-        for subcategory in subcategories:
-            subcategory_data = {
-                "id": subcategory.id,
-                "title": subcategory.title,
-                "image": {
-                    "src": subcategory.image.src.url,
-                    "alt": subcategory.image.alt,
-                },
-            }
-            subcategories_data.append(subcategory_data)
-        return subcategories_data
+        return SubCategorySerializer(obj.subcategories.all(), many=True).data
 
 
 class SaleProductSerializer(serializers.ModelSerializer):
@@ -220,6 +211,71 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ["id", "product", "count"]
 
 
+class CartLineSerializer(serializers.ModelSerializer):
+    """
+    Компактный сериализатор строки корзины: только то, что показывает
+    страница корзины. Ожидает продукты из Cart.lines().
+    """
+
+    count = serializers.IntegerField(source="cart_count")
+    images = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ["id", "title", "price", "count", "images"]
+
+    def get_images(self, obj):
+        if not obj.image_src:
+            return []
+        return [{"src": default_storage.url(obj.image_src), "alt": obj.image_alt}]
+
+
+class CartOperationSerializer(serializers.Serializer):
+    """Одна операция пакетного изменения корзины."""
+
+    op = serializers.ChoiceField(choices=["add", "set", "remove"], default="add")
+    id = serializers.IntegerField(min_value=1)
+    count = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, attrs):
+        if attrs["op"] != "remove" and "count" not in attrs:
+            raise serializers.ValidationError({"count": "This field is required."})
+        if attrs["op"] == "add" and attrs["count"] < 1:
+            raise serializers.ValidationError(
+                {"count": "Ensure this value is greater than or equal to 1."}
+            )
+        return attrs
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Пакет операций с корзиной. Товары проверяются одним запросом.
+    """
+
+    max_operations = 200
+
+    operations = CartOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, operations):
+        if len(operations) > self.max_operations:
+            raise serializers.ValidationError(
+                f"No more than {self.max_operations} operations per request."
+            )
+        ids = {operation["id"] for operation in operations}
+        found = set(Product.objects.filter(id__in=ids).values_list("id", flat=True))
+        missing = sorted(ids - found)
+        if missing:
+            raise serializers.ValidationError(f"Products not found: {missing}")
+        return operations
+
+
+class CartTotalsSerializer(serializers.Serializer):
+    """Итоги корзины из Cart.get_totals()."""
+
+    totalCount = serializers.IntegerField()
+    totalPrice = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
 class BannerSerializer(serializers.ModelSerializer):
     """
     Сериализатор для баннеров.
@@ -262,14 +318,13 @@ class BannerSerializer(serializers.ModelSerializer):
         """
         Получить идентификатор категории продукта.
         """
-        return obj.product.category.id
+        return obj.product.category_id
 
     def get_images(self, obj):
         """
         Получить изображения продукта.
         """
-        images = obj.product.images.all()
-        return [{"src": image.src.url, "alt": image.alt} for image in images]
+        return ImageSerializer(obj.product.images.all(), many=True).data
 
     def get_tags(self, obj):
         """
@@ -282,4 +337,4 @@ class BannerSerializer(serializers.ModelSerializer):
         """
         Получить количество отзывов о продукте.
         """
-        return obj.product.reviews.count()
+        return obj.product.reviews_count
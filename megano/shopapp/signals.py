@@ -0,0 +1,284 @@
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from .models import (
+    Banner,
+    Category,
+    Image,
+    ImageCategory,
+    Product,
+    Review,
+    Sale,
+    Specification,
+    SubCategory,
+    Tag,
+)
+from .utils.cache_versions import bump_version
+from .utils.category_tree import CATEGORY_TREE_VERSION
+from .utils.counts import CATALOG_COUNT_VERSION
+from .utils.images import schedule_variants
+from .utils.product_cache import invalidate_product_documents
+from .utils.ratings import apply_review_delta
+from .utils.response_cache import PRODUCT_RESPONSE_GROUPS, invalidate_responses
+from .utils.search import get_search_backend
+from .utils.suggest import SUGGEST_VERSION
+
+
+def products_changed(product_ids) -> None:
+    """
+    Сообщает, что данные продуктов изменились, и после коммита транзакции
+    обновляет всё, что построено поверх них.
+
+    Вызывается из обработчиков сигналов ниже, а также вручную там, где
+    продукты меняются через QuerySet.update() и сигналы не отправляются.
+    Args:
+        product_ids: Идентификаторы изменившихся продуктов.
+    """
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if not product_ids:
+        return
+    transaction.on_commit(lambda: _refresh_products(product_ids))
+
+
+def stock_changed(product_ids) -> None:
+    """
+    Сообщает, что у продуктов изменились только остатки (count, sales_count).
+
+    Остатки не влияют ни на количество товаров каталога, ни на поисковый
+    индекс, поэтому после коммита сбрасываются только документы продуктов
+    и закэшированные ответы с продуктами.
+    Args:
+        product_ids: Идентификаторы изменившихся продуктов.
+    """
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if product_ids:
+        transaction.on_commit(lambda: _refresh_stock(product_ids))
+
+
+def reviews_changed(product_ids) -> None:
+    """
+    Сообщает, что у продуктов изменились отзывы.
+
+    Отзывы не входят в поисковый индекс и подсказки, а счётчик и рейтинг
+    хранятся в самом продукте, поэтому после коммита сбрасываются только
+    документы продуктов и закэшированные ответы.
+    Args:
+        product_ids: Идентификаторы изменившихся продуктов.
+    """
+    product_ids = {pk for pk in product_ids if pk is not None}
+    if product_ids:
+        transaction.on_commit(lambda: _refresh_stock(product_ids))
+
+
+def _refresh_stock(product_ids) -> None:
+    invalidate_product_documents(product_ids)
+    invalidate_responses(*PRODUCT_RESPONSE_GROUPS)
+
+
+def _refresh_products(product_ids) -> None:
+    invalidate_product_documents(product_ids)
+    get_search_backend().index_products(product_ids)
+    bump_version(CATALOG_COUNT_VERSION)
+    invalidate_responses(*PRODUCT_RESPONSE_GROUPS)
+
+
+def suggestions_changed() -> None:
+    """
+    После коммита перестраивает индекс подсказок. Вызывается только когда
+    меняются названия продуктов, тегов или категорий: остальные изменения
+    продуктов на подсказки не влияют.
+    """
+    transaction.on_commit(lambda: bump_version(SUGGEST_VERSION))
+
+
+def _related_product_ids(instance, action, pk_set):
+    """
+    Возвращает идентификаторы продуктов, затронутых изменением M2M-связи
+    между продуктом и тегом или спецификацией.
+    """
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return []
+    if isinstance(instance, Product):
+        return [instance.pk]
+    if pk_set:
+        return list(pk_set)
+    return list(instance.product.values_list("pk", flat=True))
+
+
+@receiver(pre_save, sender=Product)
+def product_before_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Запоминаем прежнее название: только от него у продукта зависят подсказки
+    instance._stored_title = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is not None and "title" not in update_fields:
+        return
+    instance._stored_title = (
+        Product.objects.filter(pk=instance.pk).values_list("title", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    products_changed([instance.pk])
+    stored_title = getattr(instance, "_stored_title", None)
+    if created or (stored_title is not None and stored_title != instance.title):
+        suggestions_changed()
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    products_changed([instance.pk])
+    suggestions_changed()
+
+
+@receiver(pre_save, sender=Review)
+def review_before_save(sender, instance, raw=False, **kwargs):
+    # Запоминаем прежние продукт и оценку, чтобы при правке отзыва
+    # поправить счётчики продукта на разницу
+    instance._stored_review = None
+    if not raw and not instance._state.adding:
+        instance._stored_review = (
+            Review.objects.filter(pk=instance.pk)
+            .values_list("product_id", "rate")
+            .first()
+        )
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    rate = instance.rate or 0
+    stored = getattr(instance, "_stored_review", None)
+    if created or stored is None:
+        apply_review_delta(instance.product_id, 1, rate)
+        reviews_changed([instance.product_id])
+        return
+    old_product_id, old_rate = stored
+    if old_product_id == instance.product_id:
+        apply_review_delta(instance.product_id, 0, rate - (old_rate or 0))
+    else:
+        apply_review_delta(old_product_id, -1, -(old_rate or 0))
+        apply_review_delta(instance.product_id, 1, rate)
+    reviews_changed([old_product_id, instance.product_id])
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    apply_review_delta(instance.product_id, -1, -(instance.rate or 0))
+    reviews_changed([instance.product_id])
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+@receiver(post_save, sender=Sale)
+@receiver(post_delete, sender=Sale)
+def product_relation_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        products_changed([instance.product_id])
+
+
+@receiver(post_save, sender=Image)
+def product_image_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "src" not in update_fields):
+        return
+    product_id = instance.product_id
+    schedule_variants(instance, on_ready=lambda: products_changed([product_id]))
+
+
+@receiver(post_save, sender=ImageCategory)
+def category_image_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and "src" not in update_fields):
+        return
+    schedule_variants(instance, on_ready=category_images_changed)
+
+
+def category_images_changed() -> None:
+    """Сбрасывает дерево категорий после появления новых копий изображений."""
+    bump_version(CATEGORY_TREE_VERSION)
+    invalidate_responses("categories")
+
+
+@receiver(m2m_changed, sender=Tag.product.through)
+def tag_products_changed(sender, instance, action, pk_set, **kwargs):
+    products_changed(_related_product_ids(instance, action, pk_set))
+
+
+@receiver(m2m_changed, sender=Specification.product.through)
+def specification_products_changed(sender, instance, action, pk_set, **kwargs):
+    products_changed(_related_product_ids(instance, action, pk_set))
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        # Название тега входит в поисковый индекс продуктов
+        products_changed(instance.product.values_list("pk", flat=True))
+    suggestions_changed()
+
+
+@receiver(post_save, sender=Specification)
+def specification_saved(sender, instance, created, raw=False, **kwargs):
+    # У новой характеристики ещё нет продуктов: их добавит m2m_changed.
+    # Удаление обрабатывает product_attribute_deleted до того, как пропадут связи
+    if not raw and not created:
+        products_changed(instance.product.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Tag)
+def suggest_source_changed(sender, raw=False, **kwargs):
+    if not raw:
+        suggestions_changed()
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Specification)
+def product_attribute_deleted(sender, instance, **kwargs):
+    products_changed(instance.product.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=Category.subcategories.through)
+def category_subcategories_changed(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        if isinstance(instance, Category):
+            products_changed(instance.product.values_list("pk", flat=True))
+        else:
+            products_changed(
+                Product.objects.filter(category__subcategories=instance).values_list(
+                    "pk", flat=True
+                )
+            )
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def banner_changed(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: invalidate_responses("banners"))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=SubCategory)
+@receiver(post_delete, sender=SubCategory)
+@receiver(post_save, sender=ImageCategory)
+@receiver(post_delete, sender=ImageCategory)
+@receiver(m2m_changed, sender=Category.subcategories.through)
+def category_tree_changed(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: bump_version(CATEGORY_TREE_VERSION))
+        transaction.on_commit(lambda: invalidate_responses("categories"))
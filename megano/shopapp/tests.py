@@ -1,3 +1,672 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.http import QueryDict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from myauth.models import Profile
+from .models import Image as ProductImage
+from .models import (
+    Banner,
+    CartItem,
+    Category,
+    ImageCategory,
+    Product,
+    Review,
+    Sale,
+    SubCategory,
+    Tag,
+)
+from .signals import stock_changed
+from .utils.category_tree import get_category_tree
+from .utils.counts import normalize_catalog_filters
+from .utils.ratings import reconcile_review_stats, review_rating
+from .utils.resize import ImageResizer
+
+
+def create_products(count: int) -> list:
+    """Создаёт count продуктов в одной категории."""
+    image = ImageCategory.objects.create(src="category_image/test.png", alt="test")
+    category = Category.objects.create(title="Category", image=image)
+    return [
+        Product.objects.create(
+            category=category,
+            price=100 + index,
+            count=10,
+            date=timezone.now(),
+            title=f"Product {index}",
+        )
+        for index in range(count)
+    ]
+
+
+class CartStorageTestCase(TestCase):
+    """Корзина в таблице CartItem: запись, проверка ввода, перенос и объединение."""
+
+    def setUp(self):
+        self.first, self.second = create_products(2)
+        self.url = reverse("shopapp:basket")
+
+    def add(self, product_id, count):
+        return self.client.post(
+            self.url,
+            {"id": product_id, "count": count},
+            content_type="application/json",
+        )
+
+    def counts(self, **owner) -> dict:
+        return dict(CartItem.objects.filter(**owner).values_list("product_id", "count"))
+
+    def test_add_accumulates_and_touches_updated_at(self):
+        self.assertEqual(self.add(self.first.id, 2).status_code, 200)
+        item = CartItem.objects.get(product=self.first)
+        self.assertEqual(self.add(self.first.id, 3).status_code, 200)
+        updated = CartItem.objects.get(pk=item.pk)
+        self.assertEqual(updated.count, 5)
+        self.assertGreater(updated.updated_at, item.updated_at)
+
+    def test_invalid_count_is_rejected(self):
+        for count in ("abc", -1, 0, None):
+            with self.subTest(count=count):
+                self.assertEqual(self.add(self.first.id, count).status_code, 400)
+        self.assertEqual(self.add("abc", 1).status_code, 400)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_unknown_product_is_not_found(self):
+        self.assertEqual(self.add(self.second.id + 100, 1).status_code, 404)
+        response = self.client.delete(
+            self.url, {"id": self.second.id + 100}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(CartItem.objects.exists())
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_basket_requests_stay_within_query_budget(self):
+        # При превышении бюджета QueryMetricsMiddleware бросает QueryBudgetExceeded
+        self.assertEqual(self.add(self.first.id, 1).status_code, 200)
+        self.assertEqual(self.add(self.first.id, 1).status_code, 200)
+        self.assertEqual(self.add(self.second.id, 1).status_code, 200)
+        self.assertEqual(self.client.get(self.url, {"totals": "true"}).status_code, 200)
+        response = self.client.delete(
+            self.url, {"id": self.second.id}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        user = User.objects.create_user(username="buyer", password="secret")
+        Profile.objects.create(user=user, fullName="Buyer")
+        self.client.force_login(user)
+        self.assertEqual(self.add(self.second.id, 1).status_code, 200)
+        self.assertEqual(self.add(self.second.id, 1).status_code, 200)
+        self.assertEqual(self.counts(profile__user=user), {self.second.id: 2})
+
+    def test_session_cart_is_imported_on_first_access(self):
+        session = self.client.session
+        session[settings.CART_SESSION_ID] = {
+            str(self.first.id): {"count": 2},
+            str(self.second.id + 100): {"count": 1},
+        }
+        session.save()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(line["id"], line["count"]) for line in response.json()],
+            [(self.first.id, 2)],
+        )
+        self.assertNotIn(settings.CART_SESSION_ID, self.client.session)
+        self.assertEqual(self.counts(), {self.first.id: 2})
+
+    def test_anonymous_cart_is_merged_on_sign_in(self):
+        user = User.objects.create_user(username="buyer", password="secret")
+        profile = Profile.objects.create(user=user, fullName="Buyer")
+        CartItem.objects.create(profile=profile, product=self.first, count=3)
+        before = CartItem.objects.get(profile=profile).updated_at
+        self.add(self.first.id, 2)
+        self.add(self.second.id, 1)
+
+        response = self.client.post(
+            reverse("myauth:login"),
+            json.dumps({"username": "buyer", "password": "secret"}),
+            content_type="application/x-www-form-urlencoded",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            self.counts(profile=profile), {self.first.id: 5, self.second.id: 1}
+        )
+        self.assertFalse(CartItem.objects.filter(profile__isnull=True).exists())
+        merged = CartItem.objects.get(profile=profile, product=self.first)
+        self.assertGreater(merged.updated_at, before)
+
+
+def encode_cursor(position) -> str:
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+class CatalogCursorTestCase(TestCase):
+    """Keyset-пагинация каталога по ?cursor=."""
+
+    def setUp(self):
+        self.products = create_products(5)
+        self.url = reverse("shopapp:catalog")
+
+    def get(self, **params):
+        return self.client.get(self.url, {"sort": "price", "limit": 2, **params})
+
+    def test_cursors_walk_all_pages_in_order(self):
+        ids, cursor, pages = [], "", []
+        while cursor is not None:
+            data = self.get(cursor=cursor).json()
+            pages.append(data)
+            ids.extend(item["id"] for item in data["items"])
+            cursor = data["nextCursor"]
+        self.assertEqual(ids, [product.id for product in self.products])
+        self.assertEqual([page["currentPage"] for page in pages], [1, 2, 3])
+
+        previous = self.get(cursor=pages[2]["prevCursor"]).json()
+        self.assertEqual(previous["items"], pages[1]["items"])
+        self.assertEqual(previous["currentPage"], 2)
+
+    def test_rating_and_reviews_sorts_walk_product_stats(self):
+        first, second, third = self.products[:3]
+        for index, (product, rate) in enumerate(
+            [(first, 3), (second, 5), (second, 4), (third, 4)]
+        ):
+            Review.objects.create(
+                product=product, email=f"buyer{index}@example.com", rate=rate
+            )
+        expected = {
+            "rating": [second.id, third.id, first.id],
+            "reviews": [second.id, third.id, first.id],
+        }
+        for sort, ids in expected.items():
+            with self.subTest(sort=sort):
+                data = self.get(sort=sort, sortType="dec", cursor="").json()
+                following = self.get(
+                    sort=sort, sortType="dec", cursor=data["nextCursor"]
+                ).json()
+                items = data["items"] + following["items"]
+                self.assertEqual([item["id"] for item in items][:3], ids)
+
+    def test_tampered_cursor_is_not_found(self):
+        position = {"v": "100.00", "pk": self.products[0].id, "p": 2, "r": False}
+        cursors = [
+            "eyJwayI6MSwicCI6MX0=",  # без v и r
+            "not a cursor",
+            encode_cursor([1, 2]),
+            encode_cursor({**position, "p": 0}),
+            encode_cursor({**position, "pk": "x"}),
+            encode_cursor({**position, "r": "yes"}),
+            encode_cursor({**position, "v": {"$gt": 1}}),
+            encode_cursor({**position, "v": "cheap"}),
+            encode_cursor({**position, "extra": 1}),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.get(cursor=cursor).status_code, 404)
+        self.assertEqual(self.get(cursor=encode_cursor(position)).status_code, 200)
+
+
+class CatalogCountCacheTestCase(TestCase):
+    """Кэширование количества товаров каталога (CachedCountPaginator)."""
+
+    def setUp(self):
+        cache.clear()
+        self.products = create_products(3)
+        self.url = reverse("shopapp:catalog")
+
+    def last_page(self, **params):
+        """Номер последней страницы при limit=1, то есть количество товаров."""
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(self.url, {"limit": 1, **params}).json()
+        counts = [q["sql"] for q in queries if "COUNT(" in q["sql"].upper()]
+        return data["lastPage"], counts
+
+    def test_equivalent_filters_share_cache_key(self):
+        first = QueryDict(
+            "filter[name]=Product&filter[available]=true&tags[]=2&tags[]=1"
+            "&sort=price&currentPage=2"
+        )
+        second = QueryDict(
+            "tags[]=1&filter[available]=true&tags[]=2&tags[]=1&currentPage=1"
+            "&filter[name]= product &filter[freeDelivery]=false&sort=rating"
+        )
+        self.assertEqual(
+            normalize_catalog_filters(first), normalize_catalog_filters(second)
+        )
+        self.assertNotEqual(
+            normalize_catalog_filters(first),
+            normalize_catalog_filters(QueryDict("filter[name]=product")),
+        )
+
+    def test_repeat_request_does_not_count(self):
+        self.assertEqual(self.last_page(sort="price")[0], 3)
+        last_page, counts = self.last_page(sort="rating", currentPage=2)
+        self.assertEqual(last_page, 3)
+        self.assertEqual(counts, [])
+
+    def test_product_create_and_delete_invalidate_count(self):
+        self.assertEqual(self.last_page()[0], 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            extra = Product.objects.create(
+                category=self.products[0].category,
+                price=50,
+                count=10,
+                date=timezone.now(),
+                title="Extra",
+            )
+        last_page, counts = self.last_page()
+        self.assertEqual(last_page, 4)
+        self.assertEqual(len(counts), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            extra.delete()
+        self.assertEqual(self.last_page()[0], 3)
+
+
+class ResponseCacheTestCase(TestCase):
+    """Кэширование готовых ответов (CachedResponseMixin) и ETag."""
+
+    def setUp(self):
+        cache.clear()
+        self.products = create_products(2)
+        self.banner = Banner.objects.create(product=self.products[0])
+
+    def test_matching_etag_returns_not_modified_without_queries(self):
+        for name in ("banners", "categories"):
+            with self.subTest(name=name):
+                url = reverse(f"shopapp:{name}")
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response["ETag"]
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+                self.assertEqual(response.status_code, 200)
+
+    def test_banner_write_refreshes_response(self):
+        url = reverse("shopapp:banners")
+        first = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Banner.objects.create(product=self.products[1])
+        second = self.client.get(url)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(len(second.json()), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.banner.delete()
+        third = self.client.get(url, HTTP_IF_NONE_MATCH=second["ETag"])
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(
+            [banner["id"] for banner in third.json()], [self.products[1].id]
+        )
+
+    def test_category_write_refreshes_response(self):
+        url = reverse("shopapp:categories")
+        category = self.products[0].category
+        first = self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            category.title = "Renamed"
+            category.save()
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertEqual(second.json()[0]["title"], "Renamed")
+
+
+class ProductDocumentCacheTestCase(TestCase):
+    """Кэш документов продуктов (product_cache)."""
+
+    def setUp(self):
+        cache.clear()
+        (self.product,) = create_products(1)
+        self.url = reverse("shopapp:product-details", args=[self.product.id])
+
+    def get(self) -> dict:
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cache_hit_runs_no_queries(self):
+        document = self.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(), document)
+
+    def test_changes_serve_fresh_document(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.title = "Renamed"
+            self.product.save()
+        self.assertEqual(self.get()["title"], "Renamed")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(
+                product=self.product, email="buyer@example.com", rate=4
+            )
+        document = self.get()
+        self.assertEqual(document["reviewsCount"], 1)
+        self.assertEqual(len(document["reviews"]), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(id=self.product.id).update(count=3)
+            stock_changed([self.product.id])
+        self.assertEqual(self.get()["count"], 3)
+
+
+class SuggestIndexTestCase(TestCase):
+    """Индекс подсказок перестраивается только при смене названий."""
+
+    def setUp(self):
+        cache.clear()
+        (self.product,) = create_products(1)
+        self.url = reverse("shopapp:catalog-suggest")
+
+    def titles(self, query: str) -> list:
+        response = self.client.get(self.url, {"q": query})
+        return [item["title"] for item in response.json()]
+
+    def test_rename_rebuilds_index(self):
+        self.assertEqual(self.titles("product"), ["Product 0"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles("product"), ["Product 0"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 1
+            self.product.save()
+        with self.assertNumQueries(0):
+            self.titles("product")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.title = "Lamp"
+            self.product.save()
+        self.assertEqual(self.titles("product"), [])
+        self.assertEqual(self.titles("lam"), ["Lamp"])
+
+
+class CategoryTreeTestCase(TestCase):
+    """Дерево категорий в памяти процесса и его сброс сигналами."""
+
+    def setUp(self):
+        cache.clear()
+        self.image = ImageCategory.objects.create(src="category_image/a.png", alt="a")
+        self.category = Category.objects.create(title="Category", image=self.image)
+        self.subcategory = SubCategory.objects.create(title="Sub", image=self.image)
+
+    def subcategories(self) -> list:
+        (category,) = get_category_tree()
+        return [item["title"] for item in category["subcategories"]]
+
+    def test_tree_is_rebuilt_after_changes(self):
+        self.assertEqual(self.subcategories(), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.subcategories(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.subcategories.add(self.subcategory)
+        self.assertEqual(self.subcategories(), ["Sub"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subcategory.title = "Renamed"
+            self.subcategory.save()
+        self.assertEqual(self.subcategories(), ["Renamed"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.title = "Menu"
+            self.category.save()
+        self.assertEqual(get_category_tree()[0]["title"], "Menu")
+        with self.assertNumQueries(0):
+            get_category_tree()
+
+
+class ReviewStatsTestCase(TestCase):
+    """Количество отзывов и рейтинг продукта, которые поддерживают сигналы отзывов."""
+
+    def setUp(self):
+        self.first, self.second = create_products(2)
+
+    def stats(self, product) -> tuple:
+        product.refresh_from_db()
+        return product.reviews_count, product.rating_sum, product.rating
+
+    def review(self, product, rate, email):
+        return Review.objects.create(
+            product=product, author="Buyer", email=email, text="text", rate=rate
+        )
+
+    def test_create_edit_and_delete_adjust_stats(self):
+        first = self.review(self.first, 5, "first@example.com")
+        second = self.review(self.first, 2, "second@example.com")
+        self.assertEqual(self.stats(self.first), (2, 7, Decimal("3.5")))
+
+        second.rate = 4
+        second.save()
+        self.assertEqual(self.stats(self.first), (2, 9, Decimal("4.5")))
+
+        first.delete()
+        self.assertEqual(self.stats(self.first), (1, 4, Decimal("4.0")))
+        second.delete()
+        self.assertEqual(self.stats(self.first), (0, 0, Decimal("0.0")))
+
+    def test_rating_rounds_half_up_like_review_rating(self):
+        # 17 оценок 1 и 3 оценки 2: среднее 1.15 округляется до 1.2
+        reviews = [
+            self.review(self.first, 2 if index < 3 else 1, f"{index}@example.com")
+            for index in range(20)
+        ]
+        self.assertEqual(self.stats(self.first), (20, 23, Decimal("1.2")))
+        self.assertEqual(review_rating(20, 23), Decimal("1.2"))
+
+        reviews[0].delete()
+        self.assertEqual(self.stats(self.first), (19, 21, Decimal("1.1")))
+        self.assertEqual(reconcile_review_stats(), [])
+
+    def test_moving_review_to_another_product(self):
+        review = self.review(self.first, 3, "buyer@example.com")
+        review.product = self.second
+        review.rate = 5
+        review.save()
+
+        self.assertEqual(self.stats(self.first), (0, 0, Decimal("0.0")))
+        self.assertEqual(self.stats(self.second), (1, 5, Decimal("5.0")))
+        self.assertEqual(reconcile_review_stats(), [])
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_review_endpoint_updates_stats(self):
+        self.client.force_login(User.objects.create_user(username="buyer"))
+        url = reverse("shopapp:product-review", kwargs={"id": self.first.id})
+        for index, rate in enumerate([4, 5]):
+            response = self.client.post(
+                url,
+                {"author": "Buyer", "email": f"{index}@example.com", "rate": rate},
+                content_type="application/json",
+            )
+            self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stats(self.first), (2, 9, Decimal("4.5")))
+        self.assertEqual(self.client.get(url).json()["count"], 2)
+
+    @override_settings(QUERY_BUDGET_STRICT=True, PRODUCT_REVIEWS_PREVIEW=2)
+    def test_product_shows_latest_reviews_of_each_product(self):
+        now = timezone.now()
+        for product in (self.first, self.second):
+            for days in range(3):
+                Review.objects.create(
+                    product=product,
+                    email=f"{product.id}-{days}@example.com",
+                    rate=3,
+                    date=now - timedelta(days=days),
+                )
+
+        for product in (self.first, self.second):
+            response = self.client.get(
+                reverse("shopapp:product-details", kwargs={"id": product.id})
+            )
+            self.assertEqual(
+                [review["email"] for review in response.json()["reviews"]],
+                [f"{product.id}-0@example.com", f"{product.id}-1@example.com"],
+            )
+        items = self.client.get(reverse("shopapp:catalog")).json()["items"]
+        self.assertEqual([len(item["reviews"]) for item in items], [2, 2])
+
+    def test_reconcile_repairs_bulk_writes(self):
+        Review.objects.bulk_create(
+            [Review(product=self.first, email="bulk@example.com", rate=2)]
+        )
+        self.assertEqual(self.stats(self.first), (0, 0, Decimal("0.0")))
+
+        self.assertEqual(reconcile_review_stats(), [self.first.id])
+        self.assertEqual(self.stats(self.first), (1, 2, Decimal("2.0")))
+
+
+class ImageResizeTestCase(TestCase):
+    """Уменьшенные копии из MEDIA_ROOT: путь внутри MEDIA_ROOT, ETag и 304."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        root = Path(directory.name)
+        media = root / "media"
+        (media / "products").mkdir(parents=True)
+        Image.new("RGB", (400, 300), "red").save(media / "products/photo.jpg")
+        Image.new("RGB", (10, 10), "blue").save(root / "secret.png")
+
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        resizer = ImageResizer(root / "cache", max_cache_size=10**6, workers=1)
+        self.addCleanup(resizer._executor.shutdown)
+        patcher = mock.patch("shopapp.media_views.get_resizer", return_value=resizer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, path, **headers):
+        return self.client.get(f"/media/resize/100x100/{path}", **headers)
+
+    def test_resized_copy_is_revalidated_by_etag(self):
+        response = self.get("products/photo.jpg")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        with Image.open(io.BytesIO(b"".join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (100, 75))
+
+        cached = self.get("products/photo.jpg", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        stale = self.get("products/photo.jpg", HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        stale.close()
+
+    def test_path_outside_media_root_is_rejected(self):
+        for path in ("../secret.png", "products/../../secret.png", "%2e%2e/secret.png"):
+            with self.subTest(path=path), self.assertLogs("django.security", "ERROR"):
+                self.assertEqual(self.get(path).status_code, 400)
+
+    def test_missing_image_and_invalid_size(self):
+        self.assertEqual(self.get("products/missing.jpg").status_code, 404)
+        response = self.client.get("/media/resize/0x100/products/photo.jpg")
+        self.assertEqual(response.status_code, 400)
+
+
+class ImageSrcsetTestCase(TestCase):
+    """Уменьшенные копии изображений в меню категорий и баннерах."""
+
+    variants = [
+        {"name": "variants/a-160.webp", "width": 160, "type": "image/webp"},
+        {"name": "variants/a-320.webp", "width": 320, "type": "image/webp"},
+    ]
+    srcset = [
+        {"src": "/media/variants/a-160.webp", "width": 160, "type": "image/webp"},
+        {"src": "/media/variants/a-320.webp", "width": 320, "type": "image/webp"},
+    ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_categories_and_banners_serve_srcset(self):
+        (product,) = create_products(1)
+        category = product.category
+        image = ImageCategory.objects.create(
+            src="category_image/sub.png", alt="sub", variants=self.variants
+        )
+        category.subcategories.add(SubCategory.objects.create(title="Sub", image=image))
+        ProductImage.objects.create(
+            product=product, src="product_image/a.png", alt="a", variants=self.variants
+        )
+        Banner.objects.create(product=product)
+
+        (menu,) = self.client.get(reverse("shopapp:categories")).json()
+        self.assertEqual(menu["image"]["srcset"], [])
+        self.assertEqual(menu["subcategories"][0]["image"]["srcset"], self.srcset)
+
+        (banner,) = self.client.get(reverse("shopapp:banners")).json()
+        self.assertEqual(
+            banner["images"],
+            [{"src": "/media/product_image/a.png", "srcset": self.srcset, "alt": "a"}],
+        )
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTestCase(TestCase):
+    """Публичные эндпоинты со списками продуктов укладываются в QUERY_BUDGETS."""
+
+    def setUp(self):
+        cache.clear()
+        self.products = create_products(3)
+        tag = Tag.objects.create(name="Tag")
+        today = timezone.now().date()
+        for index, product in enumerate(self.products):
+            product.limited_edition = True
+            product.save()
+            tag.product.add(product)
+            image = ProductImage.objects.create(
+                product=product, src=f"product_image/{index}.png", alt="image"
+            )
+            Review.objects.create(
+                product=product, email=f"buyer{index}@example.com", rate=5
+            )
+            Sale.objects.create(
+                product=product,
+                product_image=image,
+                price=product.price,
+                salePrice=product.price - 10,
+                dateFrom=today,
+                dateTo=today + timedelta(days=7),
+            )
+            Banner.objects.create(product=product)
+
+    def test_product_lists_stay_within_budget(self):
+        first, second = self.products[0].id, self.products[1].id
+        urls = [
+            reverse("shopapp:products-popular"),
+            reverse("shopapp:products-limited"),
+            reverse("shopapp:sale"),
+            reverse("shopapp:banners"),
+            reverse("shopapp:categories"),
+            reverse("shopapp:catalog"),
+            reverse("shopapp:product-details", args=[first]),
+            reverse("shopapp:async-catalog"),
+            reverse("shopapp:async-product-details", args=[second]),
+            reverse("shopapp:async-banners"),
+            reverse("shopapp:async-categories"),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                # При превышении бюджета QueryMetricsMiddleware бросает QueryBudgetExceeded
+                self.assertEqual(self.client.get(url).status_code, 200)
@@ -1,4 +1,10 @@
 from django.urls import path
+from .async_views import (
+    AsyncBannerView,
+    AsyncCatalogView,
+    AsyncCategoryView,
+    AsyncProductDetailView,
+)
 from .views import (
     ProductDetailView,
     ProductReviewCreateView,
@@ -6,10 +12,12 @@ from .views import (
     TagDetailView,
     CategoryAPIView,
     CatalogAPIView,
+    CatalogSuggestAPIView,
     PopularProductsAPIView,
     LimitedProductsAPIView,
     SaleAPIView,
     CartAPIView,
+    CartBatchAPIView,
     BannerList,
 )
 
@@ -29,10 +37,20 @@ urlpatterns = [
     path("tags", TagListView.as_view(), name="tag-list"),
     path("tags/<int:pk>", TagDetailView.as_view(), name="tag-detail"),
     path("basket", CartAPIView.as_view(), name="basket"),
+    path("basket/batch", CartBatchAPIView.as_view(), name="basket-batch"),
     path("categories", CategoryAPIView.as_view(), name="categories"),
     path("catalog", CatalogAPIView.as_view(), name="catalog"),
+    path("catalog/suggest", CatalogSuggestAPIView.as_view(), name="catalog-suggest"),
     path("products/popular", PopularProductsAPIView.as_view(), name="products-popular"),
     path("products/limited", LimitedProductsAPIView.as_view(), name="products-limited"),
     path("sales", SaleAPIView.as_view(), name="sale"),
     path("banners", BannerList.as_view(), name="banners"),
+    path(
+        "async/product/<int:id>",
+        AsyncProductDetailView.as_view(),
+        name="async-product-details",
+    ),
+    path("async/catalog", AsyncCatalogView.as_view(), name="async-catalog"),
+    path("async/categories", AsyncCategoryView.as_view(), name="async-categories"),
+    path("async/banners", AsyncBannerView.as_view(), name="async-banners"),
 ]
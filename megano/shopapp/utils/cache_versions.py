@@ -0,0 +1,49 @@
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY_PREFIX = "version:"
+
+
+def get_version(name: str) -> int:
+    """
+    Возвращает текущую версию набора закэшированных данных.
+
+    Версия входит в ключи кэша, поэтому её увеличение делает все старые
+    записи недоступными без перебора и удаления ключей.
+    Args:
+        name: Имя набора данных (например, "catalog-count").
+    Returns:
+        int: Номер версии.
+    """
+    key = f"{VERSION_KEY_PREFIX}{name}"
+    version = cache.get(key)
+    if version is None:
+        # После вытеснения ключа начинаем с нового значения, а не с 1,
+        # чтобы не попасть на записи, сохранённые со старой версией 1.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(name: str) -> int:
+    """Асинхронный вариант get_version для асинхронных представлений."""
+    key = f"{VERSION_KEY_PREFIX}{name}"
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(name: str) -> None:
+    """
+    Увеличивает версию набора данных, инвалидируя все его записи в кэше.
+    Args:
+        name: Имя набора данных.
+    """
+    key = f"{VERSION_KEY_PREFIX}{name}"
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
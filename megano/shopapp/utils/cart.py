@@ -1,11 +1,354 @@
+from contextlib import contextmanager
 from decimal import Decimal
+
 from django.conf import settings
-from ..models import Product
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Case,
+    DecimalField,
+    F,
+    IntegerField,
+    OuterRef,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models import CartItem, Image, Product
+from .db import acquire_write_lock
+from .queries import with_product_plan
+
+CART_OPERATIONS = ("add", "set", "remove")
+
+
+def ensure_product_exists(product_id) -> None:
+    """
+    Raises:
+        Product.DoesNotExist: Если продукта нет в каталоге.
+    """
+    if not Product.objects.filter(pk=product_id).exists():
+        raise Product.DoesNotExist(product_id)
+
+
+class SessionCartStorage:
+    """
+    Хранение корзины в сессии: словарь "id продукта -> {"count": n}".
+    """
+
+    def __init__(self, request, cart_id=None):
+        """
+        Args:
+            request: Запрос Django.
+            cart_id: Ключ корзины в сессии (по умолчанию CART_SESSION_ID).
+        """
+        self.session = request.session
+        self.cart_id = cart_id or settings.CART_SESSION_ID
+        self.cart = self.session.get(self.cart_id) or {}
+
+    def save(self):
+        """
+        Сохраняет состояние корзины в сессии.
+        """
+        self.session[self.cart_id] = self.cart
+        self.session.modified = True
+
+    def get_counts(self) -> dict:
+        return {
+            int(product_id): item["count"] for product_id, item in self.cart.items()
+        }
+
+    def products(self) -> QuerySet:
+        counts = self.get_counts()
+        if not counts:
+            return Product.objects.none()
+        return Product.objects.filter(id__in=counts).annotate(
+            cart_count=Case(
+                *[When(id=pk, then=Value(count)) for pk, count in counts.items()],
+                output_field=IntegerField(),
+            )
+        )
+
+    def add(self, product_id, count: int) -> None:
+        ensure_product_exists(product_id)
+        item = self.cart.setdefault(str(product_id), {"count": 0})
+        item["count"] += count
+        self.save()
+
+    def set(self, product_id, count: int) -> None:
+        self.cart[str(product_id)] = {"count": count}
+        self.save()
+
+    def remove(self, product_id) -> None:
+        if self.cart.pop(str(product_id), None) is not None:
+            self.save()
+        else:
+            ensure_product_exists(product_id)
+
+    def clear(self) -> None:
+        self.cart = {}
+        self.save()
+
+    @contextmanager
+    def batch(self):
+        counts = self.get_counts()
+        yield counts
+        self.cart = {str(pk): {"count": count} for pk, count in counts.items()}
+        self.save()
+
+    @classmethod
+    def merge(cls, request, session_key) -> None:
+        """Данные сессии переживают вход в систему, объединять нечего."""
+
+
+class DatabaseCartStorage:
+    """
+    Хранение корзины в таблице CartItem.
+
+    Корзина авторизованного покупателя привязана к профилю и доступна
+    с любого устройства, анонимная — к ключу сессии. Изменение количества —
+    это UPDATE одной строки через F(), без перезаписи всей сессии.
+    Корзина, оставшаяся в сессии от SessionCartStorage, переносится в таблицу
+    при первом обращении.
+    """
+
+    # Ключ сессии, который не даёт ей остаться пустой: иначе Django не отправит
+    # cookie и анонимная корзина потеряется
+    session_marker = "cart_storage"
+
+    def __init__(self, request, cart_id=None):
+        self.request = request
+        self.owner = self.get_owner(request)
+        self.cart_id = cart_id or settings.CART_SESSION_ID
+        if request.session.get(self.cart_id):
+            self.import_session_cart()
+
+    def import_session_cart(self) -> None:
+        """
+        Переносит корзину из сессии (формат SessionCartStorage) в таблицу,
+        складывая количества с уже сохранёнными, и удаляет её из сессии.
+        Товары, которых больше нет в каталоге, пропускаются.
+        """
+        session = self.request.session
+        stored = {
+            int(product_id): item["count"]
+            for product_id, item in session[self.cart_id].items()
+        }
+        available = set(
+            Product.objects.filter(id__in=stored).values_list("id", flat=True)
+        )
+        with self.batch() as counts:
+            for product_id, count in stored.items():
+                if product_id in available and count > 0:
+                    counts[product_id] = counts.get(product_id, 0) + count
+        del session[self.cart_id]
+
+    @staticmethod
+    def get_profile(user):
+        if not user.is_authenticated:
+            return None
+        try:
+            return user.profile
+        except ObjectDoesNotExist:
+            return None
+
+    @classmethod
+    def get_owner(cls, request) -> dict:
+        """
+        Условие отбора строк корзины текущего владельца.
+
+        Определяется один раз за запрос и запоминается в нём, чтобы повторные
+        Cart(request) не читали профиль и сессию заново.
+        """
+        owner = getattr(request, "_cart_owner", None)
+        if owner is None:
+            profile = cls.get_profile(request.user)
+            if profile is not None:
+                owner = {"profile": profile}
+            else:
+                owner = {"session_key": request.session.session_key}
+            request._cart_owner = owner
+        return owner
+
+    @property
+    def exists(self) -> bool:
+        """Есть ли у корзины владелец (у анонима без сессии корзины ещё нет)."""
+        return "profile" in self.owner or self.owner["session_key"] is not None
+
+    def ensure_owner(self) -> dict:
+        """
+        Перед записью создаёт сессию анонимному покупателю, если её ещё нет.
+        """
+        if not self.exists:
+            session = self.request.session
+            session[self.session_marker] = "db"
+            session.save()
+            self.owner = {"session_key": session.session_key}
+            self.request._cart_owner = self.owner
+        return self.owner
+
+    def items(self):
+        return CartItem.objects.filter(**self.owner)
+
+    def get_counts(self) -> dict:
+        if not self.exists:
+            return {}
+        return dict(self.items().values_list("product_id", "count"))
+
+    def products(self) -> QuerySet:
+        if not self.exists:
+            return Product.objects.none()
+        count = self.items().filter(product_id=OuterRef("pk")).values("count")[:1]
+        return Product.objects.filter(
+            id__in=self.items().values("product_id")
+        ).annotate(cart_count=Subquery(count))
+
+    def add(self, product_id, count: int) -> None:
+        if not self.exists:
+            # Новая сессия: строк корзины у неё нет и параллельно их никто
+            # не создаёт, поэтому сразу INSERT
+            ensure_product_exists(product_id)
+            owner = self.ensure_owner()
+            CartItem.objects.create(product_id=product_id, count=count, **owner)
+            return
+        owner = self.owner
+        # update() не заполняет auto_now, поэтому updated_at передаём явно
+        updated = (
+            self.items()
+            .filter(product_id=product_id)
+            .update(count=F("count") + count, updated_at=timezone.now())
+        )
+        if updated:
+            return
+        # Продукт проверяется только перед созданием строки: строка корзины
+        # уже ссылается на существующий продукт
+        ensure_product_exists(product_id)
+        try:
+            with transaction.atomic():
+                CartItem.objects.create(product_id=product_id, count=count, **owner)
+        except IntegrityError:
+            # Параллельный запрос успел создать строку — увеличиваем её
+            self.items().filter(product_id=product_id).update(
+                count=F("count") + count, updated_at=timezone.now()
+            )
+
+    def set(self, product_id, count: int) -> None:
+        owner = self.ensure_owner()
+        CartItem.objects.update_or_create(
+            product_id=product_id, defaults={"count": count}, **owner
+        )
+
+    def remove(self, product_id) -> None:
+        deleted = 0
+        if self.exists:
+            deleted, _ = self.items().filter(product_id=product_id).delete()
+        if not deleted:
+            ensure_product_exists(product_id)
+
+    def clear(self) -> None:
+        if self.exists:
+            self.items().delete()
+
+    @contextmanager
+    def batch(self):
+        """
+        Читает корзину с блокировкой строк и после изменений записывает только
+        разницу: удаление, bulk_update и bulk_create в одной транзакции.
+        """
+        owner = self.ensure_owner()
+        with transaction.atomic():
+            acquire_write_lock()
+            rows = {item.product_id: item for item in self.items().select_for_update()}
+            counts = {pk: item.count for pk, item in rows.items()}
+            yield counts
+            removed = [pk for pk in rows if counts.get(pk, 0) <= 0]
+            changed = [
+                rows[pk]
+                for pk, count in counts.items()
+                if pk in rows and count > 0 and rows[pk].count != count
+            ]
+            now = timezone.now()
+            for item in changed:
+                item.count, item.updated_at = counts[item.product_id], now
+            if removed:
+                self.items().filter(product_id__in=removed).delete()
+            if changed:
+                CartItem.objects.bulk_update(changed, ["count", "updated_at"])
+            CartItem.objects.bulk_create(
+                CartItem(product_id=pk, count=count, **owner)
+                for pk, count in counts.items()
+                if pk not in rows and count > 0
+            )
+
+    @classmethod
+    @transaction.atomic
+    def merge(cls, request, session_key) -> None:
+        """
+        Переносит анонимную корзину в корзину вошедшего покупателя.
+
+        Товары, которые уже есть в его корзине, складываются одним UPDATE,
+        остальные строки просто переходят к профилю.
+        Args:
+            request: Запрос после login().
+            session_key: Ключ сессии до входа (login() меняет ключ).
+        """
+        profile = cls.get_profile(request.user)
+        if profile is None or not session_key:
+            return
+        anonymous = dict(
+            CartItem.objects.filter(session_key=session_key).values_list(
+                "product_id", "count"
+            )
+        )
+        if not anonymous:
+            return
+        now = timezone.now()
+        existing = CartItem.objects.filter(profile=profile, product_id__in=anonymous)
+        existing_ids = set(existing.values_list("product_id", flat=True))
+        if existing_ids:
+            existing.update(
+                count=F("count")
+                + Case(
+                    *[
+                        When(product_id=pk, then=Value(anonymous[pk]))
+                        for pk in existing_ids
+                    ],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+                updated_at=now,
+            )
+        CartItem.objects.filter(session_key=session_key).exclude(
+            product_id__in=existing_ids
+        ).update(session_key=None, profile=profile, updated_at=now)
+        CartItem.objects.filter(session_key=session_key).delete()
+
+
+def get_cart_storage_class():
+    """Класс хранилища корзины из настройки CART_STORAGE."""
+    return import_string(settings.CART_STORAGE)
+
+
+def merge_anonymous_cart(request, session_key) -> None:
+    """
+    Объединяет анонимную корзину с корзиной пользователя после входа.
+    Args:
+        request: Запрос после login().
+        session_key: Ключ сессии, сохранённый до login().
+    """
+    get_cart_storage_class().merge(request, session_key)
 
 
 class Cart(object):
     """
     Класс, представляющий корзину покупок пользователя.
+
+    Данные хранит бэкенд из настройки CART_STORAGE
+    (DatabaseCartStorage или SessionCartStorage).
     """
 
     def __init__(self, request, cart_id=None):
@@ -15,13 +358,7 @@ class Cart(object):
         Args:
             request: Запрос Django.
         """
-        self.session = request.session
-        if cart_id:
-            self.cart = self.session.get(cart_id, {})
-        else:
-            self.cart = self.session.get(settings.CART_SESSION_ID, {})
-        if not self.cart:
-            self.cart = self.session[settings.CART_SESSION_ID] = {}
+        self.storage = get_cart_storage_class()(request, cart_id)
 
     def add(self, product_id, count=1):
         """
@@ -30,20 +367,21 @@ class Cart(object):
         Args:
             product_id (int): ID продукта.
             count (int): Количество продукта (по умолчанию 1).
+
+        Raises:
+            Product.DoesNotExist: Если продукта нет в каталоге.
         """
-        product_id = str(product_id)
-        if product_id not in self.cart:
-            self.cart[product_id] = {"count": count}
-        else:
-            self.cart[product_id]["count"] += count
-        self.save()
+        self.storage.add(int(product_id), int(count))
 
-    def save(self):
+    def set(self, product_id, count):
         """
-        Сохраняет состояние корзины в сессии.
+        Устанавливает количество товара в корзине.
+
+        Args:
+            product_id (int): ID продукта.
+            count (int): Новое количество.
         """
-        self.session[settings.CART_SESSION_ID] = self.cart
-        self.session.modified = True
+        self.storage.set(int(product_id), int(count))
 
     def remove(self, product_id):
         """
@@ -51,39 +389,110 @@ class Cart(object):
 
         Args:
             product_id (int): ID продукта.
+
+        Raises:
+            Product.DoesNotExist: Если продукта нет в каталоге.
         """
-        product_id = str(product_id)
-        if product_id in self.cart:
-            del self.cart[product_id]
-            self.save()
+        self.storage.remove(int(product_id))
+
+    def lines(self) -> QuerySet:
+        """
+        Строки корзины для отображения одним запросом: только нужные колонки
+        продукта, количество (cart_count) и первое изображение
+        (image_src, image_alt) подзапросами.
+
+        Returns:
+            QuerySet: Продукты корзины в порядке id.
+        """
+        first_image = Image.objects.filter(product_id=OuterRef("pk")).order_by("pk")
+        return (
+            self.storage.products()
+            .only("id", "title", "price")
+            .annotate(
+                image_src=Subquery(first_image.values("src")[:1]),
+                image_alt=Subquery(first_image.values("alt")[:1]),
+            )
+            .order_by("id")
+        )
+
+    def get_totals(self) -> dict:
+        """
+        Итоги корзины, посчитанные в базе.
+
+        Returns:
+            dict: {"totalCount": количество товаров, "totalPrice": стоимость}.
+        """
+        totals = self.storage.products().aggregate(
+            totalCount=Sum("cart_count"),
+            totalPrice=Sum(
+                F("cart_count") * F("price"),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+        return {
+            "totalCount": totals["totalCount"] or 0,
+            "totalPrice": totals["totalPrice"] or Decimal(0),
+        }
+
+    def apply(self, operations) -> None:
+        """
+        Применяет пакет операций за одну запись в хранилище.
+
+        Операции выполняются по порядку:
+            add — увеличить количество на count;
+            set — установить количество count (0 удаляет товар);
+            remove — уменьшить на count, а без count удалить товар.
+        Args:
+            operations: Список словарей {"op", "id", "count"}.
+        """
+        with self.storage.batch() as counts:
+            for operation in operations:
+                product_id, count = operation["id"], operation.get("count")
+                if operation["op"] == "add":
+                    counts[product_id] = counts.get(product_id, 0) + count
+                elif operation["op"] == "set":
+                    counts[product_id] = count
+                elif count is None:
+                    counts.pop(product_id, None)
+                else:
+                    counts[product_id] = counts.get(product_id, 0) - count
+                if counts.get(product_id, 1) <= 0:
+                    counts.pop(product_id)
 
     def __iter__(self):
         """
         Возвращает итератор для товаров в корзине.
         """
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
+        counts = self.get_counts()
+        products = with_product_plan(Product.objects.filter(id__in=counts))
         for product in products:
-            self.cart[str(product.id)]["product"] = product
-        for item in self.cart.values():
-            yield item
+            yield {"product": product, "count": counts[product.id]}
 
     def __len__(self):
         """
         Возвращает общее количество товаров в корзине.
         """
-        return sum(item["count"] for item in self.cart.values())
+        return sum(self.get_counts().values())
+
+    def get_counts(self) -> dict:
+        """
+        Возвращает количество каждого товара в корзине без загрузки продуктов.
+
+        Returns:
+            dict: Словарь "id продукта -> количество".
+        """
+        return self.storage.get_counts()
 
     def get_total_price(self):
         """
         Возвращает общую стоимость товаров в корзине.
         """
-        return sum(
-            Decimal(item["product"].price) * item["count"]
-            for item in self.cart.values()
-        )
+        counts = self.get_counts()
+        prices = Product.objects.filter(id__in=counts).values_list("id", "price")
+        return sum((Decimal(price) * counts[pk] for pk, price in prices), Decimal(0))
 
     def clear(self):
-        # Elimină toate elementele din coș
-        self.session["cart"] = {}
-        self.session.modified = True
+        """
+        Очищает корзину.
+        """
+        self.storage.clear()
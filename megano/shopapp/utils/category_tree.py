@@ -0,0 +1,63 @@
+import threading
+
+from asgiref.sync import sync_to_async
+from django.db.models import Prefetch
+
+from ..models import Category, SubCategory
+from .cache_versions import aget_version, get_version
+
+CATEGORY_TREE_VERSION = "category-tree"
+
+_tree = None
+_tree_version = None
+_tree_lock = threading.Lock()
+
+
+def build_category_tree() -> list:
+    """
+    Строит дерево категорий с подкатегориями и изображениями за два запроса.
+    Returns:
+        list: Данные в формате CategorySerializer.
+    """
+    from ..serializers import CategorySerializer
+
+    categories = (
+        Category.objects.select_related("image")
+        .prefetch_related(
+            Prefetch(
+                "subcategories",
+                queryset=SubCategory.objects.select_related("image").order_by("id"),
+            )
+        )
+        .order_by("id")
+    )
+    return CategorySerializer(categories, many=True).data
+
+
+def get_category_tree() -> list:
+    """
+    Возвращает дерево категорий из памяти процесса.
+
+    Дерево перестраивается, только когда сигналы об изменении категорий,
+    подкатегорий или их изображений увеличивают версию в кэше, поэтому
+    в обычном режиме меню не стоит ни одного запроса к базе.
+    """
+    global _tree, _tree_version
+    version = get_version(CATEGORY_TREE_VERSION)
+    if _tree is None or _tree_version != version:
+        with _tree_lock:
+            if _tree is None or _tree_version != version:
+                _tree = build_category_tree()
+                _tree_version = version
+    return _tree
+
+
+async def aget_category_tree() -> list:
+    """
+    Асинхронный вариант get_category_tree: актуальное дерево отдаётся
+    без перехода в поток, перестройка выполняется в потоке.
+    """
+    version = await aget_version(CATEGORY_TREE_VERSION)
+    if _tree is not None and _tree_version == version:
+        return _tree
+    return await sync_to_async(get_category_tree)()
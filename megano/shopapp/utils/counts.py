@@ -0,0 +1,138 @@
+import hashlib
+from functools import cached_property
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Max
+
+from .cache_versions import aget_version, get_version
+
+CATALOG_COUNT_VERSION = "catalog-count"
+
+# Параметры запроса, от которых зависит число товаров в выдаче каталога.
+# Сортировка, номер страницы и limit на количество не влияют.
+CATALOG_FILTER_PARAMS = (
+    "category",
+    "subcategory",
+    "filter[name]",
+    "filter[minPrice]",
+    "filter[maxPrice]",
+    "filter[freeDelivery]",
+    "filter[available]",
+)
+
+
+def normalize_catalog_filters(query_params) -> tuple:
+    """
+    Приводит фильтры каталога к каноническому виду, чтобы одинаковые по смыслу
+    запросы давали один ключ кэша.
+    Args:
+        query_params: Параметры запроса.
+    Returns:
+        tuple: Пары (фильтр, значение) только для активных фильтров.
+    """
+    filters = []
+    for param in CATALOG_FILTER_PARAMS:
+        value = (query_params.get(param) or "").strip()
+        if param == "category" and query_params.get("subcategory"):
+            continue  # подкатегория важнее категории, см. filter_by_category
+        if param in ("filter[freeDelivery]", "filter[available]"):
+            value = "true" if value == "true" else ""
+        elif param == "filter[name]":
+            value = value.lower()
+        if value:
+            filters.append((param, value))
+    tags = query_params.getlist("tags[]") or query_params.getlist("tags")
+    if tags:
+        filters.append(("tags", ",".join(sorted(set(tags)))))
+    return tuple(filters)
+
+
+def catalog_count_key(filters: tuple, version=None) -> str:
+    """Ключ кэша для количества товаров с данным набором фильтров."""
+    if version is None:
+        version = get_version(CATALOG_COUNT_VERSION)
+    digest = hashlib.md5(repr(filters).encode()).hexdigest()
+    return f"catalog-count:{version}:{digest}"
+
+
+def estimate_table_count(model) -> int:
+    """
+    Быстро оценивает количество строк в таблице модели без полного сканирования.
+
+    На PostgreSQL берётся статистика планировщика (pg_class.reltuples),
+    на остальных базах — максимальный первичный ключ по индексу.
+    Args:
+        model: Класс модели.
+    Returns:
+        int: Приблизительное количество строк.
+    """
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return row[0]
+    return model.objects.aggregate(estimate=Max("pk"))["estimate"] or 0
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator, который берёт количество объектов из кэша вместо COUNT(*).
+
+    Если фильтры не заданы и таблица больше CATALOG_ESTIMATED_COUNT_THRESHOLD,
+    вместо точного количества используется оценка estimate_table_count.
+    """
+
+    def __init__(self, object_list, per_page, filters=(), **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.filters = filters
+
+    @cached_property
+    def count(self) -> int:
+        key = catalog_count_key(self.filters)
+        count = cache.get(key)
+        if count is not None:
+            return count
+
+        threshold = getattr(settings, "CATALOG_ESTIMATED_COUNT_THRESHOLD", None)
+        count = None
+        if threshold is not None and not self.filters:
+            estimate = estimate_table_count(self.object_list.model)
+            if estimate >= threshold:
+                count = estimate
+        if count is None:
+            count = super().count
+        cache.set(key, count, getattr(settings, "CATALOG_COUNT_CACHE_TIMEOUT", 300))
+        return count
+
+
+async def acached_count(queryset, filters=()) -> int:
+    """
+    Асинхронный вариант CachedCountPaginator.count для асинхронного каталога.
+    Args:
+        queryset: Отфильтрованный QuerySet.
+        filters: Нормализованные фильтры (normalize_catalog_filters).
+    Returns:
+        int: Количество объектов (из кэша, оценка или COUNT(*)).
+    """
+    key = catalog_count_key(filters, await aget_version(CATALOG_COUNT_VERSION))
+    count = await cache.aget(key)
+    if count is not None:
+        return count
+
+    threshold = getattr(settings, "CATALOG_ESTIMATED_COUNT_THRESHOLD", None)
+    if threshold is not None and not filters:
+        estimate = await sync_to_async(estimate_table_count)(queryset.model)
+        if estimate >= threshold:
+            count = estimate
+    if count is None:
+        count = await queryset.acount()
+    await cache.aset(key, count, getattr(settings, "CATALOG_COUNT_CACHE_TIMEOUT", 300))
+    return count
@@ -0,0 +1,18 @@
+from django.db import connection
+
+from ..models import Product
+
+
+def acquire_write_lock() -> None:
+    """
+    На SQLite сразу захватывает блокировку записи текущей транзакции
+    (аналог BEGIN IMMEDIATE, которого нет в Django 4.1).
+
+    Иначе две транзакции, начавшие с чтения, при переходе к записи мешают
+    друг другу, и одна из них сразу падает с "database is locked" вместо
+    ожидания. На остальных базах ничего не делает: там работают блокировки строк.
+    Вызывается внутри transaction.atomic до первого запроса.
+    """
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {Product._meta.db_table} SET id = id WHERE 0")
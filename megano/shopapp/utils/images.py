@@ -0,0 +1,129 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .thumbnails import build_variants
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """
+    Пул процессов для построения вариантов изображений.
+
+    Процессы запускаются через spawn: fork процесса с потоками и открытыми
+    подключениями к базе небезопасен, а build_variants Django не нужен.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS or None,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+    return _executor
+
+
+def variant_arguments(name: str) -> tuple:
+    """Аргументы build_variants для изображения name из настроек."""
+    return (
+        str(settings.MEDIA_ROOT),
+        name,
+        tuple(settings.IMAGE_VARIANT_WIDTHS),
+        tuple(settings.IMAGE_VARIANT_FORMATS),
+        settings.IMAGE_VARIANT_QUALITY,
+    )
+
+
+def schedule_variants(instance, on_ready=None) -> None:
+    """
+    После коммита отправляет построение вариантов изображения в пул процессов,
+    чтобы загрузка не ждала перекодирования.
+
+    Готовый список сохраняется в поле variants, если за это время
+    изображение не заменили.
+    Args:
+        instance: Объект модели с полями src и variants.
+        on_ready: Вызывается после сохранения изменившегося списка вариантов
+            (например, для сброса кэшей).
+    """
+    name = instance.src.name if instance.src else ""
+    if not name:
+        return
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: _submit(model, pk, name, on_ready))
+
+
+def _submit(model, pk, name: str, on_ready) -> None:
+    if not settings.IMAGE_VARIANT_WORKERS:
+        try:
+            variants = build_variants(*variant_arguments(name))
+        except Exception:
+            logger.exception("Failed to build variants of %s", name)
+            return
+        store_variants(model, pk, name, variants, on_ready)
+        return
+    future = get_executor().submit(build_variants, *variant_arguments(name))
+    future.add_done_callback(
+        lambda done: _store_result(model, pk, name, on_ready, done)
+    )
+
+
+def _store_result(model, pk, name: str, on_ready, future) -> None:
+    # Выполняется в служебном потоке пула, а не в потоке запроса
+    try:
+        variants = future.result()
+    except Exception:
+        logger.exception("Failed to build variants of %s", name)
+        return
+    close_old_connections()
+    try:
+        store_variants(model, pk, name, variants, on_ready)
+    except Exception:
+        logger.exception("Failed to store variants of %s", name)
+    finally:
+        close_old_connections()
+
+
+def store_variants(model, pk, name: str, variants: list, on_ready=None) -> bool:
+    """
+    Сохраняет список вариантов, если изображение всё ещё name и список изменился.
+    Returns:
+        bool: Был ли список обновлён.
+    """
+    queryset = model.objects.filter(pk=pk, src=name)
+    current = queryset.values_list("variants", flat=True).first()
+    if current is None or current == variants:
+        return False
+    queryset.update(variants=variants)
+    if on_ready is not None:
+        on_ready()
+    return True
+
+
+def variant_srcset(image) -> list:
+    """
+    Варианты изображения для ответа API (от узкого к широкому).
+    Args:
+        image: Объект модели с полями src и variants.
+    Returns:
+        list: Словари src, width, type.
+    """
+    if image is None or not image.src:
+        return []
+    storage = image.src.storage
+    return [
+        {
+            "src": storage.url(variant["name"]),
+            "width": variant["width"],
+            "type": variant["type"],
+        }
+        for variant in image.variants or ()
+    ]
@@ -0,0 +1,180 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from typing import Optional
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q, QuerySet
+from rest_framework.exceptions import NotFound
+
+
+@dataclass
+class KeysetPage:
+    """Страница, полученная keyset-пагинацией."""
+
+    items: list
+    number: int
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+    @property
+    def last_page(self) -> int:
+        """
+        Номер последней известной страницы для старого фронтенда.
+
+        Точное число страниц потребовало бы COUNT(*), поэтому возвращаем
+        номер следующей страницы, если она есть, иначе текущей.
+        """
+        return self.number + 1 if self.next_cursor else self.number
+
+
+class KeysetPaginator:
+    """
+    Keyset (cursor) пагинация по паре (поле сортировки, первичный ключ).
+
+    Вместо OFFSET следующая страница выбирается условием "после последней строки
+    предыдущей страницы", поэтому глубокие страницы стоят столько же, сколько первая,
+    и COUNT(*) не нужен. NULL в поле сортировки считается наименьшим значением.
+    """
+
+    invalid_cursor_message = "Invalid cursor"
+    # Поля позиции в курсоре: значение поля сортировки, первичный ключ,
+    # номер страницы и направление
+    cursor_keys = frozenset({"v", "pk", "p", "r"})
+
+    def __init__(self, page_size: int, field: Optional[str] = None, descending=False):
+        """
+        Args:
+            page_size: Количество элементов на странице.
+            field: Поле сортировки (можно через связи, например "category__title").
+                Если не указано, сортировка только по первичному ключу.
+            descending: Сортировать ли по убыванию.
+        """
+        self.page_size = page_size
+        self.field = field
+        self.descending = descending
+
+    def encode_cursor(self, item, number: int, reverse: bool) -> str:
+        """Кодирует позицию элемента в непрозрачную строку."""
+        position = {
+            "v": getattr(item, "keyset_value", None) if self.field else None,
+            "pk": item.pk,
+            "p": number,
+            "r": reverse,
+        }
+        # default=str сохраняет Decimal и datetime без потери точности
+        data = json.dumps(position, default=str).encode()
+        return base64.urlsafe_b64encode(data).decode()
+
+    def decode_cursor(self, cursor: str) -> dict:
+        """
+        Декодирует строку курсора и проверяет все поля позиции.
+        Raises:
+            NotFound: Если курсор повреждён или подделан.
+        """
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(position, dict) or position.keys() != self.cursor_keys:
+                raise ValueError(cursor)
+            position["pk"], position["p"] = int(position["pk"]), int(position["p"])
+            if (
+                position["p"] < 1
+                or not isinstance(position["r"], bool)
+                or isinstance(position["v"], (dict, list))
+            ):
+                raise ValueError(cursor)
+        except (binascii.Error, ValueError, TypeError):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _ordering(self, descending: bool) -> list:
+        ordering = []
+        if self.field:
+            expression = F(self.field)
+            ordering.append(
+                expression.desc(nulls_last=True)
+                if descending
+                else expression.asc(nulls_first=True)
+            )
+        ordering.append("-pk" if descending else "pk")
+        return ordering
+
+    def _after(self, value, pk, descending: bool) -> Q:
+        """Условие "строка идёт после (value, pk)" в заданном направлении."""
+        pk_after = Q(pk__lt=pk) if descending else Q(pk__gt=pk)
+        if not self.field:
+            return pk_after
+        field = self.field
+        is_null = Q(**{f"{field}__isnull": True})
+        if value is None:
+            if descending:
+                return is_null & pk_after
+            return (is_null & pk_after) | ~is_null
+        lookup = "lt" if descending else "gt"
+        after = Q(**{f"{field}__{lookup}": value}) | (Q(**{field: value}) & pk_after)
+        if descending:
+            after |= is_null
+        return after
+
+    def paginate(self, queryset: QuerySet, cursor: Optional[str]) -> KeysetPage:
+        """
+        Возвращает страницу после (или перед) позицией из курсора.
+        Args:
+            queryset: Отфильтрованный QuerySet.
+            cursor: Курсор из запроса; пустой курсор означает первую страницу.
+        Returns:
+            KeysetPage: Элементы страницы и курсоры соседних страниц.
+        """
+        queryset, position = self.page_queryset(queryset, cursor)
+        return self.build_page(list(queryset), position)
+
+    async def apaginate(self, queryset: QuerySet, cursor: Optional[str]) -> KeysetPage:
+        """Асинхронный вариант paginate для асинхронных представлений."""
+        queryset, position = self.page_queryset(queryset, cursor)
+        return self.build_page([item async for item in queryset], position)
+
+    def page_queryset(self, queryset: QuerySet, cursor: Optional[str]) -> tuple:
+        """
+        Строит запрос страницы (на один элемент больше, чтобы узнать о следующей).
+        Returns:
+            tuple: (QuerySet страницы, позиция из курсора или None).
+        """
+        if self.field:
+            queryset = queryset.annotate(keyset_value=F(self.field))
+        position = self.decode_cursor(cursor) if cursor else None
+        reverse = bool(position and position["r"])
+        descending = self.descending != reverse
+        queryset = queryset.order_by(*self._ordering(descending))
+        if position:
+            try:
+                queryset = queryset.filter(
+                    self._after(position["v"], position["pk"], descending)
+                )
+            except (ValidationError, ValueError, TypeError):
+                # Значение в курсоре не подходит к типу поля сортировки
+                raise NotFound(self.invalid_cursor_message)
+
+        return queryset[: self.page_size + 1], position
+
+    def build_page(self, items: list, position: Optional[dict]) -> KeysetPage:
+        """Собирает страницу и курсоры по загруженным элементам."""
+        reverse = bool(position and position["r"])
+        has_more = len(items) > self.page_size
+        items = items[: self.page_size]
+        number = position["p"] if position else 1
+
+        if reverse:
+            items.reverse()
+            if not has_more:
+                number = 1
+            has_prev, has_next = has_more, True
+        else:
+            has_prev, has_next = number > 1, has_more
+
+        next_cursor = prev_cursor = None
+        if items and has_next:
+            next_cursor = self.encode_cursor(items[-1], number + 1, reverse=False)
+        if items and has_prev:
+            prev_cursor = self.encode_cursor(items[0], number - 1, reverse=True)
+        return KeysetPage(items, number, next_cursor, prev_cursor)
@@ -0,0 +1,98 @@
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from ..models import Product
+from .cache_versions import aget_version, bump_version, get_version
+from .queries import with_product_plan
+
+
+def product_version_name(product_id: int) -> str:
+    """Имя счётчика версии документа продукта."""
+    return f"product:{product_id}"
+
+
+def product_document_key(product_id: int, version: int) -> str:
+    """Ключ кэша документа продукта с данной версией."""
+    return f"product-document:{product_id}:{version}"
+
+
+def invalidate_product_documents(product_ids) -> None:
+    """Увеличивает версии документов продуктов, старые записи становятся недоступны."""
+    for product_id in product_ids:
+        bump_version(product_version_name(product_id))
+
+
+def build_product_document(product_id: int):
+    """
+    Собирает документ продукта (данные ProductSerializer) из базы.
+    Returns:
+        dict | None: Документ или None, если продукта нет.
+    """
+    from ..serializers import ProductSerializer
+
+    product = with_product_plan(Product.objects.filter(id=product_id)).first()
+    if product is None:
+        return None
+    return ProductSerializer(product).data
+
+
+def get_product_document(product_id: int):
+    """
+    Возвращает документ продукта из кэша, при промахе собирает его.
+
+    Ключ содержит версию продукта, которую увеличивают сигналы об изменении
+    продукта, его изображений, отзывов, тегов, характеристик, скидок и остатков.
+    Защита от лавины запросов: при промахе документ собирает только тот,
+    кто первым взял блокировку через cache.add, остальные ждут его
+    до PRODUCT_CACHE_LOCK_WAIT секунд и только потом собирают сами.
+    Args:
+        product_id: Идентификатор продукта.
+    Returns:
+        dict | None: Документ или None, если продукта нет.
+    """
+    key = product_document_key(
+        product_id, get_version(product_version_name(product_id))
+    )
+    document = cache.get(key)
+    if document is not None:
+        return document
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, settings.PRODUCT_CACHE_LOCK_TIMEOUT):
+        try:
+            return _build_and_store(product_id, key)
+        finally:
+            cache.delete(lock_key)
+
+    deadline = time.monotonic() + settings.PRODUCT_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.02)
+        document = cache.get(key)
+        if document is not None:
+            return document
+        if not cache.get(lock_key):
+            # Блокировку отпустили без документа: продукта нет или сборка упала
+            break
+    return _build_and_store(product_id, key)
+
+
+async def aget_product_document(product_id: int):
+    """
+    Асинхронный вариант get_product_document: попадание в кэш обходится
+    без перехода в поток, сборка при промахе выполняется в потоке.
+    """
+    version = await aget_version(product_version_name(product_id))
+    document = await cache.aget(product_document_key(product_id, version))
+    if document is not None:
+        return document
+    return await sync_to_async(get_product_document)(product_id)
+
+
+def _build_and_store(product_id: int, key: str):
+    document = build_product_document(product_id)
+    if document is not None:
+        cache.set(key, document, settings.PRODUCT_CACHE_TIMEOUT)
+    return document
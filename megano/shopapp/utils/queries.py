@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.db.models import OuterRef, Prefetch, QuerySet, Subquery
+
+from ..models import Banner, Image, Review
+
+# Порядок ленты отзывов: новые первыми
+REVIEW_ORDERING = ("-date", "-id")
+
+
+def _images_prefetch(lookup):
+    return Prefetch(lookup, queryset=Image.objects.order_by("pk"))
+
+
+def _latest_reviews_prefetch(lookup):
+    # Только PRODUCT_REVIEWS_PREVIEW последних отзывов каждого продукта,
+    # остальные отдаёт /api/product/<id>/reviews. Срез внутри Prefetch появился
+    # только в Django 4.2, поэтому последние отзывы выбирает коррелированный
+    # подзапрос с LIMIT по индексу review_product_date_idx
+    latest = Review.objects.filter(product_id=OuterRef("product_id")).order_by(
+        *REVIEW_ORDERING
+    )
+    queryset = Review.objects.filter(
+        id__in=Subquery(latest.values("id")[: settings.PRODUCT_REVIEWS_PREVIEW])
+    ).order_by(*REVIEW_ORDERING)
+    return Prefetch(lookup, queryset=queryset)
+
+
+# Какие связи нужно подгрузить для каждого поля, которое отдаёт ProductSerializer.
+# Поля, которых нет в словаре (id, price, category и т.п.), читаются из самой строки
+# продукта: category сериализуется как PrimaryKeyRelatedField и берёт category_id.
+PRODUCT_FIELD_PLAN = {
+    "images": [_images_prefetch],
+    "tags": ["tags"],
+    "reviews": [_latest_reviews_prefetch],
+    "specifications": ["specifications"],
+}
+
+
+def get_serializer_fields(serializer_class) -> list:
+    """
+    Возвращает список полей, которые сериализатор отдаёт в ответе.
+    Args:
+        serializer_class: Класс сериализатора.
+    Returns:
+        list: Имена полей из Meta.fields.
+    """
+    return list(getattr(serializer_class.Meta, "fields", []))
+
+
+def build_prefetch_plan(fields, plan=PRODUCT_FIELD_PLAN, prefix: str = "") -> list:
+    """
+    Строит список lookup-ов для prefetch_related по полям сериализатора.
+    Args:
+        fields: Поля, которые будут сериализованы.
+        plan: Словарь "поле -> список lookup-ов" для модели.
+        prefix: Путь до модели, если она вложена (например, "product__").
+    Returns:
+        list: Строки и объекты Prefetch для prefetch_related.
+    """
+    lookups = []
+    for field in fields:
+        for lookup in plan.get(field, []):
+            if callable(lookup):
+                lookups.append(lookup(f"{prefix}{field}"))
+            else:
+                lookups.append(f"{prefix}{lookup}")
+    return lookups
+
+
+def with_product_plan(queryset: QuerySet, serializer_class=None) -> QuerySet:
+    """
+    Подгружает для продуктов все связи, которые понадобятся сериализатору,
+    чтобы страница каталога стоила постоянное количество запросов.
+    Args:
+        queryset: QuerySet продуктов.
+        serializer_class: Сериализатор, по полям которого строится план
+            (по умолчанию ProductSerializer).
+    Returns:
+        QuerySet: QuerySet с prefetch_related.
+    """
+    if serializer_class is None:
+        from ..serializers import ProductSerializer
+
+        serializer_class = ProductSerializer
+    fields = get_serializer_fields(serializer_class)
+    return queryset.prefetch_related(*build_prefetch_plan(fields))
+
+
+def banner_queryset() -> QuerySet:
+    """
+    Баннеры со всем, что нужно BannerSerializer: продукт, его изображения,
+    теги. Количество отзывов хранится в самом продукте.
+    """
+    return Banner.objects.select_related("product").prefetch_related(
+        _images_prefetch("product__images"),
+        "product__tags",
+    )
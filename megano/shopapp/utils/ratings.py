@@ -0,0 +1,109 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from ..models import Product, Review
+from .db import acquire_write_lock
+
+
+def review_rating(reviews_count: int, rating_sum: int) -> Decimal:
+    """
+    Средняя оценка продукта с одним знаком после запятой.
+    Args:
+        reviews_count: Количество отзывов.
+        rating_sum: Сумма оценок.
+    Returns:
+        Decimal: Средняя оценка, 0 для продукта без отзывов.
+    """
+    if not reviews_count:
+        return Decimal("0.0")
+    return (Decimal(rating_sum) / reviews_count).quantize(
+        Decimal("0.1"), rounding=ROUND_HALF_UP
+    )
+
+
+def apply_review_delta(product_id, count: int, rate: int) -> None:
+    """
+    Одним UPDATE с F()-выражениями меняет количество отзывов, сумму оценок
+    и среднюю оценку продукта, без чтения строки и без гонок между запросами.
+
+    Вызывается из сигналов отзывов, то есть в транзакции, сохраняющей отзыв.
+    Args:
+        product_id: Идентификатор продукта.
+        count: Изменение количества отзывов (+1, -1 или 0 при правке оценки).
+        rate: Изменение суммы оценок.
+    """
+    if product_id is None or (not count and not rate):
+        return
+    reviews_count = F("reviews_count") + count
+    rating_sum = F("rating_sum") + rate
+    # Среднее в десятых с округлением половины вверх, как в review_rating:
+    # floor((20 * sum + count) / (2 * count)). Целочисленное деление одинаково
+    # в SQLite и PostgreSQL, а ROUND(double precision, integer) в PostgreSQL нет
+    tenths = (rating_sum * 20 + reviews_count) / (reviews_count * 2)
+    rating_field = DecimalField(max_digits=3, decimal_places=1)
+    # В UPDATE все F() ссылаются на значения до изменения
+    Product.objects.filter(pk=product_id).update(
+        reviews_count=reviews_count,
+        rating_sum=rating_sum,
+        rating=Case(
+            When(reviews_count__lte=-count, then=Value(Decimal("0.0"))),
+            default=Cast(tenths * Value(Decimal("0.1")), rating_field),
+            output_field=rating_field,
+        ),
+    )
+
+
+def review_stats() -> dict:
+    """
+    Количество отзывов и сумма оценок по продуктам, посчитанные по таблице отзывов.
+    Returns:
+        dict: {product_id: (reviews_count, rating_sum)}.
+    """
+    rows = (
+        Review.objects.filter(product__isnull=False)
+        .values("product_id")
+        .annotate(total=Count("id"), rate_sum=Coalesce(Sum("rate"), 0))
+        .values_list("product_id", "total", "rate_sum")
+    )
+    return {product_id: (total, rate_sum) for product_id, total, rate_sum in rows}
+
+
+def reconcile_review_stats(batch_size: int = 500) -> list:
+    """
+    Пересчитывает reviews_count, rating_sum и rating всех продуктов по отзывам
+    и исправляет разошедшиеся значения (например, после bulk_create отзывов
+    или правки базы в обход сигналов).
+    Args:
+        batch_size: Размер пачки для bulk_update.
+    Returns:
+        list: Идентификаторы исправленных продуктов.
+    """
+    with transaction.atomic():
+        acquire_write_lock()
+        stats = review_stats()
+        changed = []
+        products = (
+            Product.objects.select_for_update()
+            .only("id", "reviews_count", "rating_sum", "rating")
+            .order_by("id")
+        )
+        for product in products.iterator():
+            reviews_count, rating_sum = stats.get(product.id, (0, 0))
+            rating = review_rating(reviews_count, rating_sum)
+            if (product.reviews_count, product.rating_sum, product.rating) == (
+                reviews_count,
+                rating_sum,
+                rating,
+            ):
+                continue
+            product.reviews_count = reviews_count
+            product.rating_sum = rating_sum
+            product.rating = rating
+            changed.append(product)
+        Product.objects.bulk_update(
+            changed, ["reviews_count", "rating_sum", "rating"], batch_size=batch_size
+        )
+    return [product.id for product in changed]
@@ -0,0 +1,190 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.utils._os import safe_join
+from PIL import Image, ImageOps
+
+from .thumbnails import save_image
+
+# Расширение исходника -> (расширение результата, формат Pillow, MIME-тип).
+# JPEG остаётся JPEG, остальное (PNG, GIF, WebP) сжимается в WebP с прозрачностью
+OUTPUT_FORMATS = {
+    ".jpg": ("jpg", "JPEG", "image/jpeg"),
+    ".jpeg": ("jpg", "JPEG", "image/jpeg"),
+}
+DEFAULT_OUTPUT_FORMAT = ("webp", "WEBP", "image/webp")
+
+
+class DiskLRU:
+    """
+    Учёт файлов дискового кэша с вытеснением давно не читанных по общему размеру.
+
+    Порядок восстанавливается по времени изменения файлов, попадание обновляет
+    его через os.utime, поэтому после перезапуска и между процессами порядок
+    сохраняется приблизительно. Каждый процесс ведёт свой учёт, так что кэш
+    может ненадолго превысить лимит, пока его не почистит другой процесс.
+    """
+
+    def __init__(self, directory: Path, max_size: int):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = None
+        self._total = 0
+
+    def _load(self) -> None:
+        if self._entries is not None:
+            return
+        files = []
+        if self.directory.exists():
+            for path in self.directory.rglob("*"):
+                if path.is_file() and not path.name.endswith(".tmp"):
+                    stat = path.stat()
+                    files.append((stat.st_mtime, str(path), stat.st_size))
+        files.sort()
+        self._entries = OrderedDict((path, size) for _, path, size in files)
+        self._total = sum(self._entries.values())
+
+    def touch(self, path: Path) -> None:
+        """Отмечает файл как только что прочитанный."""
+        with self._lock:
+            self._load()
+            key = str(path)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def add(self, path: Path) -> None:
+        """Учитывает новый файл и вытесняет самые старые, пока кэш больше лимита."""
+        size = path.stat().st_size
+        with self._lock:
+            self._load()
+            key = str(path)
+            self._total += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            while self._total > self.max_size and len(self._entries) > 1:
+                oldest, oldest_size = self._entries.popitem(last=False)
+                self._total -= oldest_size
+                try:
+                    os.remove(oldest)
+                except FileNotFoundError:
+                    pass
+
+
+class ImageResizer:
+    """
+    Уменьшенные копии файлов из MEDIA_ROOT по запросу с кэшем на диске.
+
+    Копии строит небольшой пул потоков (Pillow отпускает GIL при декодировании,
+    масштабировании и сжатии), поэтому нагрузка на CPU ограничена размером пула.
+    Одновременные запросы одной копии ждут одну и ту же задачу.
+    """
+
+    def __init__(self, cache_dir, max_cache_size: int, workers: int):
+        self.cache_dir = Path(cache_dir)
+        self.lru = DiskLRU(self.cache_dir, max_cache_size)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="image-resize"
+        )
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def source_path(self, name: str) -> Path:
+        """
+        Путь к исходнику внутри MEDIA_ROOT.
+        Raises:
+            FileNotFoundError: Если файла нет.
+            SuspiciousFileOperation: Если путь выходит за MEDIA_ROOT (ответ 400).
+        """
+        path = Path(safe_join(settings.MEDIA_ROOT, name))
+        if not path.is_file():
+            raise FileNotFoundError(name)
+        return path
+
+    def resize(self, name: str, width: int, height: int) -> tuple:
+        """
+        Возвращает копию изображения, вписанную в width x height
+        (без увеличения), строя её при первом запросе.
+        Args:
+            name: Путь к изображению относительно MEDIA_ROOT.
+            width: Максимальная ширина.
+            height: Максимальная высота.
+        Returns:
+            tuple: (путь к файлу в кэше, MIME-тип, ETag).
+        Raises:
+            FileNotFoundError: Если исходника нет.
+            OSError: Если исходник не удалось прочитать как изображение.
+        """
+        source = self.source_path(name)
+        stat = source.stat()
+        extension, pil_format, content_type = OUTPUT_FORMATS.get(
+            source.suffix.lower(), DEFAULT_OUTPUT_FORMAT
+        )
+        # Время изменения и размер исходника в ключе: заменённый файл даёт новую копию
+        digest = hashlib.sha1(
+            f"{name}:{width}x{height}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+        ).hexdigest()
+        target = self.cache_dir / digest[:2] / f"{digest}.{extension}"
+        etag = f'"{digest}"'
+
+        if target.exists():
+            self.lru.touch(target)
+            return target, content_type, etag
+
+        with self._lock:
+            future = self._pending.get(digest)
+            if future is None:
+                future = self._executor.submit(
+                    self._render, source, target, width, height, pil_format
+                )
+                self._pending[digest] = future
+                future.add_done_callback(lambda done: self._forget(digest))
+        future.result()
+        return target, content_type, etag
+
+    def _forget(self, digest: str) -> None:
+        with self._lock:
+            self._pending.pop(digest, None)
+
+    def _render(self, source: Path, target: Path, width, height, pil_format) -> None:
+        if target.exists():
+            return
+        with Image.open(source) as original:
+            # draft() декодирует большой JPEG сразу в уменьшенном виде; квадрат,
+            # потому что поворот из EXIF может поменять ширину и высоту местами
+            side = max(width, height)
+            original.draft("RGB", (side, side))
+            image = ImageOps.exif_transpose(original)
+            has_alpha = image.mode in ("RGBA", "LA") or (
+                image.mode == "P" and "transparency" in image.info
+            )
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        image.thumbnail((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        save_image(image, str(target), pil_format, settings.IMAGE_RESIZE_QUALITY)
+        self.lru.add(target)
+
+
+_resizer = None
+_resizer_lock = threading.Lock()
+
+
+def get_resizer() -> ImageResizer:
+    """Общий для процесса ImageResizer с параметрами из настроек IMAGE_RESIZE_*."""
+    global _resizer
+    with _resizer_lock:
+        if _resizer is None:
+            _resizer = ImageResizer(
+                settings.IMAGE_RESIZE_CACHE_DIR,
+                settings.IMAGE_RESIZE_CACHE_SIZE,
+                settings.IMAGE_RESIZE_WORKERS,
+            )
+    return _resizer
@@ -0,0 +1,127 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers, quote_etag
+
+from .cache_versions import aget_version, bump_version, get_version
+
+# Группы закэшированных ответов, которые сбрасываются при изменении продуктов
+PRODUCT_RESPONSE_GROUPS = ("banners", "popular-products", "limited-products", "sales")
+
+
+def response_cache_key(group: str, request, version=None) -> str:
+    """
+    Ключ кэша ответа: группа, её версия, полный путь с параметрами и Accept,
+    чтобы JSON и браузерная версия API не смешивались.
+    """
+    if version is None:
+        version = get_version(f"response:{group}")
+    accept = request.META.get("HTTP_ACCEPT", "")
+    digest = hashlib.md5(f"{request.get_full_path()}|{accept}".encode()).hexdigest()
+    return f"response:{group}:{version}:{digest}"
+
+
+def invalidate_responses(*groups) -> None:
+    """Сбрасывает все закэшированные ответы перечисленных групп."""
+    for group in groups:
+        bump_version(f"response:{group}")
+
+
+def _etag_matches(request, etag: str) -> bool:
+    if_none_match = request.META.get("HTTP_IF_NONE_MATCH", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def _cached_response(request, cached) -> HttpResponse:
+    """Ответ (или 304) из сохранённых в кэше содержимого, типа и ETag."""
+    content, content_type, etag = cached
+    if _etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=content_type)
+    response["ETag"] = etag
+    patch_vary_headers(response, ("Accept",))
+    return response
+
+
+def _prepare_for_cache(request, response):
+    """
+    Проставляет ETag успешному JSON-ответу.
+    Returns:
+        tuple: (ответ клиенту, значение для кэша или None, если кэшировать нельзя).
+    """
+    renderer = getattr(response, "accepted_renderer", None)
+    if renderer is not None:
+        if getattr(renderer, "format", None) != "json":
+            return response, None
+        response.render()
+    elif response.get("Content-Type") != "application/json":
+        return response, None
+    if response.status_code != 200:
+        return response, None
+
+    etag = quote_etag(hashlib.md5(response.content).hexdigest())
+    response["ETag"] = etag
+    cached = (response.content, response["Content-Type"], etag)
+    if _etag_matches(request, etag):
+        not_modified = HttpResponseNotModified()
+        not_modified["ETag"] = etag
+        return not_modified, cached
+    return response, cached
+
+
+class CachedResponseMixin:
+    """
+    Кэширует отрендеренный JSON-ответ GET-запроса целиком.
+
+    При попадании в кэш ответ отдаётся до DRF (без аутентификации, сериализации
+    и обращения к базе). Ответ содержит ETag, а при совпадении If-None-Match
+    возвращается 304. Подходит только для публичных ответов, одинаковых
+    для всех пользователей. Инвалидация — через invalidate_responses(cache_group).
+    """
+
+    cache_group = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method != "GET":
+            return super().dispatch(request, *args, **kwargs)
+
+        key = response_cache_key(self.cache_group, request)
+        cached = cache.get(key)
+        if cached is not None:
+            return _cached_response(request, cached)
+
+        response = super().dispatch(request, *args, **kwargs)
+        response, cached = _prepare_for_cache(request, response)
+        if cached is not None:
+            cache.set(key, cached, getattr(settings, "RESPONSE_CACHE_TIMEOUT", 600))
+        return response
+
+
+class AsyncCachedResponseMixin:
+    """
+    Вариант CachedResponseMixin для асинхронных представлений Django:
+    те же ключи, группы и инвалидация, обращения к кэшу через aget/aset.
+    """
+
+    cache_group = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method != "GET":
+            return await super().dispatch(request, *args, **kwargs)
+
+        version = await aget_version(f"response:{self.cache_group}")
+        key = response_cache_key(self.cache_group, request, version)
+        cached = await cache.aget(key)
+        if cached is not None:
+            return _cached_response(request, cached)
+
+        response = await super().dispatch(request, *args, **kwargs)
+        response, cached = _prepare_for_cache(request, response)
+        if cached is not None:
+            await cache.aset(
+                key, cached, getattr(settings, "RESPONSE_CACHE_TIMEOUT", 600)
+            )
+        return response
@@ -0,0 +1,244 @@
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import FloatField, Q, QuerySet, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from ..models import Product
+from .db import acquire_write_lock
+
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_search_documents(product_ids) -> list:
+    """
+    Собирает тексты для поискового индекса за фиксированное число запросов.
+    Args:
+        product_ids: Идентификаторы продуктов.
+    Returns:
+        list: Кортежи (id, title, description, tags, specifications).
+    """
+    products = (
+        Product.objects.filter(id__in=product_ids)
+        .only("id", "title", "description", "fullDescription")
+        .prefetch_related("tags", "specifications")
+    )
+    documents = []
+    for product in products:
+        description = " ".join(
+            filter(None, [product.description, product.fullDescription])
+        )
+        tags = " ".join(tag.name for tag in product.tags.all())
+        specifications = " ".join(
+            f"{spec.name} {spec.value}" for spec in product.specifications.all()
+        )
+        documents.append((product.id, product.title, description, tags, specifications))
+    return documents
+
+
+def chunked(items: list, size: int):
+    """Делит список на части не длиннее size."""
+    size = max(size, 1)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class BaseSearchBackend:
+    """
+    Базовый поисковый бэкенд каталога.
+
+    filter_queryset оставляет в QuerySet только найденные продукты и добавляет
+    аннотацию search_rank: чем меньше значение, тем выше продукт в выдаче.
+    """
+
+    def filter_queryset(self, queryset: QuerySet, query: str) -> QuerySet:
+        raise NotImplementedError
+
+    @staticmethod
+    def empty(queryset: QuerySet) -> QuerySet:
+        """Пустой результат, когда в запросе нет ни одного слова."""
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).none()
+
+    def index_products(self, product_ids) -> None:
+        """Обновляет индекс для переданных продуктов (удалённые убираются)."""
+
+    def rebuild(self, batch_size: int = 500) -> int:
+        """
+        Полностью перестраивает индекс.
+        Returns:
+            int: Количество проиндексированных продуктов.
+        """
+        self.clear()
+        product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+        for start in range(0, len(product_ids), batch_size):
+            self.index_products(product_ids[start : start + batch_size])
+        return len(product_ids)
+
+    def clear(self) -> None:
+        """Удаляет все записи индекса."""
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Поиск через LIKE для баз без полнотекстового индекса."""
+
+    def filter_queryset(self, queryset: QuerySet, query: str) -> QuerySet:
+        return queryset.filter(
+            Q(title__icontains=query)
+            | Q(description__icontains=query)
+            | Q(fullDescription__icontains=query)
+        ).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    Поиск по виртуальной таблице SQLite FTS5 с ранжированием bm25.
+
+    rowid строки индекса совпадает с id продукта.
+    """
+
+    table = "shopapp_product_fts"
+    # Веса колонок для bm25: title, description, tags, specifications
+    weights = (10.0, 2.0, 5.0, 1.0)
+
+    @staticmethod
+    def build_match_query(query: str) -> str:
+        """
+        Превращает пользовательский ввод в запрос FTS5: каждое слово
+        берётся в кавычки и ищется по префиксу, слова объединяются через AND.
+        """
+        words = WORD_RE.findall(query.lower())
+        return " ".join(f'"{word}"*' for word in words)
+
+    def filter_queryset(self, queryset: QuerySet, query: str) -> QuerySet:
+        match = self.build_match_query(query)
+        if not match:
+            return self.empty(queryset)
+        product_table = Product._meta.db_table
+        weights = ", ".join(str(weight) for weight in self.weights)
+        # Индекс присоединяется к продуктам один раз по rowid, и bm25 считается
+        # в той же выборке, а не отдельным подзапросом на каждую найденную строку
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                f'{self.table}.rowid = "{product_table}"."id"',
+                f"{self.table} MATCH %s",
+            ],
+            params=[match],
+        ).annotate(
+            search_rank=RawSQL(
+                f"bm25({self.table}, {weights})", [], output_field=FloatField()
+            )
+        )
+
+    def index_products(self, product_ids) -> None:
+        product_ids = list(product_ids)
+        documents = build_search_documents(product_ids)
+        # В одной транзакции, чтобы параллельная переиндексация тех же продуктов
+        # не вставила строку с тем же rowid между DELETE и INSERT
+        with transaction.atomic(), connection.cursor() as cursor:
+            acquire_write_lock()
+            # Многострочные запросы вместо executemany: executemany
+            # не поддерживается SQL-панелью debug toolbar на SQLite.
+            # Части не длиннее лимита параметров в одном запросе
+            max_params = connection.features.max_query_params
+            for chunk in chunked(product_ids, max_params):
+                cursor.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN "
+                    f"({', '.join(['%s'] * len(chunk))})",
+                    chunk,
+                )
+            for chunk in chunked(documents, max_params // 5):
+                cursor.execute(
+                    f"INSERT INTO {self.table} "
+                    "(rowid, title, description, tags, specifications) VALUES "
+                    + ", ".join(["(%s, %s, %s, %s, %s)"] * len(chunk)),
+                    [value for document in chunk for value in document],
+                )
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Поиск по колонке tsvector с GIN-индексом и ранжированием ts_rank.
+    """
+
+    table = "shopapp_product_search"
+    config = "simple"
+
+    @staticmethod
+    def build_tsquery(query: str) -> str:
+        """Каждое слово ищется по префиксу, слова объединяются через AND."""
+        words = WORD_RE.findall(query.lower())
+        return " & ".join(f"{word}:*" for word in words)
+
+    def filter_queryset(self, queryset: QuerySet, query: str) -> QuerySet:
+        tsquery = self.build_tsquery(query)
+        if not tsquery:
+            return self.empty(queryset)
+        product_table = Product._meta.db_table
+        return queryset.extra(
+            tables=[self.table],
+            where=[
+                f'{self.table}.product_id = "{product_table}"."id"',
+                f"{self.table}.document @@ to_tsquery('{self.config}', %s)",
+            ],
+            params=[tsquery],
+        ).annotate(
+            search_rank=RawSQL(
+                f"-ts_rank({self.table}.document, to_tsquery('{self.config}', %s))",
+                [tsquery],
+                output_field=FloatField(),
+            )
+        )
+
+    def index_products(self, product_ids) -> None:
+        product_ids = list(product_ids)
+        documents = build_search_documents(product_ids)
+        config = self.config
+        indexed_ids = [document[0] for document in documents]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {self.table} "
+                "WHERE product_id = ANY(%s) AND NOT product_id = ANY(%s)",
+                [product_ids, indexed_ids],
+            )
+            # Upsert, чтобы параллельная переиндексация не упала на первичном ключе
+            cursor.executemany(
+                f"INSERT INTO {self.table} (product_id, document) VALUES (%s, "
+                f"setweight(to_tsvector('{config}', %s), 'A') || "
+                f"setweight(to_tsvector('{config}', %s), 'C') || "
+                f"setweight(to_tsvector('{config}', %s), 'B') || "
+                f"setweight(to_tsvector('{config}', %s), 'D')) "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                documents,
+            )
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {self.table}")
+
+
+VENDOR_BACKENDS = {
+    "sqlite": SQLiteFTSBackend,
+    "postgresql": PostgresSearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend() -> BaseSearchBackend:
+    """
+    Возвращает поисковый бэкенд из настройки PRODUCT_SEARCH_BACKEND
+    или, если она не задана, подходящий для используемой базы данных.
+    """
+    backend_path = getattr(settings, "PRODUCT_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)()
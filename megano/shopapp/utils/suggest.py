@@ -0,0 +1,142 @@
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from rapidfuzz import fuzz, process
+
+from ..models import Category, Product, Tag
+from .cache_versions import get_version
+
+SUGGEST_VERSION = "suggest-index"
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    """Одна подсказка автодополнения."""
+
+    type: str
+    id: int
+    title: str
+
+    def serialize(self) -> dict:
+        return {"type": self.type, "id": self.id, "title": self.title}
+
+
+def normalize(text: str) -> str:
+    """Приводит строку к виду, по которому идёт сравнение."""
+    return " ".join(text.lower().split())
+
+
+class SuggestIndex:
+    """
+    Индекс подсказок в памяти процесса.
+
+    Хранит отсортированный список ключей (название целиком и каждый его хвост,
+    начинающийся с нового слова), поэтому поиск по префиксу — это bisect
+    и проход по соседним ключам без обращения к базе.
+    """
+
+    def __init__(self, suggestions):
+        self.suggestions = list(suggestions)
+        self.titles = [normalize(item.title) for item in self.suggestions]
+        keys = []
+        for position, title in enumerate(self.titles):
+            words = title.split(" ")
+            for start in range(len(words)):
+                keys.append((" ".join(words[start:]), position))
+        keys.sort()
+        self.keys = keys
+
+    def prefix(self, query: str, limit: int) -> list:
+        """
+        Возвращает подсказки, название которых (или одно из слов) начинается с query.
+        """
+        result, seen = [], set()
+        index = bisect_left(self.keys, (query,))
+        while index < len(self.keys) and len(result) < limit:
+            key, position = self.keys[index]
+            if not key.startswith(query):
+                break
+            if position not in seen:
+                seen.add(position)
+                result.append(self.suggestions[position])
+            index += 1
+        return result
+
+    def fuzzy(self, query: str, limit: int, score_cutoff: int = 70) -> list:
+        """
+        Возвращает похожие подсказки с учётом опечаток (rapidfuzz).
+
+        Сравнивает запрос со всеми названиями, поэтому стоит заметно дороже
+        prefix и включается только по запросу клиента.
+        """
+        matches = process.extract(
+            query,
+            self.titles,
+            scorer=fuzz.WRatio,
+            limit=limit,
+            score_cutoff=score_cutoff,
+        )
+        return [self.suggestions[position] for _, _, position in matches]
+
+    def suggest(self, query: str, limit: int = 10, fuzzy: bool = False) -> list:
+        """
+        Подсказки для строки query: сначала совпадения по префиксу,
+        затем, если их не хватило, нечёткие совпадения.
+        Args:
+            query: Введённый пользователем текст.
+            limit: Максимальное количество подсказок.
+            fuzzy: Добирать ли результаты нечётким поиском.
+        Returns:
+            list: Список Suggestion.
+        """
+        query = normalize(query)
+        if not query:
+            return []
+        result = self.prefix(query, limit)
+        if fuzzy and len(result) < limit and len(query) >= 3:
+            for item in self.fuzzy(query, limit):
+                if item not in result:
+                    result.append(item)
+                if len(result) >= limit:
+                    break
+        return result
+
+
+def load_suggest_index() -> SuggestIndex:
+    """Строит индекс подсказок из названий продуктов, тегов и категорий."""
+    suggestions = [
+        Suggestion("product", pk, title)
+        for pk, title in Product.objects.values_list("id", "title")
+    ]
+    suggestions += [
+        Suggestion("tag", pk, name)
+        for pk, name in Tag.objects.exclude(name="").values_list("tag_id", "name")
+    ]
+    suggestions += [
+        Suggestion("category", pk, title)
+        for pk, title in Category.objects.values_list("id", "title")
+    ]
+    return SuggestIndex(suggestions)
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_suggest_index() -> SuggestIndex:
+    """
+    Возвращает индекс подсказок текущего процесса.
+
+    Индекс загружается при первом обращении и перестраивается, когда сигналы
+    об изменении продуктов, тегов или категорий увеличивают его версию в кэше.
+    """
+    global _index, _index_version
+    version = get_version(SUGGEST_VERSION)
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = load_suggest_index()
+                _index_version = version
+    return _index
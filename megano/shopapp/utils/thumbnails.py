@@ -0,0 +1,112 @@
+"""
+Построение уменьшенных копий изображений на Pillow.
+
+Модуль не импортирует Django: build_variants выполняется в процессах пула
+(см. utils/images.py), запущенных через spawn, и получает все настройки
+аргументами.
+"""
+
+import os
+
+from PIL import Image, ImageOps
+
+# Формат варианта -> (формат Pillow, MIME-тип, расширение файла)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+}
+
+
+def variant_name(name: str, width: int, fmt: str) -> str:
+    """
+    Имя файла варианта рядом с оригиналом: product_image/a.png -> product_image/a_320w.webp.
+    Args:
+        name: Имя оригинала относительно MEDIA_ROOT.
+        width: Ширина варианта.
+        fmt: Формат варианта (ключ FORMATS).
+    """
+    root, _ = os.path.splitext(name)
+    return f"{root}_{width}w.{FORMATS[fmt][2]}"
+
+
+def build_variants(media_root: str, name: str, widths, formats, quality: int) -> list:
+    """
+    Строит варианты изображения для всех ширин меньше исходной.
+
+    Изображение уже не шире самой маленькой ширины только перекодируется.
+    Варианты новее оригинала не пересобираются.
+    Args:
+        media_root: Каталог загрузок (MEDIA_ROOT).
+        name: Имя оригинала относительно media_root.
+        widths: Ширины вариантов.
+        formats: Форматы вариантов (ключи FORMATS).
+        quality: Качество сжатия.
+    Returns:
+        list: Описания вариантов: name, width, height, type.
+    """
+    source = os.path.join(media_root, name)
+    source_mtime = os.path.getmtime(source)
+    with Image.open(source) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ("RGBA", "LA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    targets = sorted({width for width in widths if width < image.width})
+    if not targets:
+        targets = [image.width]
+
+    variants = []
+    for width in targets:
+        height = max(round(image.height * width / image.width), 1)
+        resized = None
+        for fmt in formats:
+            pil_format, content_type, _ = FORMATS[fmt]
+            variant = variant_name(name, width, fmt)
+            path = os.path.join(media_root, variant)
+            if not (os.path.exists(path) and os.path.getmtime(path) >= source_mtime):
+                if resized is None:
+                    resized = (
+                        image
+                        if width == image.width
+                        else image.resize(
+                            (width, height),
+                            Image.Resampling.LANCZOS,
+                            reducing_gap=3.0,
+                        )
+                    )
+                save_image(resized, path, pil_format, quality)
+            variants.append(
+                {
+                    "name": variant,
+                    "width": width,
+                    "height": height,
+                    "type": content_type,
+                }
+            )
+    return variants
+
+
+def save_image(image, path: str, pil_format: str, quality: int) -> None:
+    """
+    Сохраняет изображение через временный файл, чтобы читатели
+    никогда не видели недописанный файл.
+    """
+    if pil_format == "JPEG" and image.mode == "RGBA":
+        # В JPEG нет прозрачности: кладём изображение на белый фон
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    options = {"quality": quality}
+    if pil_format == "JPEG":
+        options.update(optimize=True, progressive=True)
+    else:
+        options.update(method=4)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        image.save(temporary, pil_format, **options)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
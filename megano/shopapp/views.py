@@ -1,23 +1,39 @@
+from functools import partial
+
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Prefetch
 
 from rest_framework import status, permissions, generics
 from rest_framework.filters import SearchFilter, OrderingFilter
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
 from rest_framework.parsers import FormParser, MultiPartParser, JSONParser
 from rest_framework.request import Request
 from rest_framework.views import APIView
 from rest_framework.response import Response
 
-from .models import Product, Tag, Category, Sale, Banner
+from .models import Category, Product, Image, Review, Tag, Sale
 from .serializers import (
     ProductSerializer,
     ReviewSerializer,
     TagSerializer,
-    CategorySerializer,
     SaleProductSerializer,
     BannerSerializer,
+    CartLineSerializer,
+    CartBatchSerializer,
+    CartOperationSerializer,
+    CartTotalsSerializer,
 )
 from .utils.cart import Cart
+from .utils.category_tree import get_category_tree
+from .utils.counts import CachedCountPaginator, normalize_catalog_filters
+from .utils.db import acquire_write_lock
+from .utils.pagination import KeysetPaginator
+from .utils.product_cache import get_product_document
+from .utils.search import get_search_backend
+from .utils.suggest import get_suggest_index
+from .utils.queries import banner_queryset, with_product_plan
+from .utils.response_cache import CachedResponseMixin
 
 
 class ProductDetailView(APIView):
@@ -39,34 +55,69 @@ class ProductDetailView(APIView):
         Returns:
            Response: Статус выполнения операции и данные продукта или сообщение об ошибке.
         """
-        try:
-            product = Product.objects.get(id=id)
-            serializer = ProductSerializer(product)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        except Product.DoesNotExist:
+        # Документ продукта берётся из кэша и собирается только после изменений
+        document = get_product_document(id)
+        if document is None:
             return Response(
                 {"message": "Product not found"}, status=status.HTTP_404_NOT_FOUND
             )
+        return Response(document, status=status.HTTP_200_OK)
 
 
 class ProductReviewCreateView(APIView):
     """
-    Представление для добавления отзыва о продукте.
+    Представление для отзывов о продукте.
 
-    Позволяет пользователям добавлять отзывы о продуктах.
+    Позволяет пользователям добавлять отзывы о продуктах и постранично
+    читать все отзывы продукта (в данных продукта только последние).
     """
 
     serializer_class = ReviewSerializer
     parser_classes = (FormParser, MultiPartParser, JSONParser)
     permission_classes = [
-        permissions.IsAuthenticated
-    ]  # пишем пермиш потому что сюда не авторизованные заходить не могут
+        permissions.IsAuthenticatedOrReadOnly
+    ]  # читать отзывы могут все, добавлять только авторизованные
+    # Лента отзывов: новые первыми (индекс review_product_date_idx)
+    ordering_field = "date"
+    ordering_desc = True
 
     def test_func(self):
         """Проверяет, аутентифицирован ли пользователь."""
 
         return self.request.user.is_authenticated
 
+    def get(self, request: Request, id: int) -> Response:
+        """
+        Обработка GET-запроса для получения страницы отзывов о продукте.
+
+        Страницы выбираются keyset-пагинацией по ?cursor=, как в каталоге.
+
+        Args:
+            request: Запрос.
+            id: Идентификатор продукта.
+
+        Returns:
+            Response: Отзывы страницы, курсоры соседних страниц и общее количество отзывов.
+        """
+        reviews_count = (
+            Product.objects.filter(id=id)
+            .values_list("reviews_count", flat=True)
+            .first()
+        )
+        if reviews_count is None:
+            return Response(
+                {"message": "Product not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        paginator = ReviewCursorPagination()
+        reviews = paginator.paginate_queryset(
+            Review.objects.filter(product_id=id), request, view=self
+        )
+        response = paginator.get_paginated_response(
+            ReviewSerializer(reviews, many=True).data
+        )
+        response.data["count"] = reviews_count
+        return response
+
     def post(self, request: Request, id: int) -> Response:
         """
         Обработка POST-запроса для создания отзыва о продукте.
@@ -80,9 +131,12 @@ class ProductReviewCreateView(APIView):
         """
         serializer = ReviewSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(
-                product_id=id
-            )  # Предоставляем product_id при сохранении отзыва
+            # Счётчики отзывов продукта обновляются сигналом в этой же транзакции
+            with transaction.atomic():
+                acquire_write_lock()
+                serializer.save(
+                    product_id=id
+                )  # Предоставляем product_id при сохранении отзыва
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -131,22 +185,23 @@ class TagDetailView(APIView):
             return Response(status=status.HTTP_404_NOT_FOUND)
 
 
-class CategoryAPIView(APIView):
+class CategoryAPIView(CachedResponseMixin, APIView):
     """
     Обработка GET-запроса для получения списка категорий и субкатегорий.
     Returns:
         Response: Список категорий и субкатегорий в формате JSON.
     """
 
+    cache_group = "categories"
+
     def get(self, request: Request) -> Response:
         """
         Обработка GET-запроса для получения списка категорий и субкатегорий.
         Returns:
             Response: Список категорий и субкатегорий в формате JSON.
         """
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # Дерево строится двумя запросами и хранится в памяти процесса
+        return Response(get_category_tree(), status=status.HTTP_200_OK)
 
 
 class CatalogPagination(PageNumberPagination):
@@ -159,6 +214,17 @@ class CatalogPagination(PageNumberPagination):
     page_size_query_param = "limit"
     max_page_size = 1000  # Максимальное количество элементов на странице
 
+    def paginate_queryset(self, queryset, request: Request, view=None):
+        """
+        Разбивает QuerySet на страницы, беря общее количество товаров из кэша,
+        ключом которого служит нормализованный набор фильтров запроса.
+        """
+        self.django_paginator_class = partial(
+            CachedCountPaginator,
+            filters=normalize_catalog_filters(request.query_params),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
     def get_paginated_response(self, data: list) -> Response:
         """
         Генерирует ответ с данными и информацией о пагинации.
@@ -177,35 +243,110 @@ class CatalogPagination(PageNumberPagination):
         )
 
 
-class CatalogAPIView(generics.ListAPIView):
+class CatalogCursorPagination(BasePagination):
     """
-    Представление API для отображения каталога товаров.
+    Keyset-пагинация каталога, включается параметром ?cursor=.
 
-    Позволяет получать список товаров с возможностью фильтрации, сортировки и пагинации.
+    Страница выбирается по паре (активное поле сортировки, id) без OFFSET и COUNT(*),
+    поэтому глубокие страницы стоят столько же, сколько первая. Ответ сохраняет
+    поля currentPage/lastPage для старого фронтенда и добавляет nextCursor/prevCursor.
     """
 
-    queryset = Product.objects.all()
-    serializer_class = ProductSerializer
-    filter_backends = [SearchFilter, OrderingFilter]
-    pagination_class = CatalogPagination
+    cursor_query_param = "cursor"
+    page_size = CatalogPagination.page_size
+    page_size_query_param = CatalogPagination.page_size_query_param
+    max_page_size = CatalogPagination.max_page_size
 
-    def get_queryset(self):
-        queryset = super().get_queryset()
+    def get_page_size(self, request: Request) -> int:
+        """
+        Возвращает размер страницы из параметра limit с учётом ограничения.
+        """
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def paginate_queryset(self, queryset, request: Request, view=None) -> list:
+        """
+        Возвращает элементы страницы после позиции из курсора.
+        """
+        paginator = KeysetPaginator(
+            self.get_page_size(request),
+            field=getattr(view, "ordering_field", None),
+            descending=getattr(view, "ordering_desc", False),
+        )
+        self.page = paginator.paginate(
+            queryset, request.query_params.get(self.cursor_query_param)
+        )
+        return self.page.items
 
-        # Фильтрация по категории и подкатегории
-        queryset = self.filter_by_category(queryset)
+    def get_paginated_response(self, data: list) -> Response:
+        """
+        Генерирует ответ с данными и курсорами соседних страниц.
+        Args:
+            data (list): Список данных для текущей страницы.
+        Returns:
+            Response: Ответ с данными и информацией о пагинации.
+        """
+        return Response(
+            {
+                "items": data,
+                "currentPage": self.page.number,
+                "lastPage": self.page.last_page,
+                "nextCursor": self.page.next_cursor,
+                "prevCursor": self.page.prev_cursor,
+            }
+        )
 
-        # Применение других фильтров
-        queryset = self.apply_filters(queryset)
 
-        return queryset
+class ReviewCursorPagination(CatalogCursorPagination):
+    """
+    Keyset-пагинация отзывов продукта.
+    """
+
+    page_size = 10
+    max_page_size = 100
+
+
+class CatalogFilterMixin:
+    """
+    Фильтрация и сортировка каталога по параметрам запроса.
+
+    Общая для CatalogAPIView и асинхронного каталога: работает и с запросом DRF,
+    и с обычным HttpRequest.
+    """
+
+    # Значения параметра sort из swagger -> поле для order_by.
+    # Рейтинг и количество отзывов хранятся в продукте (см. utils/ratings.py).
+    sort_fields = {
+        "rating": "rating",
+        "reviews": "reviews_count",
+        "price": "price",
+        "date": "date",
+    }
+    ordering_field = None
+    ordering_desc = False
+
+    @property
+    def query_params(self):
+        # У запроса DRF параметры в query_params, у HttpRequest — в GET
+        return getattr(self.request, "query_params", self.request.GET)
 
     def filter_by_category(self, queryset):
-        category_id = self.request.query_params.get("category")
-        subcategory_id = self.request.query_params.get("subcategory")
+        category_id = self.query_params.get("category")
+        subcategory_id = self.query_params.get("subcategory")
 
         if subcategory_id:
-            queryset = queryset.filter(category__subcategories=subcategory_id)
+            # Подзапрос к индексированной связующей таблице вместо JOIN,
+            # чтобы товар не дублировался, если подкатегория в нескольких категориях
+            queryset = queryset.filter(
+                category_id__in=Category.subcategories.through.objects.filter(
+                    subcategory_id=subcategory_id
+                ).values("category_id")
+            )
         elif category_id:
             queryset = queryset.filter(category_id=category_id)
 
@@ -213,82 +354,198 @@ class CatalogAPIView(generics.ListAPIView):
 
     def apply_filters(self, queryset):
         # Фильтрация по имени
-        name = self.request.query_params.get("filter[name]")
+        name = self.query_params.get("filter[name]")
         if name:
-            queryset = queryset.filter(title__icontains=name)
+            # Полнотекстовый поиск по названию, описанию, тегам и характеристикам
+            queryset = get_search_backend().filter_queryset(queryset, name)
 
         # Фильтрация по минимальной цене
-        min_price = self.request.query_params.get("filter[minPrice]")
+        min_price = self.query_params.get("filter[minPrice]")
         if min_price is not None:
             queryset = queryset.filter(price__gte=min_price)
 
         # Фильтрация по максимальной цене
-        max_price = self.request.query_params.get("filter[maxPrice]")
+        max_price = self.query_params.get("filter[maxPrice]")
         if max_price is not None:
             queryset = queryset.filter(price__lte=max_price)
 
         # Фильтрация по бесплатной доставке
-        free_delivery = self.request.query_params.get("filter[freeDelivery]")
+        free_delivery = self.query_params.get("filter[freeDelivery]")
         if free_delivery == "true":
             queryset = queryset.filter(freeDelivery=True)
 
         # Фильтрация по наличию
-        available = self.request.query_params.get("filter[available]")
+        available = self.query_params.get("filter[available]")
         if available == "true":
             queryset = queryset.filter(available=True)
 
+        # Фильтрация по тегам (фронтенд передаёт массив как tags[])
+        tags = self.query_params.getlist("tags[]") or self.query_params.getlist("tags")
+        for tag_id in tags:
+            queryset = queryset.filter(
+                id__in=Tag.product.through.objects.filter(tag_id=tag_id).values(
+                    "product_id"
+                )
+            )
+
         # Сортировка
-        sort_by = self.request.query_params.get("sort")
-        sort_type = self.request.query_params.get("sortType")
+        sort_by = self.query_params.get("sort")
+        sort_type = self.query_params.get("sortType")
 
         if sort_by:
-            if sort_type == "dec":
+            self.ordering_field = self.sort_fields.get(sort_by, sort_by)
+            self.ordering_desc = sort_type == "dec"
+            sort_by = self.ordering_field
+            if self.ordering_desc:
                 sort_by = f"-{sort_by}"
-            queryset = queryset.order_by(sort_by)
+            # id нужен как второй ключ, чтобы порядок страниц был стабильным
+            queryset = queryset.order_by(sort_by, "-id" if self.ordering_desc else "id")
+        elif name:
+            # Без явной сортировки результаты поиска идут по релевантности
+            self.ordering_field = "search_rank"
+            queryset = queryset.order_by("search_rank", "id")
+        else:
+            queryset = queryset.order_by("id")
 
         return queryset
 
 
-class PopularProductsAPIView(APIView):
+class CatalogAPIView(CatalogFilterMixin, generics.ListAPIView):
+    """
+    Представление API для отображения каталога товаров.
+
+    Позволяет получать список товаров с возможностью фильтрации, сортировки и пагинации.
+    """
+
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    filter_backends = [SearchFilter, OrderingFilter]
+    pagination_class = CatalogPagination
+
+    @property
+    def paginator(self):
+        """
+        Выбирает keyset-пагинацию, если в запросе передан cursor, иначе обычную.
+        """
+        if not hasattr(self, "_paginator"):
+            if CatalogCursorPagination.cursor_query_param in self.request.query_params:
+                self._paginator = CatalogCursorPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        # Фильтрация по категории и подкатегории
+        queryset = self.filter_by_category(queryset)
+
+        # Применение других фильтров
+        queryset = self.apply_filters(queryset)
+
+        # Подгружаем связи одним планом, чтобы число запросов не зависело от limit
+        return with_product_plan(queryset, self.get_serializer_class())
+
+
+class CatalogSuggestAPIView(APIView):
+    """
+    Представление API для автодополнения в строке поиска.
+
+    Подсказки берутся из индекса в памяти процесса, поэтому запрос не обращается
+    к базе данных (аутентификация отключена, чтобы не читать сессию).
+    """
+
+    authentication_classes = []
+    permission_classes = []
+    max_limit = 50
+
+    def get(self, request: Request) -> Response:
+        """
+        Возвращает подсказки для строки q.
+        Args:
+            request: Запрос с параметрами q, limit и fuzzy
+                (fuzzy=true добирает подсказки с учётом опечаток).
+        Returns:
+            Response: Список подсказок {type, id, title}.
+        """
+        query = request.query_params.get("q", "")
+        try:
+            limit = min(int(request.query_params.get("limit", 10)), self.max_limit)
+        except ValueError:
+            limit = 10
+        fuzzy = request.query_params.get("fuzzy") == "true"
+        suggestions = get_suggest_index().suggest(query, limit=limit, fuzzy=fuzzy)
+        return Response(
+            [item.serialize() for item in suggestions], status=status.HTTP_200_OK
+        )
+
+
+class PopularProductsAPIView(CachedResponseMixin, APIView):
     """
     Представление API, чтобы получить популярные продукты."""
 
+    cache_group = "popular-products"
+
     def get(self, request: Request) -> Response:
         """
         Получает первые 8 продуктов, отсортированных по sort_index и sales_count.
         """
-        top_products = Product.top_products(limit=8)
+        top_products = with_product_plan(Product.top_products(limit=8))
         serializer = ProductSerializer(top_products, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class LimitedProductsAPIView(APIView):
+class LimitedProductsAPIView(CachedResponseMixin, APIView):
     """
     API представление для получения продуктов с указанным лимитом.
     """
 
+    cache_group = "limited-products"
+
     def get(self, request: Request) -> Response:
         """
         Получает и возвращает все доступные продукты.
         """
-        limited_products = Product.objects.filter(limited_edition=True)[
-            :16
-        ]  # Первые 16 продуктов с ограниченным тиражом
+        limited_products = with_product_plan(
+            Product.objects.filter(limited_edition=True)[:16]
+        )  # Первые 16 продуктов с ограниченным тиражом
         serializer = ProductSerializer(limited_products, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class SaleAPIView(APIView):
+class SaleAPIView(CachedResponseMixin, APIView):
     """
     API представление для получения продуктов, которые находятся на распродаже, включая информацию о скидках.
     """
 
+    cache_group = "sales"
+
     def get(self, request: Request) -> Response:
         """
         Получает продукты на распродаже с информацией о скидках.
         """
+        sales = (
+            Sale.objects.select_related("product")
+            .prefetch_related(
+                Prefetch("product__images", queryset=Image.objects.order_by("pk"))
+            )
+            .order_by("id")
+        )
+        if "cursor" in request.GET:
+            # Keyset-режим: страница выбирается по id без OFFSET и COUNT(*)
+            page = KeysetPaginator(10).paginate(sales, request.GET.get("cursor"))
+            serializer = SaleProductSerializer(page.items, many=True)
+            result = {
+                "items": serializer.data,
+                "currentPage": page.number,
+                "lastPage": page.last_page,
+                "nextCursor": page.next_cursor,
+                "prevCursor": page.prev_cursor,
+            }
+            return Response(data=result, status=status.HTTP_200_OK)
+
         page_number = request.GET.get("currentPage", 1)
-        paginator = Paginator(Sale.objects.all(), 10)
+        paginator = Paginator(sales, 10)
         page = paginator.page(page_number)
         serializer = SaleProductSerializer(page.object_list, many=True)
         result = {
@@ -299,21 +556,44 @@ class SaleAPIView(APIView):
         return Response(data=result, status=status.HTTP_200_OK)
 
 
-class BannerList(APIView):
+class BannerList(CachedResponseMixin, APIView):
     """
     API представление для получения списка баннеров.
     """
 
+    cache_group = "banners"
+
     def get(self, request: Request) -> Response:
         """
         Получает список всех баннеров.
         """
-        banners = Banner.objects.all()
-        serializer = BannerSerializer(banners, many=True)
+        serializer = BannerSerializer(banner_queryset(), many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
-class CartAPIView(APIView):
+class CartResponseMixin:
+    """Ответ с текущим содержимым корзины."""
+
+    def cart_response(self, request: Request, cart: Cart) -> Response:
+        """
+        Строки корзины загружаются одним запросом и сериализуются компактно.
+        С параметром ?totals=true ответ имеет вид
+        {"items": [...], "totalCount": ..., "totalPrice": ...},
+        где итоги посчитаны в базе.
+        """
+        serialized_items = CartLineSerializer(cart.lines(), many=True).data
+        if request.query_params.get("totals") in ("1", "true"):
+            return Response(
+                {
+                    "items": serialized_items,
+                    **CartTotalsSerializer(cart.get_totals()).data,
+                },
+                status=status.HTTP_200_OK,
+            )
+        return Response(serialized_items, status=status.HTTP_200_OK)
+
+
+class CartAPIView(CartResponseMixin, APIView):
     """
     API представление для работы с корзиной пользователя.
     """
@@ -322,28 +602,25 @@ class CartAPIView(APIView):
         """
         Получает содержимое корзины пользователя.
         """
-        cart = Cart(request)
-        basket_items = cart.__iter__()
-        serialized_items = []
-        for item in basket_items:
-            product = item["product"]
-            serializer = ProductSerializer(product)
-            serialized_item = serializer.data
-            serialized_item["count"] = item["count"]
-            serialized_items.append(serialized_item)
-        return Response(serialized_items, status=status.HTTP_200_OK)
+        return self.cart_response(request, Cart(request))
 
     def post(self, request: Request) -> Response:
         """
         Добавляет товар в корзину.
         """
-        product_id = request.data.get("id")
-        count = request.data.get("count")
-        if product_id and count:
+        # Нечисловое или неположительное количество — ошибка запроса, а не 500
+        serializer = CartOperationSerializer(
+            data={
+                "op": "add",
+                "id": request.data.get("id"),
+                "count": request.data.get("count"),
+            }
+        )
+        if serializer.is_valid():
+            product_id = serializer.validated_data["id"]
+            count = serializer.validated_data["count"]
             try:
-                product = Product.objects.get(id=product_id)
-                cart = Cart(request)
-                cart.add(product_id, count)
+                Cart(request).add(product_id, count)
                 return Response(
                     {"message": "Product added to basket"}, status=status.HTTP_200_OK
                 )
@@ -353,19 +630,21 @@ class CartAPIView(APIView):
                 )
         else:
             return Response(
-                {"message": "Invalid request"}, status=status.HTTP_400_BAD_REQUEST
+                {"message": "Invalid request", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
     def delete(self, request: Request) -> Response:
         """
         Удаляет товар из корзины.
         """
-        product_id = request.data.get("id")
-        if product_id:
+        serializer = CartOperationSerializer(
+            data={"op": "remove", "id": request.data.get("id")}
+        )
+        if serializer.is_valid():
+            product_id = serializer.validated_data["id"]
             try:
-                product = Product.objects.get(id=product_id)
-                cart = Cart(request)
-                cart.remove(product_id)
+                Cart(request).remove(product_id)
                 return Response(
                     {"message": "Product removed from basket"},
                     status=status.HTTP_200_OK,
@@ -376,5 +655,30 @@ class CartAPIView(APIView):
                 )
         else:
             return Response(
-                {"message": "Invalid request"}, status=status.HTTP_400_BAD_REQUEST
+                {"message": "Invalid request", "errors": serializer.errors},
+                status=status.HTTP_400_BAD_REQUEST,
             )
+
+
+class CartBatchAPIView(CartResponseMixin, APIView):
+    """
+    Пакетное изменение корзины: восстановление корзины, "купить снова" и т. п.
+    """
+
+    def post(self, request: Request) -> Response:
+        """
+        Применяет список операций к корзине и возвращает её новое содержимое.
+
+        Тело запроса: {"operations": [{"op": "add" | "set" | "remove",
+        "id": <id продукта>, "count": <количество>}, ...]} или сам список операций.
+        Все продукты проверяются одним запросом, изменения записываются
+        в хранилище корзины один раз.
+        """
+        data = request.data
+        if isinstance(data, list):
+            data = {"operations": data}
+        serializer = CartBatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        cart = Cart(request)
+        cart.apply(serializer.validated_data["operations"])
+        return self.cart_response(request, cart)